@@ -0,0 +1,122 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Learning of a 'LearningDistance' restricted to an active set of violated oracle claims.
+The violation of a claim is the distance between the current distance of its collections and its interval,
+and the loss is the mean violation of the claims, each one as of its last evaluation.
+
+The first epoch treats every claim once, in a random order. The next epochs only treat the active claims,
+by decreasing violation. A claim leaves the active set when it is satisfied, or cannot be learnt
+(one of its vectorizations is zero). The inactive claims are evaluated again after the first epoch,
+every 'recheck_period' epochs and before stopping, if the weights changed since their last evaluation:
+those violated again become active.
+Learning stops when no claim is violated, when the fraction of satisfied claims reaches 'satisfied_fraction',
+when the loss decreases by less than the ratio 'minimum_loss_improvement' between two epochs
+ending with an evaluation of all the claims (the first epoch, and those rechecking the inactive claims),
+or after 'maximum_number_of_epochs' epochs.
+"""
+
+
+import random
+from matrix_operations import *
+from learning_distance import SparseEnrichedOracleClaim, closest_point_from_interval
+
+
+DEFAULT_MAXIMUM_NUMBER_OF_EPOCHS = 20
+DEFAULT_RECHECK_PERIOD = 5
+DEFAULT_MINIMUM_LOSS_IMPROVEMENT = 1e-3
+VIOLATION_TOLERANCE = 1e-9
+CONVERGED = 'converged'
+SATISFIED_FRACTION_REACHED = 'satisfied_fraction_reached'
+LOSS_STALLED = 'loss_stalled'
+MAXIMUM_NUMBER_OF_EPOCHS_REACHED = 'maximum_number_of_epochs_reached'
+
+
+class LearningReport:
+    """ Work spent by 'learn_with_active_set': the number of epochs, of evaluations of the distance of a claim,
+    and of weight updates, the loss at the end of each epoch, the final fraction of satisfied claims,
+    and the reason why learning stopped. """
+
+    def __init__(self):
+        self.epochs = 0
+        self.claim_evaluations = 0
+        self.claim_updates = 0
+        self.losses = []
+        self.satisfied_fraction = 0.
+        self.stopping_reason = None
+
+
+def learn_with_active_set(learning_distance, oracle_claims, ratio_item_iterable_learning=0.5, convergence_speed=0.5,
+                          maximum_number_of_epochs=DEFAULT_MAXIMUM_NUMBER_OF_EPOCHS,
+                          recheck_period=DEFAULT_RECHECK_PERIOD, satisfied_fraction=1.,
+                          minimum_loss_improvement=DEFAULT_MINIMUM_LOSS_IMPROVEMENT, seed=None):
+    """ Same as 'learning_distance.learn', with the schedule described above. Return a 'LearningReport'. """
+    oracle_claims = list(oracle_claims)
+    generator = random.Random(seed)
+    report = LearningReport()
+    violations = np.zeros(len(oracle_claims))
+    evaluated_weights_versions = [None] * len(oracle_claims)
+    active_claims = set(range(len(oracle_claims)))
+    rechecked_loss = None
+    for epoch in range(1, maximum_number_of_epochs + 1):
+        report.epochs = epoch
+        claim_indices = list(active_claims)
+        generator.shuffle(claim_indices)
+        if epoch > 1:
+            claim_indices.sort(key=lambda claim_index: -violations[claim_index])
+        for claim_index in claim_indices:
+            evaluated_weights_versions[claim_index] = learning_distance.weights_version
+            enriched_oracle_claim = SparseEnrichedOracleClaim(oracle_claims[claim_index], learning_distance,
+                                                              effort=convergence_speed)
+            report.claim_evaluations += 1
+            violations[claim_index] = violation(enriched_oracle_claim.current_distance,
+                                                enriched_oracle_claim.distance_interval)
+            if learning_distance.learn_from_sparse_enriched_oracle_claim(enriched_oracle_claim,
+                                                                         ratio_item_iterable_learning):
+                report.claim_updates += 1
+            else:
+                active_claims.discard(claim_index)
+        rechecked = (epoch == 1 or epoch % recheck_period == 0 or not active_claims
+                     or fraction_of_satisfied_claims(violations) >= satisfied_fraction)
+        if rechecked:
+            for claim_index in range(len(oracle_claims)):
+                if (claim_index in active_claims
+                        or evaluated_weights_versions[claim_index] == learning_distance.weights_version):
+                    continue
+                evaluated_weights_versions[claim_index] = learning_distance.weights_version
+                violations[claim_index] = violation(learning_distance(*oracle_claims[claim_index].iterables_pair),
+                                                    oracle_claims[claim_index].distance_interval)
+                report.claim_evaluations += 1
+                if violations[claim_index] > VIOLATION_TOLERANCE:
+                    active_claims.add(claim_index)
+            if not active_claims:
+                report.stopping_reason = CONVERGED
+            elif fraction_of_satisfied_claims(violations) >= satisfied_fraction:
+                report.stopping_reason = SATISFIED_FRACTION_REACHED
+        report.losses.append(float(np.mean(violations)) if len(oracle_claims) else 0.)
+        if rechecked:
+            if (report.stopping_reason is None and rechecked_loss is not None
+                    and rechecked_loss - report.losses[-1] <= minimum_loss_improvement * rechecked_loss):
+                report.stopping_reason = LOSS_STALLED
+            rechecked_loss = report.losses[-1]
+        if report.stopping_reason is not None:
+            break
+    else:
+        report.stopping_reason = MAXIMUM_NUMBER_OF_EPOCHS_REACHED
+    report.satisfied_fraction = fraction_of_satisfied_claims(violations)
+    return report
+
+
+def violation(current_distance, distance_interval):
+    return abs(current_distance - closest_point_from_interval(current_distance, distance_interval))
+
+
+def fraction_of_satisfied_claims(violations):
+    if len(violations) == 0:
+        return 1.
+    return float(np.mean(violations <= VIOLATION_TOLERANCE))
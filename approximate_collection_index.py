@@ -0,0 +1,184 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Approximate nearest neighbour queries among a catalog of collections of iterables, by locality sensitive hashing.
+
+The signature of a vectorization is the sign of its scalar product with 'number_of_tables * bits_per_table'
+random hyperplanes (SimHash): two vectorizations at cosine distance 'd' agree on a bit
+with probability '1 - arccos(1 - d) / pi'. The coefficients of the hyperplanes are random signs,
+derived from a seeded hash of the item index and the bit index, so that they are never stored.
+The bits of each table are packed into a 64 bits key, and each table keeps the catalog sorted by key.
+The candidates of a query are the collections sharing the key of the query in at least one table,
+or, with 'number_of_probes', a key differing from it by one of its 'number_of_probes' least reliable bits
+(those of the smallest projections). The candidates are then ranked by their exact cosine distance.
+More tables or probes increase the recall and the number of candidates, more bits per table decrease both.
+
+When the weights of the distance change, only the collections containing an iterable whose weight changed,
+or an iterable containing an item whose weight changed, get their vectorization and signature computed again.
+"""
+
+
+from matrix_operations import *
+
+
+DEFAULT_NUMBER_OF_TABLES = 8
+DEFAULT_BITS_PER_TABLE = 16
+DEFAULT_CHUNK_SIZE = 65536
+MAXIMUM_BITS_PER_TABLE = 64
+
+
+class ApproximateCollectionIndex:
+    """ Same queries as 'CollectionIndex', answered among the candidates found by locality sensitive hashing. """
+
+    def __init__(self, distance, iterables_collections, number_of_tables=DEFAULT_NUMBER_OF_TABLES,
+                 bits_per_table=DEFAULT_BITS_PER_TABLE, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+        """ The vectorizations and signatures are computed by chunks of 'chunk_size' collections. """
+        if not 1 <= bits_per_table <= MAXIMUM_BITS_PER_TABLE:
+            raise ValueError('bits_per_table must be between 1 and {}, got {}'.format(MAXIMUM_BITS_PER_TABLE,
+                                                                                     bits_per_table))
+        if number_of_tables < 1:
+            raise ValueError('number_of_tables must be positive, got {}'.format(number_of_tables))
+        self.distance = distance
+        self.iterables_collections = list(iterables_collections)
+        self.number_of_tables = number_of_tables
+        self.bits_per_table = bits_per_table
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.number_of_computed_signatures = 0
+        self.refresh()
+
+    def __len__(self):
+        return len(self.iterables_collections)
+
+    def refresh(self):
+        """ Compute the vectorizations and signatures of the whole catalog. """
+        # Row 'j' of 'iterable_to_catalog_matrix' is nonzero on the collections of the catalog containing iterable 'j'.
+        self.iterable_to_catalog_matrix = csr_matrix(self.distance.iterable_matrix_from_collections(
+            self.iterables_collections))
+        # Row 'i' of 'catalog_matrix' is the normalized vectorization of the 'i'-th collection of the catalog.
+        self.catalog_matrix = self.normalized_vectorizations(np.arange(len(self)))
+        self.signatures = self.signatures_of_rows(self.catalog_matrix)
+        self.table_orders = [np.argsort(self.signatures[:, table], kind='stable')
+                             for table in range(self.number_of_tables)]
+        self.sorted_signatures = [self.signatures[order, table] for table, order in enumerate(self.table_orders)]
+        self.remember_weights()
+
+    def update(self):
+        """ Compute again the vectorizations and signatures of the collections whose vectorization
+        may have changed since the last update. A change of the number of items or iterables triggers a 'refresh'. """
+        if (len(self.distance.item_weights_vector) != len(self.indexed_item_weights_vector)
+                or len(self.distance.iterable_weights_vector) != len(self.indexed_iterable_weights_vector)):
+            self.refresh()
+            return
+        changed_items = np.flatnonzero(self.distance.item_weights_vector != self.indexed_item_weights_vector)
+        changed_iterables = np.union1d(
+            np.flatnonzero(self.distance.iterable_weights_vector != self.indexed_iterable_weights_vector),
+            columns_nonzero_on_rows(self.distance.item_iterable_matrix, changed_items))
+        positions = columns_nonzero_on_rows(self.iterable_to_catalog_matrix, changed_iterables)
+        if len(positions):
+            rows = self.normalized_vectorizations(positions)
+            self.catalog_matrix = matrix_with_replaced_rows(self.catalog_matrix, positions, rows)
+            self.signatures[positions] = self.signatures_of_rows(rows)
+            self.update_tables(positions)
+        self.remember_weights()
+
+    def remember_weights(self):
+        self.indexed_item_weights_vector = self.distance.item_weights_vector.copy()
+        self.indexed_iterable_weights_vector = self.distance.iterable_weights_vector.copy()
+        self.indexed_weights_version = self.distance.weights_version
+
+    def is_up_to_date(self):
+        return self.indexed_weights_version == self.distance.weights_version
+
+    def nearest(self, iterables, k, number_of_probes=0):
+        """ Return the list of at most 'k' pairs '(position, distance)' of the candidates closest
+        to the collection 'iterables', sorted by increasing distance (see 'CollectionIndex.nearest'). """
+        if not self.is_up_to_date():
+            self.update()
+        k = min(k, len(self))
+        item_indices, values, vectorization_norm = self.distance.sparse_vectorize_with_norm(iterables)
+        if vectorization_norm == 0:
+            return [(position, 1.) for position in range(k)]
+        candidates = self.candidates_from_projections(self.projections(item_indices, values), number_of_probes)
+        query_values = values / vectorization_norm
+        distances = 1. - matrix_vector_product(self.catalog_matrix[candidates][:, item_indices], query_values)
+        if len(candidates) > k:
+            selection = np.argpartition(distances, k - 1)[:k]
+            candidates, distances = candidates[selection], distances[selection]
+        order = np.argsort(distances, kind='stable')
+        return [(int(candidates[i]), float(distances[i])) for i in order]
+
+    def candidates(self, iterables, number_of_probes=0):
+        """ Return the sorted positions of the candidates of 'nearest' for the collection 'iterables'. """
+        if not self.is_up_to_date():
+            self.update()
+        item_indices, values, _ = self.distance.sparse_vectorize_with_norm(iterables)
+        return self.candidates_from_projections(self.projections(item_indices, values), number_of_probes)
+
+    def projections(self, item_indices, values):
+        """ Return the scalar products with the hyperplanes of the vector which is 'values' on 'item_indices'. """
+        return values @ hyperplane_signs(item_indices, self.number_of_tables * self.bits_per_table, self.seed)
+
+    def candidates_from_projections(self, projections, number_of_probes=0):
+        found = []
+        for table, table_projections in enumerate(projections.reshape(self.number_of_tables, self.bits_per_table)):
+            key = packed_keys(table_projections[np.newaxis, :] > 0)[0]
+            flipped_bits = np.argsort(np.abs(table_projections), kind='stable')[:number_of_probes]
+            keys = np.concatenate([[key], key ^ (np.uint64(1) << flipped_bits.astype(np.uint64))])
+            starts = np.searchsorted(self.sorted_signatures[table], keys, side='left')
+            ends = np.searchsorted(self.sorted_signatures[table], keys, side='right')
+            found.extend(self.table_orders[table][start:end] for start, end in zip(starts, ends))
+        return np.unique(np.concatenate(found))
+
+    def normalized_vectorizations(self, positions):
+        """ Return the matrix which 'k'-th row is the normalized vectorization of the collection 'positions[k]'. """
+        return self.distance.normalized_vectorization_rows((self.iterables_collections[position]
+                                                            for position in positions), self.chunk_size)
+
+    def signatures_of_rows(self, rows):
+        """ Return the array which entry '(k, t)' is the key of row 'k' of 'rows' in table 't'. """
+        chunks = [np.zeros((0, self.number_of_tables), dtype=np.uint64)]
+        for start in range(0, rows.shape[0], self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            item_indices = np.unique(chunk.indices)
+            signs = hyperplane_signs(item_indices, self.number_of_tables * self.bits_per_table, self.seed)
+            projections = np.asarray(chunk[:, item_indices] @ signs)
+            chunks.append(packed_keys(projections.reshape(-1, self.number_of_tables, self.bits_per_table) > 0))
+        self.number_of_computed_signatures += rows.shape[0]
+        return np.concatenate(chunks)
+
+    def update_tables(self, positions):
+        """ Move the collections 'positions' to the place of their new signatures in the sorted tables. """
+        moved = mask_from_indices(positions, len(self))
+        for table in range(self.number_of_tables):
+            kept = ~moved[self.table_orders[table]]
+            kept_order, kept_signatures = self.table_orders[table][kept], self.sorted_signatures[table][kept]
+            new_signatures = self.signatures[positions, table]
+            new_order = np.argsort(new_signatures, kind='stable')
+            insertion_points = np.searchsorted(kept_signatures, new_signatures[new_order], side='right')
+            self.table_orders[table] = np.insert(kept_order, insertion_points, positions[new_order])
+            self.sorted_signatures[table] = np.insert(kept_signatures, insertion_points, new_signatures[new_order])
+
+
+def hyperplane_signs(item_indices, number_of_bits, seed=0) -> np.ndarray:
+    """ Return the float32 matrix which entry '(k, b)' is the coefficient, '1' or '-1', of item 'item_indices[k]'
+    in the 'b'-th hyperplane, computed by the splitmix64 finalizer of a seeded hash of '(item_indices[k], b)'. """
+    with np.errstate(over='ignore'):
+        hashes = (np.asarray(item_indices, dtype=np.uint64)[:, np.newaxis] * np.uint64(number_of_bits)
+                  + np.arange(number_of_bits, dtype=np.uint64) + np.uint64(seed) * np.uint64(0x9e3779b97f4a7c15))
+        hashes = (hashes ^ (hashes >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+        hashes = (hashes ^ (hashes >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+        hashes = hashes ^ (hashes >> np.uint64(31))
+    return (hashes >> np.uint64(63)).astype(np.float32) * 2. - 1.
+
+
+def packed_keys(bits) -> np.ndarray:
+    """ Pack the last axis of the boolean array 'bits', of length at most 64, into uint64 keys,
+    bit 'b' having value '2 ** b'. """
+    powers = np.uint64(1) << np.arange(bits.shape[-1], dtype=np.uint64)
+    return np.bitwise_or.reduce(np.where(bits, powers, np.uint64(0)), axis=-1)
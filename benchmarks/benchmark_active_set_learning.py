@@ -0,0 +1,56 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare 'LearningDistance.learn' with a fixed number of passes and 'learn_with_active_set',
+in wallclock time, claim evaluations and final loss.
+The loss is the mean distance between the current distance of each oracle claim and its interval.
+Run from the root of the package with
+    python -m benchmarks.benchmark_active_set_learning [--iterables 20000] [--claims 5000]
+"""
+
+
+import argparse
+import random
+import time
+from learning_distance import LearningDistance
+from active_set_learning import learn_with_active_set
+from benchmarks.benchmark_batch_learning import loss
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=20000)
+    parser.add_argument('--claims', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    oracle_claims = synthetic_oracle_claims(LearningDistance(iterables), iterables, arguments.claims,
+                                            seed=arguments.seed)
+    print('mode\tepochs\tclaim evaluations\twallclock (s)\tloss\tstopping reason')
+    random.seed(arguments.seed)
+    distance = LearningDistance(iterables)
+    start = time.perf_counter()
+    distance.learn(oracle_claims, number_of_iterations=arguments.iterations)
+    elapsed = time.perf_counter() - start
+    print('full passes\t{}\t{}\t{:.3f}\t{:.5f}\t-'.format(arguments.iterations,
+                                                          arguments.iterations * len(oracle_claims), elapsed,
+                                                          loss(distance, oracle_claims)))
+    distance = LearningDistance(iterables)
+    start = time.perf_counter()
+    report = learn_with_active_set(distance, oracle_claims, maximum_number_of_epochs=arguments.iterations,
+                                   seed=arguments.seed)
+    elapsed = time.perf_counter() - start
+    print('active set\t{}\t{}\t{:.3f}\t{:.5f}\t{}'.format(report.epochs, report.claim_evaluations, elapsed,
+                                                          loss(distance, oracle_claims), report.stopping_reason))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Recall and latency of 'ApproximateCollectionIndex' against the exact 'CollectionIndex',
+for several numbers of tables, bits per table and probes. The queries are collections of the catalog
+with one iterable replaced, and the recall is the fraction of the exact 'k' nearest collections
+found by the approximate index. Then compare the incremental update of the signatures after 'learn',
+with and without learning the item weights, with their computation from scratch.
+Run from the root of the package with
+    python -m benchmarks.benchmark_approximate_index [--catalog 100000] [--tables 8 16 32] [--bits 6 8 12]
+"""
+
+
+import argparse
+import random
+import time
+from collection_index import CollectionIndex
+from approximate_collection_index import ApproximateCollectionIndex
+from learning_distance import LearningDistance
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--catalog', type=int, default=100000)
+    parser.add_argument('--collection-size', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--tables', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--bits', type=int, nargs='+', default=[6, 8, 12])
+    parser.add_argument('--probes', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--claims', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    generator = random.Random(arguments.seed)
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    distance = LearningDistance(iterables)
+    catalog = [generator.sample(iterables, arguments.collection_size) for _ in range(arguments.catalog)]
+    queries = [collection[1:] + [generator.choice(iterables)]
+               for collection in generator.sample(catalog, arguments.queries)]
+    exact_index = CollectionIndex(distance, catalog)
+    start = time.perf_counter()
+    exact_results = [{position for position, _ in exact_index.nearest(query, arguments.k)} for query in queries]
+    exact_seconds = (time.perf_counter() - start) / len(queries)
+    print('tables\tbits\tprobes\tbuild (s)\tquery (ms)\tcandidates\trecall@{}'.format(arguments.k))
+    print('exact\t-\t-\t-\t{:.2f}\t{}\t1.000'.format(1e3 * exact_seconds, len(catalog)), flush=True)
+    for number_of_tables in arguments.tables:
+        for bits_per_table in arguments.bits:
+            start = time.perf_counter()
+            index = ApproximateCollectionIndex(distance, catalog, number_of_tables, bits_per_table, arguments.seed)
+            build_seconds = time.perf_counter() - start
+            for number_of_probes in arguments.probes:
+                start = time.perf_counter()
+                results = [index.nearest(query, arguments.k, number_of_probes) for query in queries]
+                query_seconds = (time.perf_counter() - start) / len(queries)
+                candidates = sum(len(index.candidates(query, number_of_probes)) for query in queries) / len(queries)
+                recall = sum(len(exact & {position for position, _ in result})
+                             for exact, result in zip(exact_results, results)) / sum(map(len, exact_results))
+                print('{}\t{}\t{}\t{:.2f}\t{:.2f}\t{:.0f}\t{:.3f}'.format(number_of_tables, bits_per_table,
+                                                                          number_of_probes, build_seconds,
+                                                                          1e3 * query_seconds, candidates, recall),
+                      flush=True)
+    index = ApproximateCollectionIndex(distance, catalog, arguments.tables[0], arguments.bits[0], arguments.seed)
+    oracle_claims = synthetic_oracle_claims(distance, iterables, arguments.claims, seed=arguments.seed)
+    for ratio_item_iterable_learning in (0.5, 0.):
+        distance.learn(oracle_claims, ratio_item_iterable_learning=ratio_item_iterable_learning, number_of_iterations=1)
+        computed_signatures = index.number_of_computed_signatures
+        start = time.perf_counter()
+        index.update()
+        print('after learning {} claims with ratio_item_iterable_learning={}: update {:.2f} s ({} signatures)'.format(
+            len(oracle_claims), ratio_item_iterable_learning, time.perf_counter() - start,
+            index.number_of_computed_signatures - computed_signatures))
+    start = time.perf_counter()
+    index.refresh()
+    print('refresh {:.2f} s ({} signatures)'.format(time.perf_counter() - start, len(catalog)))
+
+if __name__ == '__main__':
+    main()
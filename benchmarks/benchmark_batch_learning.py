@@ -0,0 +1,64 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the convergence of 'LearningDistance.learn' against the wallclock time,
+for the sequential mode and for several batch sizes.
+The loss is the mean distance between the current distance of each oracle claim and its interval.
+Run from the root of the package with
+    python -m benchmarks.benchmark_batch_learning [--iterables 20000] [--claims 5000] [--batch-sizes 64 512]
+"""
+
+
+import argparse
+import random
+import time
+import numpy as np
+from learning_distance import LearningDistance, EnrichedOracleClaimsBatch
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def loss(distance, oracle_claims):
+    batch = EnrichedOracleClaimsBatch(oracle_claims, distance, effort=1.)
+    return float(np.mean(np.abs(batch.target_distances - batch.current_distances)))
+
+
+def convergence(iterables, oracle_claims, batch_size, number_of_iterations, seed):
+    random.seed(seed)
+    distance = LearningDistance(iterables)
+    points = [(0., loss(distance, oracle_claims))]
+    elapsed = 0.
+    for _ in range(number_of_iterations):
+        start = time.perf_counter()
+        distance.learn(oracle_claims, number_of_iterations=1, batch_size=batch_size)
+        elapsed += time.perf_counter() - start
+        points.append((elapsed, loss(distance, oracle_claims)))
+    return points
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=20000)
+    parser.add_argument('--claims', type=int, default=5000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[64, 512])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    oracle_claims = synthetic_oracle_claims(LearningDistance(iterables), iterables, arguments.claims,
+                                            seed=arguments.seed)
+    print('mode\titeration\twallclock (s)\tloss')
+    for batch_size in [None] + arguments.batch_sizes:
+        mode = 'sequential' if batch_size is None else 'batch {}'.format(batch_size)
+        points = convergence(iterables, oracle_claims, batch_size, arguments.iterations, arguments.seed)
+        for iteration, (elapsed, value) in enumerate(points):
+            print('{}\t{}\t{:.3f}\t{:.5f}'.format(mode, iteration, elapsed, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the construction of a 'LearningDistance' from its iterables with its loading from a saved directory.
+Run from the root of the package with
+    python -m benchmarks.benchmark_cold_start [--iterables 100000]
+"""
+
+
+import argparse
+import tempfile
+import time
+from learning_distance import LearningDistance
+from benchmarks.synthetic import synthetic_iterables
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    start = time.perf_counter()
+    distance = LearningDistance(iterables)
+    print('construction from iterables (s)\t{:.3f}'.format(time.perf_counter() - start))
+    with tempfile.TemporaryDirectory() as path:
+        distance.save(path)
+        for mmap in (False, True):
+            start = time.perf_counter()
+            LearningDistance.load(path, mmap=mmap)
+            print('load with mmap={} (s)\t{:.3f}'.format(mmap, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
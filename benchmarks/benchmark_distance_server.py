@@ -0,0 +1,98 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Load generator for 'DistanceServer': '--clients' threads send distance requests in a closed loop
+for '--duration' seconds, and the throughput and the median and 99th percentile latencies are reported.
+The 'direct' mode calls the distance from every client thread, the 'server' mode goes through a 'DistanceServer'
+for each batch window of '--batch-windows', and the 'server+learning' mode adds a thread learning from oracle claims
+through the server, publishing the weights every '--publication-period' claims.
+Run from the root of the package with
+    python -m benchmarks.benchmark_distance_server [--iterables 100000] [--clients 1 8 32] [--duration 3]
+"""
+
+
+import argparse
+import threading
+import time
+import numpy as np
+from learning_distance import LearningDistance
+from distance_server import DistanceServer
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def run_clients(compute, iterables_pairs, number_of_clients, duration):
+    """ Return the number of requests answered per second, and the latencies in seconds. """
+    latencies = [[] for _ in range(number_of_clients)]
+    deadline = time.perf_counter() + duration
+
+    def client(client_index):
+        position = client_index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            compute(*iterables_pairs[position % len(iterables_pairs)])
+            latencies[client_index].append(time.perf_counter() - start)
+            position += number_of_clients
+
+    threads = [threading.Thread(target=client, args=(client_index,)) for client_index in range(number_of_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies = np.concatenate([np.array(client_latencies) for client_latencies in latencies])
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def learn_continuously(server, oracle_claims, publication_period, stop):
+    while not stop.is_set():
+        server.learn(oracle_claims, publication_period=publication_period, number_of_iterations=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--batch-windows', type=float, nargs='+', default=[0.001, 0.005])
+    parser.add_argument('--maximum-batch-size', type=int, default=256)
+    parser.add_argument('--publication-period', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=3.)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    distance = LearningDistance(iterables)
+    oracle_claims = synthetic_oracle_claims(distance, iterables, arguments.queries, seed=arguments.seed)
+    iterables_pairs = [oracle_claim.iterables_pair for oracle_claim in oracle_claims]
+    print('mode\tbatch window (s)\tclients\trequests/s\tp50 latency (ms)\tp99 latency (ms)\tmean batch size')
+    for number_of_clients in arguments.clients:
+        throughput, latencies = run_clients(distance, iterables_pairs, number_of_clients, arguments.duration)
+        print('direct\t-\t{}\t{:.0f}\t{:.2f}\t{:.2f}\t-'.format(number_of_clients, throughput,
+                                                              1e3 * np.percentile(latencies, 50),
+                                                              1e3 * np.percentile(latencies, 99)), flush=True)
+        for mode in ('server', 'server+learning'):
+            for batch_window in arguments.batch_windows:
+                server = DistanceServer(distance, batch_window, arguments.maximum_batch_size)
+                stop = threading.Event()
+                learner = threading.Thread(target=learn_continuously,
+                                           args=(server, oracle_claims, arguments.publication_period, stop))
+                if mode == 'server+learning':
+                    learner.start()
+                throughput, latencies = run_clients(server, iterables_pairs, number_of_clients, arguments.duration)
+                stop.set()
+                if learner.is_alive():
+                    learner.join()
+                server.close()
+                print('{}\t{}\t{}\t{:.0f}\t{:.2f}\t{:.2f}\t{:.1f}'.format(
+                    mode, batch_window, number_of_clients, throughput, 1e3 * np.percentile(latencies, 50),
+                    1e3 * np.percentile(latencies, 99), server.number_of_requests / max(server.number_of_batches, 1)),
+                    flush=True)
+
+
+if __name__ == '__main__':
+    main()
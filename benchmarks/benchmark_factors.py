@@ -0,0 +1,58 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the construction of a 'Distance' on the bags of factors of texts,
+from the materialized factors and from the texts with 'Distance.from_texts'.
+Run from the root of the package with
+    python -m benchmarks.benchmark_factors [--texts 2000] [--maximum-factor-length 5]
+"""
+
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from distance import Distance
+
+
+def synthetic_texts(number_of_texts, mean_length=200, alphabet='abcdefghijklmnopqrstuvwxyz ', seed=0):
+    generator = random.Random(seed)
+    return [''.join(generator.choices(alphabet, k=generator.randint(1, 2 * mean_length - 1)))
+            for _ in range(number_of_texts)]
+
+
+def materialized_factors(texts, maximum_factor_length):
+    return {text[start:start + length] for text in texts for length in range(1, maximum_factor_length + 1)
+            for start in range(len(text) - length + 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, default=2000)
+    parser.add_argument('--maximum-factor-length', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    texts = synthetic_texts(arguments.texts, seed=arguments.seed)
+    constructions = {'materialized factors': lambda: Distance(materialized_factors(texts,
+                                                                                    arguments.maximum_factor_length)),
+                     'from_texts': lambda: Distance.from_texts(texts, arguments.maximum_factor_length)}
+    print('construction\ttime (s)\tpeak memory (MB)')
+    for name, construction in constructions.items():
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        construction()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('{}\t{:.3f}\t{:.1f}'.format(name, elapsed, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
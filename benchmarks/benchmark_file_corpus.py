@@ -0,0 +1,76 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the construction of a 'VectorSpace' from iterables read from files, in memory with '__init__'
+and out of core with 'from_files' for several memory budgets, in time and peak memory.
+The iterables are synthetic, written as JSON records to '--files' files, and both constructions read them
+with 'json_records_of_file' and use compact vocabularies, so that the index maps stay small.
+The peak memory is measured with 'tracemalloc', which does not count the memory-mapped files.
+Run from the root of the package with
+    python -m benchmarks.benchmark_file_corpus [--iterables 1000000] [--budgets 64 256]
+"""
+
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from vector_space import VectorSpace
+from file_corpus import iterables_from_files, json_records_of_file
+from benchmarks.synthetic import synthetic_iterables
+
+
+def write_files(path, number_of_iterables, number_of_files, vocabulary_size, seed):
+    paths = []
+    for file_index in range(number_of_files):
+        paths.append(os.path.join(path, 'part_{}.jsonl'.format(file_index)))
+        with open(paths[-1], 'w') as file:
+            file.writelines(json.dumps(iterable) + '\n' for iterable in synthetic_iterables(
+                number_of_iterables // number_of_files, vocabulary_size=vocabulary_size, seed=seed + file_index))
+    return paths
+
+
+def measured(function):
+    """ Return the result of 'function', its duration and its peak memory in MB. """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=1000000)
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--budgets', type=int, nargs='+', default=[16, 64, 256], help='memory budgets in MB')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    with tempfile.TemporaryDirectory() as path:
+        paths = write_files(path, arguments.iterables, arguments.files,
+                            max(1000, arguments.iterables // 10), arguments.seed)
+        print('construction\tseconds\tpeak memory (MB)\tentries', flush=True)
+        vector_space, seconds, peak = measured(lambda: VectorSpace(
+            iterables_from_files(paths, json_records_of_file), compact_vocabulary=True))
+        print('__init__\t{:.1f}\t{:.1f}\t{}'.format(seconds, peak, vector_space.item_iterable_matrix.nnz), flush=True)
+        del vector_space
+        for budget in arguments.budgets:
+            directory = os.path.join(path, 'matrix_{}'.format(budget))
+            vector_space, seconds, peak = measured(lambda: VectorSpace.from_files(
+                paths, directory, json_records_of_file, compact_vocabulary=True, memory_budget=budget * 2 ** 20))
+            print('from_files ({} MB)\t{:.1f}\t{:.1f}\t{}'.format(budget, seconds, peak,
+                                                                 vector_space.item_iterable_matrix.nnz), flush=True)
+            del vector_space
+
+
+if __name__ == '__main__':
+    main()
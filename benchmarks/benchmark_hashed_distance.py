@@ -0,0 +1,51 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the distances of 'HashedDistance' with those of the exact 'Distance', for several numbers of buckets.
+Run from the root of the package with
+    python -m benchmarks.benchmark_hashed_distance [--iterables 10000] [--pairs 2000]
+"""
+
+
+import argparse
+import random
+import numpy as np
+from distance import Distance
+from hashed_distance import HashedDistance
+from benchmarks.synthetic import synthetic_iterables
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=10000)
+    parser.add_argument('--vocabulary-size', type=int, default=10000)
+    parser.add_argument('--pairs', type=int, default=2000)
+    parser.add_argument('--collection-size', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=arguments.vocabulary_size,
+                                    seed=arguments.seed)
+    generator = random.Random(arguments.seed)
+    pairs = [(set(generator.sample(iterables, arguments.collection_size)),
+              set(generator.sample(iterables, arguments.collection_size))) for _ in range(arguments.pairs)]
+    exact_distance = Distance(iterables)
+    exact_distances = np.array([exact_distance(iterables0, iterables1) for iterables0, iterables1 in pairs])
+    print('buckets\tsigned\tmean absolute error\tmaximum absolute error\tcorrelation')
+    for number_of_buckets in (2 ** 8, 2 ** 10, 2 ** 12, 2 ** 14, 2 ** 16):
+        for signed_hashing in (False, True):
+            distance = HashedDistance(iterables, number_of_buckets=number_of_buckets, signed_hashing=signed_hashing,
+                                      seed=arguments.seed)
+            distances = np.array([distance(iterables0, iterables1) for iterables0, iterables1 in pairs])
+            errors = np.abs(distances - exact_distances)
+            correlation = np.corrcoef(distances, exact_distances)[0, 1]
+            print('{}\t{}\t{:.4f}\t{:.4f}\t{:.4f}'.format(number_of_buckets, signed_hashing, errors.mean(),
+                                                          errors.max(), correlation))
+
+
+if __name__ == '__main__':
+    main()
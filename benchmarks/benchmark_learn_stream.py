@@ -0,0 +1,77 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Online learning with 'DistanceServer.learn_stream' while '--readers' threads query the published distance
+directly ('current_distance') for '--duration' seconds: claims learnt per second, reads per second
+and publications per second, for each publication period of '--publication-periods'.
+The first row has no learning thread.
+Run from the root of the package with
+    python -m benchmarks.benchmark_learn_stream [--iterables 100000] [--publication-periods 1 10 100]
+"""
+
+
+import argparse
+import threading
+import time
+from itertools import cycle, takewhile
+from learning_distance import LearningDistance
+from distance_server import DistanceServer
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def read_continuously(server, iterables_pairs, stop, counts, reader_index):
+    for iterables0, iterables1 in cycle(iterables_pairs):
+        if stop.is_set():
+            return
+        server.current_distance()(iterables0, iterables1)
+        counts[reader_index] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--claims', type=int, default=2000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--publication-periods', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--duration', type=float, default=3.)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    distance = LearningDistance(iterables)
+    oracle_claims = synthetic_oracle_claims(distance, iterables, arguments.claims, seed=arguments.seed)
+    iterables_pairs = [oracle_claim.iterables_pair for oracle_claim in oracle_claims]
+    print('publication period\tclaims/s\treads/s\tpublications/s')
+    for publication_period in [None] + arguments.publication_periods:
+        with DistanceServer(distance) as server:
+            stop = threading.Event()
+            counts = [0] * arguments.readers
+            readers = [threading.Thread(target=read_continuously, args=(server, iterables_pairs, stop, counts, index))
+                       for index in range(arguments.readers)]
+            initial_publications = server.number_of_publications
+            start = time.perf_counter()
+            for reader in readers:
+                reader.start()
+            if publication_period is None:
+                time.sleep(arguments.duration)
+                number_of_claims = 0
+            else:
+                number_of_claims = server.learn_stream(
+                    takewhile(lambda _: time.perf_counter() - start < arguments.duration, cycle(oracle_claims)),
+                    publication_period=publication_period)
+            seconds = time.perf_counter() - start
+            stop.set()
+            for reader in readers:
+                reader.join()
+            print('{}\t{:.0f}\t{:.0f}\t{:.1f}'.format(
+                publication_period if publication_period is not None else 'no learning', number_of_claims / seconds,
+                sum(counts) / seconds, (server.number_of_publications - initial_publications) / seconds), flush=True)
+
+
+if __name__ == '__main__':
+    main()
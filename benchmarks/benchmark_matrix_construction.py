@@ -0,0 +1,58 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the construction of the item / iterable count matrix
+by the single pass bulk builder and by the former 'lil_matrix' builder.
+Run from the root of the package with
+    python -m benchmarks.benchmark_matrix_construction [--sizes 10000 100000 1000000] [--legacy-limit 100000]
+"""
+
+
+import argparse
+import time
+from scipy.sparse import lil_matrix
+from vector_space import index_maps_and_matrix_from_iterables, map_to_index_from_iterable, iterables_union
+from benchmarks.synthetic import synthetic_iterables
+
+
+def legacy_index_maps_and_matrix_from_iterables(iterables):
+    item_to_index = map_to_index_from_iterable(iterables_union(iterables))
+    iterable_to_index = map_to_index_from_iterable(iterables)
+    matrix = lil_matrix((len(item_to_index), len(iterable_to_index)), dtype='int')
+    for iterable in iterables:
+        for item in iterable:
+            matrix[item_to_index[item], iterable_to_index[iterable]] += 1
+    return item_to_index, iterable_to_index, matrix.tocsr()
+
+
+def timed(function, *arguments):
+    start = time.perf_counter()
+    result = function(*arguments)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy-limit', type=int, default=100000,
+                        help='largest size for which the former builder is also timed')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    print('iterables\tnnz\tbulk (s)\tlegacy (s)')
+    for size in arguments.sizes:
+        iterables = synthetic_iterables(size, vocabulary_size=max(1000, size // 10), seed=arguments.seed)
+        bulk_time, (_, _, matrix) = timed(index_maps_and_matrix_from_iterables, iterables)
+        legacy_time = float('nan')
+        if size <= arguments.legacy_limit:
+            legacy_time, (_, _, legacy_matrix) = timed(legacy_index_maps_and_matrix_from_iterables, iterables)
+            assert (matrix != legacy_matrix).nnz == 0
+        print('{}\t{}\t{:.3f}\t{:.3f}'.format(size, matrix.nnz, bulk_time, legacy_time))
+
+
+if __name__ == '__main__':
+    main()
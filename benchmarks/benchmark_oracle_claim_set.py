@@ -0,0 +1,70 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare learning from a list of 'OracleClaim' objects and from an 'OracleClaimSet':
+time of the compilation, of its saving and of its memory-mapped loading, and time per epoch
+of the sequential and batch learning modes.
+Run from the root of the package with
+    python -m benchmarks.benchmark_oracle_claim_set [--iterables 100000] [--claims 20000]
+"""
+
+
+import argparse
+import random
+import tempfile
+import time
+from learning_distance import LearningDistance
+from oracle_claim_set import OracleClaimSet
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def time_per_epoch(iterables, oracle_claims, batch_size, number_of_iterations):
+    distance = LearningDistance(iterables)
+    random.seed(0)
+    start = time.perf_counter()
+    distance.learn(oracle_claims, number_of_iterations=number_of_iterations, batch_size=batch_size)
+    return (time.perf_counter() - start) / number_of_iterations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--claims', type=int, default=20000)
+    parser.add_argument('--collection-size', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    distance = LearningDistance(iterables)
+    oracle_claims = synthetic_oracle_claims(distance, iterables, arguments.claims,
+                                            collection_size=arguments.collection_size, seed=arguments.seed)
+    start = time.perf_counter()
+    oracle_claim_set = OracleClaimSet.from_oracle_claims(oracle_claims, distance)
+    compilation_seconds = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        oracle_claim_set.save(path)
+        saving_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded_oracle_claim_set = OracleClaimSet.load(path)
+        loading_seconds = time.perf_counter() - start
+        print('compilation (s)\tsave (s)\tmemory-mapped load (s)')
+        print('{:.2f}\t{:.3f}\t{:.4f}'.format(compilation_seconds, saving_seconds, loading_seconds), flush=True)
+        print('claims\tsequential epoch (s)\tbatch epoch (s)')
+        for name, claims in (('OracleClaim list', oracle_claims), ('OracleClaimSet', oracle_claim_set),
+                             ('loaded OracleClaimSet', loaded_oracle_claim_set)):
+            print('{}\t{:.2f}\t{:.2f}'.format(
+                name, time_per_epoch(iterables, claims, None, arguments.iterations),
+                time_per_epoch(iterables, claims, arguments.batch_size, arguments.iterations)), flush=True)
+        del loaded_oracle_claim_set
+
+
+if __name__ == '__main__':
+    main()
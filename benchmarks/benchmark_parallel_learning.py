@@ -0,0 +1,50 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Measure the scaling of 'parallel_learning.learn_in_parallel' from 1 to N workers, for both schedules.
+Run from the root of the package with
+    python -m benchmarks.benchmark_parallel_learning [--iterables 20000] [--claims 5000] [--workers 1 2 4 8]
+"""
+
+
+import argparse
+import time
+from learning_distance import LearningDistance
+from parallel_learning import learn_in_parallel, SCHEDULES
+from benchmarks.benchmark_batch_learning import loss
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=20000)
+    parser.add_argument('--claims', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--iterations', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    oracle_claims = synthetic_oracle_claims(LearningDistance(iterables), iterables, arguments.claims,
+                                            seed=arguments.seed)
+    print('schedule\tworkers\twallclock (s)\tspeedup\tloss')
+    for schedule in SCHEDULES:
+        reference_time = None
+        for number_of_workers in arguments.workers:
+            distance = LearningDistance(iterables)
+            start = time.perf_counter()
+            learn_in_parallel(distance, oracle_claims, number_of_workers, schedule=schedule,
+                              number_of_iterations=arguments.iterations, seed=arguments.seed)
+            elapsed = time.perf_counter() - start
+            reference_time = reference_time or elapsed
+            print('{}\t{}\t{:.3f}\t{:.2f}\t{:.5f}'.format(schedule, number_of_workers, elapsed,
+                                                          reference_time / elapsed, loss(distance, oracle_claims)))
+
+
+if __name__ == '__main__':
+    main()
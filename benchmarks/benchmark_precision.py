@@ -0,0 +1,65 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the 'float64' and 'float32' precisions: memory of the matrix and the weights, throughput of
+'vectorization_matrix', '__call__' and 'learn', and largest difference of the distances with 'float64'.
+Run from the root of the package with
+    python -m benchmarks.benchmark_precision [--iterables 200000] [--claims 2000]
+"""
+
+
+import argparse
+import random
+import time
+from matrix_operations import PRECISIONS
+from learning_distance import LearningDistance
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def memory_size(distance):
+    matrix = distance.item_iterable_matrix
+    return sum(array.nbytes for array in (matrix.data, matrix.indices, matrix.indptr,
+                                          distance.item_weights_vector, distance.iterable_weights_vector))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=200000)
+    parser.add_argument('--claims', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    oracle_claims = synthetic_oracle_claims(LearningDistance(iterables), iterables, arguments.claims,
+                                            seed=arguments.seed)
+    collections = [oracle_claim.iterables_pair[0] for oracle_claim in oracle_claims]
+    print('precision\tmemory (MB)\tvectorization matrix (collections/s)\tdistances/s\tclaims/s\t'
+          'max distance difference')
+    reference_distances = None
+    for precision in PRECISIONS:
+        distance = LearningDistance(iterables, precision=precision)
+        start = time.perf_counter()
+        distance.vectorization_matrix(collections)
+        matrix_throughput = len(collections) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        distances = [distance(*oracle_claim.iterables_pair) for oracle_claim in oracle_claims]
+        distance_throughput = len(oracle_claims) / (time.perf_counter() - start)
+        random.seed(arguments.seed)
+        start = time.perf_counter()
+        distance.learn(oracle_claims, number_of_iterations=1)
+        learning_throughput = len(oracle_claims) / (time.perf_counter() - start)
+        if reference_distances is None:
+            reference_distances = distances
+        difference = max(abs(value - reference) for value, reference in zip(distances, reference_distances))
+        print('{}\t{:.1f}\t{:.0f}\t{:.0f}\t{:.0f}\t{:.2e}'.format(precision, memory_size(distance) / 2 ** 20,
+                                                                  matrix_throughput, distance_throughput,
+                                                                  learning_throughput, difference))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare a 'LearningDistance' with 'ShardedDistance' objects of several numbers of shards:
+construction time, largest fraction of the item occurrences held by one shard, time per distance
+and time per learnt oracle claim. The queries and claims are on collections of '--collection-size' iterables.
+Run from the root of the package with
+    python -m benchmarks.benchmark_sharded_distance [--iterables 100000] [--shards 1 2 4]
+"""
+
+
+import argparse
+import random
+import time
+from learning_distance import LearningDistance
+from sharded_distance import ShardedDistance
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def timed_queries_and_learning(distance, pairs, oracle_claims):
+    start = time.perf_counter()
+    for collection0, collection1 in pairs:
+        distance(collection0, collection1)
+    query_seconds = (time.perf_counter() - start) / len(pairs)
+    random.seed(0)
+    start = time.perf_counter()
+    distance.learn(oracle_claims, number_of_iterations=1)
+    learning_seconds = (time.perf_counter() - start) / len(oracle_claims)
+    return query_seconds, learning_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--collection-size', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--claims', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    generator = random.Random(arguments.seed)
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    pairs = [(generator.sample(iterables, arguments.collection_size),
+              generator.sample(iterables, arguments.collection_size)) for _ in range(arguments.queries)]
+    print('distance\tconstruction (s)\tlargest shard\tquery (ms)\tclaim (ms)', flush=True)
+    start = time.perf_counter()
+    distance = LearningDistance(iterables)
+    construction_seconds = time.perf_counter() - start
+    oracle_claims = synthetic_oracle_claims(distance, iterables, arguments.claims,
+                                            collection_size=arguments.collection_size, seed=arguments.seed)
+    query_seconds, learning_seconds = timed_queries_and_learning(distance, pairs, oracle_claims)
+    print('LearningDistance\t{:.2f}\t1.00\t{:.3f}\t{:.3f}'.format(construction_seconds, 1e3 * query_seconds,
+                                                               1e3 * learning_seconds), flush=True)
+    for number_of_shards in arguments.shards:
+        start = time.perf_counter()
+        with ShardedDistance(iterables, number_of_shards) as sharded_distance:
+            construction_seconds = time.perf_counter() - start
+            occurrences = [total_length for _, _, total_length in sharded_distance.shard_statistics.values()]
+            query_seconds, learning_seconds = timed_queries_and_learning(sharded_distance, pairs, oracle_claims)
+        print('ShardedDistance ({} shards)\t{:.2f}\t{:.2f}\t{:.3f}\t{:.3f}'.format(
+            number_of_shards, construction_seconds, max(occurrences) / sum(occurrences), 1e3 * query_seconds,
+            1e3 * learning_seconds), flush=True)
+
+
+if __name__ == '__main__':
+    main()
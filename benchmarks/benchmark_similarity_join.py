@@ -0,0 +1,106 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Find the pairs of collections at distance at most '--threshold' among a catalog made of random collections
+and of near duplicates of some of them (one iterable replaced), with:
+    calls: '__call__' on every pair, timed on a sample of pairs and extrapolated
+    pairwise: the blocks of 'Distance.pairwise_chunks', filtered by the threshold
+    join: 'similarity_join', sequential and with '--workers' processes
+The peak memory is measured with 'tracemalloc'.
+Run from the root of the package with
+    python -m benchmarks.benchmark_similarity_join [--catalog 50000] [--threshold 0.2] [--workers 2]
+"""
+
+
+import argparse
+import random
+import time
+import tracemalloc
+import numpy as np
+from distance import Distance
+from similarity_join import SimilarityJoin
+from benchmarks.synthetic import synthetic_iterables
+
+
+def synthetic_catalog(iterables, size, collection_size, duplicate_fraction, generator):
+    catalog = [generator.sample(iterables, collection_size) for _ in range(size)]
+    for position in generator.sample(range(size), int(duplicate_fraction * size)):
+        original = catalog[generator.randrange(size)]
+        catalog[position] = original[1:] + [generator.choice(iterables)]
+    return catalog
+
+
+def measured(function):
+    """ Return the result of 'function', its duration and its peak memory in MB. """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2 ** 20
+
+
+def pairwise_pairs(distance, catalog, threshold, chunk_size):
+    number_of_pairs = 0
+    for chunk_index, distances in enumerate(distance.pairwise_chunks(catalog, catalog, chunk_size)):
+        rows, columns = np.nonzero(distances <= threshold)
+        number_of_pairs += np.count_nonzero(rows + chunk_index * chunk_size < columns)
+    return number_of_pairs
+
+
+def joined_pairs(join, number_of_workers):
+    return sum(len(rows) for rows, _, _ in join.chunks(number_of_workers))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--catalog', type=int, default=50000)
+    parser.add_argument('--collection-size', type=int, default=3)
+    parser.add_argument('--duplicate-fraction', type=float, default=0.2)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--memory-budget', type=int, default=2 ** 26)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--sampled-calls', type=int, default=20000)
+    parser.add_argument('--pairwise-chunk-size', type=int, default=1024)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    generator = random.Random(arguments.seed)
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    distance = Distance(iterables)
+    catalog = synthetic_catalog(iterables, arguments.catalog, arguments.collection_size,
+                                arguments.duplicate_fraction, generator)
+    number_of_pairs = len(catalog) * (len(catalog) - 1) // 2
+    print('method\tseconds\tpeak memory (MB)\tpairs found\tscalar products')
+    sampled_pairs = [generator.sample(catalog, 2) for _ in range(arguments.sampled_calls)]
+    start = time.perf_counter()
+    for collection0, collection1 in sampled_pairs:
+        distance(collection0, collection1)
+    seconds = (time.perf_counter() - start) * number_of_pairs / len(sampled_pairs)
+    print('calls (extrapolated)\t{:.0f}\t-\t-\t{}'.format(seconds, number_of_pairs), flush=True)
+    found, seconds, peak = measured(lambda: pairwise_pairs(distance, catalog, arguments.threshold,
+                                                           arguments.pairwise_chunk_size))
+    print('pairwise\t{:.1f}\t{:.1f}\t{}\t{}'.format(seconds, peak, found, len(catalog) ** 2), flush=True)
+    for number_of_workers in (None, arguments.workers):
+        join = None
+
+        def run_join():
+            nonlocal join
+            join = SimilarityJoin(distance, catalog, arguments.threshold, arguments.memory_budget)
+            return joined_pairs(join, number_of_workers)
+
+        found, seconds, peak = measured(run_join)
+        print('join ({} workers, {} blocks, {} candidates)\t{:.1f}\t{:.1f}\t{}\t{}'.format(
+            number_of_workers or 0, len(join.blocks), join.number_of_candidates, seconds, peak, found,
+            join.number_of_verified_pairs), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the time per oracle claim of the dense update ('EnrichedOracleClaim' and 'compute_rescaling_vectors')
+and of the sparse update ('learn_from_one_oracle_claim'), for increasing numbers of iterables.
+Run from the root of the package with
+    python -m benchmarks.benchmark_sparse_learning [--claims 200]
+"""
+
+
+import argparse
+import random
+import time
+from learning_distance import LearningDistance, EnrichedOracleClaim
+from oracle_claim import OracleClaim
+from benchmarks.synthetic import synthetic_iterables
+
+
+def learn_densely_from_one_oracle_claim(distance, oracle_claim, effort):
+    enriched_oracle_claim = EnrichedOracleClaim(oracle_claim, distance, effort=effort)
+    if enriched_oracle_claim.has_bad_values():
+        return None
+    rescaling_item_vector, rescaling_iterable_vector = distance.compute_rescaling_vectors(enriched_oracle_claim, 0.5)
+    distance.item_weights_vector = rescaling_item_vector * distance.item_weights_vector
+    distance.iterable_weights_vector = rescaling_iterable_vector * distance.iterable_weights_vector
+    distance.notify_weights_change()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--claims', type=int, default=200)
+    parser.add_argument('--collection-size', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    print('iterables\tdense (ms per claim)\tsparse (ms per claim)')
+    for size in arguments.sizes:
+        iterables = synthetic_iterables(size, vocabulary_size=max(1000, size // 10), seed=arguments.seed)
+        generator = random.Random(arguments.seed)
+        oracle_claims = [OracleClaim((set(generator.sample(iterables, arguments.collection_size)),
+                                      set(generator.sample(iterables, arguments.collection_size))),
+                                     (0., generator.random())) for _ in range(arguments.claims)]
+        dense_distance = LearningDistance(iterables)
+        sparse_distance = LearningDistance(iterables)
+        dense_distance.item_iterable_csc_matrix()
+        sparse_distance.item_iterable_csc_matrix()
+        start = time.perf_counter()
+        for oracle_claim in oracle_claims:
+            learn_densely_from_one_oracle_claim(dense_distance, oracle_claim, effort=0.5)
+        dense_time = (time.perf_counter() - start) / len(oracle_claims)
+        start = time.perf_counter()
+        for oracle_claim in oracle_claims:
+            sparse_distance.learn_from_one_oracle_claim(oracle_claim, effort=0.5)
+        sparse_time = (time.perf_counter() - start) / len(oracle_claims)
+        print('{}\t{:.3f}\t{:.3f}'.format(size, 1000 * dense_time, 1000 * sparse_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the time per distance of the dense path ('verbose_distance') and of the sparse path ('__call__'),
+for increasing numbers of iterables.
+Run from the root of the package with
+    python -m benchmarks.benchmark_sparse_queries [--queries 500]
+"""
+
+
+import argparse
+import random
+import time
+from distance import Distance
+from benchmarks.synthetic import synthetic_iterables
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--collection-size', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    print('iterables\tdense (ms per distance)\tsparse (ms per distance)')
+    for size in arguments.sizes:
+        iterables = synthetic_iterables(size, vocabulary_size=max(1000, size // 10), seed=arguments.seed)
+        distance = Distance(iterables)
+        generator = random.Random(arguments.seed)
+        pairs = [(set(generator.sample(iterables, arguments.collection_size)),
+                  set(generator.sample(iterables, arguments.collection_size))) for _ in range(arguments.queries)]
+        distance(*pairs[0])
+        start = time.perf_counter()
+        for iterables0, iterables1 in pairs:
+            distance.verbose_distance(iterables0, iterables1)
+        dense_time = (time.perf_counter() - start) / len(pairs)
+        start = time.perf_counter()
+        for iterables0, iterables1 in pairs:
+            distance(iterables0, iterables1)
+        sparse_time = (time.perf_counter() - start) / len(pairs)
+        print('{}\t{:.3f}\t{:.3f}'.format(size, 1000 * dense_time, 1000 * sparse_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Time and peak memory of each stage of a distance, on seeded synthetic corpora of several sizes.
+The corpora are 'zipf' (tuples of integers with Zipfian frequencies, see 'synthetic_iterables')
+and 'factors' (the factors of synthetic texts, see 'synthetic_factor_iterables').
+The stages are the construction of the 'VectorSpace', of the 'LearningDistance', 'vectorize', '__call__',
+and 'learn' on seeded synthetic oracle claims, starting each run from a new distance and a reseeded 'random'.
+Each stage is timed without tracing, keeping the best of '--repeats' runs,
+then run again under 'tracemalloc' to measure its peak memory. The preparation of a run is neither timed nor traced.
+The results are written as JSON with '--output'. With '--baseline', they are compared to a stored result file:
+a stage is a regression when its time per operation or its peak memory exceeds the baseline by more than
+'--tolerance', and the exit status is then '1'.
+Run from the root of the package with
+    python -m benchmarks.benchmark_suite [--sizes 1000 10000] [--output results.json] [--baseline baseline.json]
+"""
+
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+import scipy
+from vector_space import VectorSpace
+from learning_distance import LearningDistance
+from benchmarks.synthetic import synthetic_iterables, synthetic_factor_iterables, synthetic_oracle_claims
+
+
+CORPORA = ('zipf', 'factors')
+MEASURES = ('seconds_per_operation', 'peak_memory_mb')
+DEFAULT_TOLERANCE = 0.25
+# Absolute slack of the measures, below which differences are noise.
+SLACKS = {'seconds_per_operation': 1e-5, 'peak_memory_mb': 0.5}
+
+
+def synthetic_corpus(corpus, size, arguments):
+    if corpus == 'zipf':
+        return synthetic_iterables(size, vocabulary_size=max(1000, size // 10), mean_length=arguments.mean_length,
+                                   seed=arguments.seed)
+    return synthetic_factor_iterables(size, maximum_factor_length=arguments.maximum_factor_length,
+                                      seed=arguments.seed)
+
+
+def stage_functions(iterables, arguments):
+    """ Yield the name of each stage, its number of operations, the function running it,
+    and the function preparing each run, if any, whose result is given to the function running it.
+    The reading stages use the distance built by the 'distance' stage, and 'learn' a new one per run. """
+    yield 'vector_space', 1, lambda _: VectorSpace(iterables), None
+    distance = LearningDistance(iterables)
+    yield 'distance', 1, lambda _: LearningDistance(iterables), None
+    oracle_claims = synthetic_oracle_claims(distance, iterables, arguments.claims,
+                                            collection_size=arguments.collection_size, seed=arguments.seed)
+    collections = [collection for oracle_claim in oracle_claims for collection in oracle_claim.iterables_pair]
+    yield 'vectorize', len(collections), lambda _: [distance.vectorize(collection) for collection in collections], None
+    yield 'call', len(oracle_claims), lambda _: [distance(*oracle_claim.iterables_pair)
+                                                 for oracle_claim in oracle_claims], None
+
+    def new_learning_distance():
+        # 'learn' shuffles the claims with 'random'.
+        random.seed(arguments.seed)
+        return LearningDistance(iterables)
+
+    yield 'learn', len(oracle_claims), lambda learning_distance: learning_distance.learn(
+        oracle_claims, number_of_iterations=1), new_learning_distance
+
+
+def measure(function, repeats=1, setup=None):
+    """ Return the shortest duration of 'repeats' calls to 'function', and the peak memory in MB
+    allocated by a last call. Each call receives the result of a call to 'setup', made before the measure. """
+    seconds = float('inf')
+    for _ in range(repeats):
+        state = None if setup is None else setup()
+        gc.collect()
+        start = time.perf_counter()
+        function(state)
+        seconds = min(seconds, time.perf_counter() - start)
+    state = None if setup is None else setup()
+    gc.collect()
+    tracemalloc.start()
+    function(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20
+
+
+def run(arguments):
+    results = []
+    for corpus in arguments.corpora:
+        for size in arguments.sizes:
+            iterables = synthetic_corpus(corpus, size, arguments)
+            for stage, operations, function, setup in stage_functions(iterables, arguments):
+                seconds, peak_memory = measure(function, arguments.repeats, setup)
+                results.append({'corpus': corpus, 'size': size, 'stage': stage, 'operations': operations,
+                                'seconds': seconds, 'seconds_per_operation': seconds / operations,
+                                'peak_memory_mb': peak_memory})
+                print('{}\t{}\t{}\t{:.6f}\t{:.1f}'.format(corpus, size, stage, seconds / operations, peak_memory),
+                      flush=True)
+    return {'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                            'scipy': scipy.__version__, 'machine': platform.machine()},
+            'parameters': {key: value for key, value in vars(arguments).items()
+                           if key not in ('output', 'baseline', 'tolerance')},
+            'results': results}
+
+
+def regressions(report, baseline_report, tolerance=DEFAULT_TOLERANCE):
+    """ Return the list of '(corpus, size, stage, measure, baseline value, value)' of the measures of 'report'
+    exceeding those of the same stage in 'baseline_report' by more than the ratio 'tolerance'
+    and by more than their slack. The stages missing from the baseline are ignored. """
+    baseline = {(result['corpus'], result['size'], result['stage']): result for result in baseline_report['results']}
+    found = []
+    for result in report['results']:
+        key = result['corpus'], result['size'], result['stage']
+        if key not in baseline:
+            continue
+        for measure_name in MEASURES:
+            baseline_value = baseline[key][measure_name]
+            if result[measure_name] > max(baseline_value * (1. + tolerance), baseline_value + SLACKS[measure_name]):
+                found.append(key + (measure_name, baseline_value, result[measure_name]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpora', nargs='+', choices=CORPORA, default=list(CORPORA))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--mean-length', type=int, default=20)
+    parser.add_argument('--maximum-factor-length', type=int, default=5)
+    parser.add_argument('--claims', type=int, default=200)
+    parser.add_argument('--collection-size', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    arguments = parser.parse_args()
+    print('corpus\tsize\tstage\ts per operation\tpeak memory (MB)')
+    report = run(arguments)
+    if arguments.output is not None:
+        with open(arguments.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as file:
+            found = regressions(report, json.load(file), arguments.tolerance)
+        print('{} regression(s) above {:.0%} of the baseline'.format(len(found), arguments.tolerance))
+        for corpus, size, stage, measure_name, baseline_value, value in found:
+            print('{}\t{}\t{}\t{}\t{:.6g} -> {:.6g}'.format(corpus, size, stage, measure_name, baseline_value, value))
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
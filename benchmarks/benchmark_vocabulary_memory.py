@@ -0,0 +1,55 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the memory retained by a 'VectorSpace' with dict index maps and with compact vocabularies.
+Run from the root of the package with
+    python -m benchmarks.benchmark_vocabulary_memory [--iterables 100000]
+"""
+
+
+import argparse
+import gc
+import time
+import tracemalloc
+from vector_space import VectorSpace
+from benchmarks.synthetic import synthetic_iterables
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    print('index maps\tconstruction (s)\tretained (MB)\tmatrix (MB)\tvocabularies (MB)')
+    for compact_vocabulary in (False, True):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        iterables = iter(synthetic_iterables(arguments.iterables,
+                                             vocabulary_size=max(1000, arguments.iterables // 10),
+                                             seed=arguments.seed))
+        vector_space = VectorSpace(iterables, compact_vocabulary=compact_vocabulary)
+        elapsed = time.perf_counter() - start
+        del iterables
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        matrix = vector_space.item_iterable_matrix
+        matrix_size = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        if compact_vocabulary:
+            vocabularies_size = '{:.1f}'.format((vector_space.item_to_index.memory_size()
+                                                 + vector_space.iterable_to_index.memory_size()) / 2 ** 20)
+        else:
+            vocabularies_size = '-'
+        print('{}\t{:.3f}\t{:.1f}\t{:.1f}\t{}'.format('compact' if compact_vocabulary else 'dict', elapsed,
+                                                    retained / 2 ** 20, matrix_size / 2 ** 20, vocabularies_size))
+        del vector_space, matrix
+
+
+if __name__ == '__main__':
+    main()
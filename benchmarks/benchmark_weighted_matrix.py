@@ -0,0 +1,80 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Time per query of a 'LearningDistance' with and without 'materialize_weights', for:
+    single: distances between single-iterable collections
+    sparse: distances between collections of '--collection-size' iterables
+    dense: dense vectorizations with 'vectorize'
+    interleaved: one oracle claim learnt every '--reads-per-claim' sparse distances
+Run from the root of the package with
+    python -m benchmarks.benchmark_weighted_matrix [--iterables 100000] [--collection-size 20]
+"""
+
+
+import argparse
+import random
+import time
+from learning_distance import LearningDistance
+from benchmarks.synthetic import synthetic_iterables, synthetic_oracle_claims
+
+
+def time_per_call(function, arguments_list):
+    start = time.perf_counter()
+    for arguments in arguments_list:
+        function(*arguments)
+    return (time.perf_counter() - start) / len(arguments_list)
+
+
+def interleaved(distance, pairs, oracle_claims, reads_per_claim):
+    for position, (collection0, collection1) in enumerate(pairs):
+        distance(collection0, collection1)
+        if position % reads_per_claim == 0:
+            distance.learn_from_one_oracle_claim(oracle_claims[position // reads_per_claim % len(oracle_claims)],
+                                                 effort=0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=100000)
+    parser.add_argument('--collection-size', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--dense-queries', type=int, default=200)
+    parser.add_argument('--reads-per-claim', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    generator = random.Random(arguments.seed)
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables // 10),
+                                    seed=arguments.seed)
+    single_pairs = [([generator.choice(iterables)], [generator.choice(iterables)]) for _ in range(arguments.queries)]
+    pairs = [(generator.sample(iterables, arguments.collection_size),
+              generator.sample(iterables, arguments.collection_size)) for _ in range(arguments.queries)]
+    dense_queries = [(collection0,) for collection0, _ in pairs[:arguments.dense_queries]]
+    print('weights\tsingle (us)\tsparse (us)\tdense (ms)\tinterleaved (us per read)\trefreshes')
+    for materialized in (False, True):
+        distance = LearningDistance(iterables)
+        oracle_claims = synthetic_oracle_claims(distance, iterables, 100, collection_size=arguments.collection_size,
+                                                seed=arguments.seed)
+        start = time.perf_counter()
+        if materialized:
+            distance.materialize_weights()
+        materialization_seconds = time.perf_counter() - start
+        single_seconds = time_per_call(distance, single_pairs)
+        sparse_seconds = time_per_call(distance, pairs)
+        dense_seconds = time_per_call(distance.vectorize, dense_queries)
+        start = time.perf_counter()
+        interleaved(distance, pairs, oracle_claims, arguments.reads_per_claim)
+        interleaved_seconds = (time.perf_counter() - start) / len(pairs)
+        refreshes = distance.weighted_matrix.number_of_refreshes if materialized else '-'
+        print('{}\t{:.1f}\t{:.1f}\t{:.2f}\t{:.1f}\t{}'.format(
+            'materialized ({:.2f} s)'.format(materialization_seconds) if materialized else 'vectors',
+            1e6 * single_seconds, 1e6 * sparse_seconds, 1e3 * dense_seconds, 1e6 * interleaved_seconds, refreshes),
+            flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Compare the computation of the default weights through dictionaries and with the weighting schemes.
+Run from the root of the package with
+    python -m benchmarks.benchmark_weighting [--iterables 200000]
+"""
+
+
+import argparse
+import time
+from distance import normalize_distribution
+from vector_space import VectorSpace
+from weighting import WEIGHTINGS, item_weights_vector_from_weighting, iterable_weights_vector_from_weighting
+from benchmarks.synthetic import synthetic_iterables
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterables', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    iterables = synthetic_iterables(arguments.iterables, vocabulary_size=max(1000, arguments.iterables),
+                                    seed=arguments.seed)
+    vector_space = VectorSpace(iterables)
+    print('weighting\ttime (s)')
+    start = time.perf_counter()
+    document_frequencies = vector_space.document_frequencies()
+    vector_space.item_vector_from_dict(normalize_distribution({item: document_frequencies[index]
+                                                               for item, index in vector_space.item_to_index.items()}))
+    vector_space.iterable_vector_from_dict(normalize_distribution({iterable: 1 / len(iterable)
+                                                                   for iterable in vector_space.iterable_to_index}))
+    print('dictionaries\t{:.3f}'.format(time.perf_counter() - start))
+    for weighting in WEIGHTINGS:
+        start = time.perf_counter()
+        item_weights_vector_from_weighting(vector_space, weighting)
+        iterable_weights_vector_from_weighting(vector_space, weighting)
+        print('{}\t{:.3f}'.format(weighting, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import random
+from itertools import accumulate
+from oracle_claim import OracleClaim
+
+
+def synthetic_iterables(number_of_iterables, vocabulary_size=10000, mean_length=20, seed=0, minimum_length=1):
+    """ Return a list of tuples of integers, which item frequencies follow a Zipf law.
+    The lengths are uniform between 'minimum_length' and '2 * mean_length - minimum_length'. """
+    generator = random.Random(seed)
+    cumulative_weights = zipf_cumulative_weights(vocabulary_size)
+    vocabulary = range(vocabulary_size)
+    return [tuple(generator.choices(vocabulary, cum_weights=cumulative_weights,
+                                    k=generator.randint(minimum_length, 2 * mean_length - minimum_length)))
+            for _ in range(number_of_iterables)]
+
+
+def synthetic_texts(number_of_texts, alphabet_size=30, mean_length=200, seed=0):
+    """ Return a list of strings on the first 'alphabet_size' lowercase letters and following code points,
+    which character frequencies follow a Zipf law. """
+    generator = random.Random(seed)
+    cumulative_weights = zipf_cumulative_weights(alphabet_size)
+    alphabet = [chr(ord('a') + rank) for rank in range(alphabet_size)]
+    return [''.join(generator.choices(alphabet, cum_weights=cumulative_weights,
+                                      k=generator.randint(1, 2 * mean_length - 1)))
+            for _ in range(number_of_texts)]
+
+
+def synthetic_factor_iterables(number_of_iterables, maximum_factor_length=5, alphabet_size=30, seed=0):
+    """ Return a list of 'number_of_iterables' distinct strings, the factors of length at most
+    'maximum_factor_length' of synthetic texts, as in the bags of factors of 'Distance.from_texts'. """
+    factors = dict()
+    for text in synthetic_texts_forever(alphabet_size, seed):
+        for start in range(len(text)):
+            for length in range(1, min(maximum_factor_length, len(text) - start) + 1):
+                factors[text[start:start + length]] = None
+                if len(factors) == number_of_iterables:
+                    return list(factors)
+
+
+def synthetic_texts_forever(alphabet_size, seed):
+    while True:
+        yield from synthetic_texts(100, alphabet_size=alphabet_size, seed=seed)
+        seed += 1
+
+
+def zipf_cumulative_weights(vocabulary_size):
+    return list(accumulate(1. / rank for rank in range(1, vocabulary_size + 1)))
+
+
+def synthetic_oracle_claims(distance, iterables, number_of_claims, collection_size=3, interval_width=0.05, seed=0):
+    """ Return oracle claims on random pairs of collections of 'collection_size' iterables,
+    which intervals are centered on a random move of at most '0.3' of their current distance. """
+    generator = random.Random(seed)
+    oracle_claims = []
+    for _ in range(number_of_claims):
+        iterables0 = set(generator.sample(iterables, collection_size))
+        iterables1 = set(generator.sample(iterables, collection_size))
+        target = min(1., max(0., distance(iterables0, iterables1) + generator.uniform(-0.3, 0.3)))
+        oracle_claims.append(OracleClaim((iterables0, iterables1),
+                                         (max(0., target - interval_width), min(1., target + interval_width))))
+    return oracle_claims
@@ -0,0 +1,73 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+from matrix_operations import *
+
+
+class CollectionIndex:
+    """ Answer exact nearest neighbour queries of a collection of iterables
+    among a fixed catalog of collections of iterables, for the distance 'distance'.
+    The normalized vectorizations of the catalog are computed once,
+    and computed again at the first query following a change of the weights version of 'distance'
+    (for example by 'LearningDistance.learn'). """
+
+    def __init__(self, distance, iterables_collections):
+        self.distance = distance
+        self.iterables_collections = list(iterables_collections)
+        self.catalog_matrix = None
+        self.item_to_catalog_matrix = None
+        self.indexed_weights_version = None
+        self.refresh()
+
+    def __len__(self):
+        return len(self.iterables_collections)
+
+    def refresh(self):
+        normalized_vectorizations, _ = verbose_normalize_columns(
+            self.distance.vectorization_matrix(self.iterables_collections))
+        # Row 'i' of 'catalog_matrix' is the normalized vectorization of the 'i'-th collection of the catalog.
+        # Row 'j' of 'item_to_catalog_matrix' is nonzero on the collections of the catalog containing item 'j'.
+        self.catalog_matrix = normalized_vectorizations.transpose().tocsr()
+        self.item_to_catalog_matrix = normalized_vectorizations.tocsr()
+        self.indexed_weights_version = self.distance.weights_version
+
+    def is_up_to_date(self):
+        return self.indexed_weights_version == self.distance.weights_version
+
+    def nearest(self, iterables, k):
+        """ Return the list of the pairs '(position, distance)' of the 'k' collections of the catalog
+        closest to the collection 'iterables', sorted by increasing distance,
+        where 'position' is the index of the collection in 'self.iterables_collections'. """
+        if not self.is_up_to_date():
+            self.refresh()
+        k = min(k, len(self))
+        # Only the rows of the items of the query and the rows of the catalog sharing one of them are read.
+        item_indices, values, vectorization_norm = self.distance.sparse_vectorize_with_norm(iterables)
+        if vectorization_norm == 0:
+            item_indices, query_values = item_indices[:0], values[:0]
+        else:
+            query_values = values / vectorization_norm
+        candidates = columns_nonzero_on_rows(self.item_to_catalog_matrix, item_indices)
+        distances = 1. - matrix_vector_product(self.catalog_matrix[candidates][:, item_indices], query_values)
+        if len(candidates) > k:
+            selection = np.argpartition(distances, k - 1)[:k]
+            candidates, distances = candidates[selection], distances[selection]
+        order = np.argsort(distances, kind='stable')
+        nearest_pairs = [(int(candidates[i]), float(distances[i])) for i in order]
+        # Collections sharing no item with the query are at distance '1.'.
+        for position in first_indices_not_in(candidates, len(self), k - len(nearest_pairs)):
+            nearest_pairs.append((int(position), 1.))
+        return nearest_pairs
+
+
+def first_indices_not_in(indices, length, number):
+    if number <= 0:
+        return []
+    mask = np.ones(length, dtype=bool)
+    mask[indices] = False
+    return np.flatnonzero(mask)[:number]
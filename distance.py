@@ -6,40 +6,232 @@
 # Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
 
 
+from itertools import islice
 from matrix_operations import *
-from vector_space import VectorSpace
+from vector_space import VectorSpace, index_maps_and_matrix_from_files
+from file_corpus import DEFAULT_MEMORY_BUDGET as DEFAULT_FILE_MEMORY_BUDGET
+from vectorization_cache import VectorizationCache
+from weighted_matrix import WeightedMatrix
+from persistence import save_components, load_components, load_weighting
+from factors import factor_components_from_texts
+from weighting import DEFAULT_WEIGHTING, item_weights_vector_from_weighting, iterable_weights_vector_from_weighting
+
+
+DEFAULT_PAIRWISE_CHUNK_SIZE = 1024
+# Keys of the sparse vectorizations in the vectorization cache, which are distinct from the dense ones.
+SPARSE_VECTORIZATION_KEY = 'sparse'
 
 
 class Distance(VectorSpace):
 
-    def __init__(self, iterables, item_to_weight=None, iterable_to_weight=None):
-        super().__init__(iterables)
+    # Set by 'materialize_weights'.
+    weighted_matrix = None
+
+    def __init__(self, iterables, item_to_weight=None, iterable_to_weight=None, vectorization_cache_size=None,
+                 weighting=DEFAULT_WEIGHTING, **vector_space_options):
+        """ If 'vectorization_cache_size' is provided, the vectorizations of the last
+        'vectorization_cache_size' collections of iterables are kept in memory, until the weights change.
+        The weights that are not provided follow the scheme 'weighting' (see weighting.py).
+        The 'vector_space_options' are passed to the constructor of the vector space (see 'VectorSpace'). """
+        super().__init__(iterables, **vector_space_options)
         #
-        self.item_weights_vector = None
+        self.weights_version = 0
+        self.initialize_vectorization_cache(vectorization_cache_size)
+        self.initialize_weights(item_to_weight, iterable_to_weight, weighting)
+
+    @classmethod
+    def from_components(cls, item_to_index, iterable_to_index, item_iterable_matrix,
+                        item_weights_vector, iterable_weights_vector, vectorization_cache_size=None,
+                        weighting=DEFAULT_WEIGHTING, precision=None, item_iterable_csc_matrix=None):
+        """ The weight vectors are used as they are, without normalization, after conversion to 'precision'.
+        By default, the precision is deduced from the type of the item weights.
+        The scheme 'weighting' is only used for the iterables added later. """
+        if precision is None and item_weights_vector is not None:
+            precision = precision_from_dtype(item_weights_vector.dtype)
+        distance = super().from_components(item_to_index, iterable_to_index, item_iterable_matrix, precision,
+                                           item_iterable_csc_matrix)
+        distance.weighting = weighting
+        distance.weights_version = 0
+        distance.initialize_vectorization_cache(vectorization_cache_size)
+        distance.item_weights_vector = as_vector_of_type(item_weights_vector, distance.float_dtype())
+        distance.iterable_weights_vector = as_vector_of_type(iterable_weights_vector, distance.float_dtype())
+        return distance
+
+    @classmethod
+    def from_texts(cls, texts, maximum_factor_length, minimum_document_frequency=1, maximum_document_frequency=None,
+                   item_to_weight=None, vectorization_cache_size=None, weighting=DEFAULT_WEIGHTING,
+                   precision=DEFAULT_PRECISION):
+        """ The iterables are the factors of the texts, identified by their hashes (see 'VectorSpace.from_texts'),
+        and the collection of iterables of a text is 'distance.iterable_to_index.factors_of_text(text)'.
+        The default weights are those of '__init__'. """
+        item_to_index, iterable_to_index, item_iterable_matrix = factor_components_from_texts(
+            texts, maximum_factor_length, minimum_document_frequency, maximum_document_frequency,
+            count_dtype_from_precision(precision))
+        distance = cls.from_components(item_to_index, iterable_to_index, item_iterable_matrix, None, None,
+                                       vectorization_cache_size=vectorization_cache_size, precision=precision)
+        distance.initialize_weights(item_to_weight, None, weighting)
+        return distance
+
+    @classmethod
+    def from_files(cls, paths, directory=None, read_file=None, item_to_weight=None, iterable_to_weight=None,
+                   vectorization_cache_size=None, weighting=DEFAULT_WEIGHTING, compact_vocabulary=False,
+                   memory_budget=DEFAULT_FILE_MEMORY_BUDGET, precision=DEFAULT_PRECISION):
+        """ The iterables are read from the files 'paths' and their matrix is built out of core in 'directory'
+        (see 'VectorSpace.from_files'). The default weights are those of '__init__'. """
+        check_precision(precision)
+        distance = cls.from_components(*index_maps_and_matrix_from_files(paths, directory, read_file,
+                                                                         compact_vocabulary, memory_budget,
+                                                                         count_dtype_from_precision(precision)),
+                                       None, None, vectorization_cache_size=vectorization_cache_size,
+                                       precision=precision)
+        distance.initialize_weights(item_to_weight, iterable_to_weight, weighting)
+        return distance
+
+    def initialize_weights(self, item_to_weight, iterable_to_weight, weighting):
+        self.weighting = weighting
         if item_to_weight is None:
-            item_to_weight = self.tfidf_item_weights()
-        self.set_item_weights(item_to_weight)
-        #
-        self.iterable_weights_vector = None
+            self.item_weights_vector = item_weights_vector_from_weighting(self, weighting)
+            self.notify_weights_change()
+        else:
+            self.set_item_weights(item_to_weight)
         if iterable_to_weight is None:
-            iterable_to_weight = {iterable: 1 / len(iterable) for iterable in self.iterable_to_index}
-        self.set_iterable_weights(iterable_to_weight)
+            self.iterable_weights_vector = iterable_weights_vector_from_weighting(self, weighting)
+            self.notify_weights_change()
+        else:
+            self.set_iterable_weights(iterable_to_weight)
+
+    def save(self, path):
+        """ Write the matrix, the weights and the index maps in the directory 'path' (see persistence.py).
+        Removed iterables are compacted first. """
+        if self.removed_iterable_indices:
+            self.compact()
+        save_components(path, self.item_to_index, self.iterable_to_index, self.item_iterable_matrix,
+                        self.item_weights_vector, self.iterable_weights_vector, self.weighting)
+
+    @classmethod
+    def load(cls, path, mmap=True, vectorization_cache_size=None):
+        """ With 'mmap', the arrays are memory-mapped and shared by all the processes loading 'path'.
+        They are read-only, and replaced by copies when the weights change.
+        The weighting scheme of the saved distance is restored, for the iterables added later. """
+        return cls.from_components(*load_components(path, mmap=mmap), vectorization_cache_size=vectorization_cache_size,
+                                   weighting=load_weighting(path))
+
+    def initialize_vectorization_cache(self, vectorization_cache_size):
+        self.vectorization_cache = None
+        if vectorization_cache_size is not None:
+            self.vectorization_cache = VectorizationCache(vectorization_cache_size)
+
+    def materialize_weights(self, enabled=True):
+        """ With 'enabled', the vectorizations are sums of columns of the weighted matrix
+        'diag(item_weights) @ item_iterable_matrix @ diag(iterable_weights)', stored once,
+        and updated lazily by the rescalings of the weights (see weighted_matrix.py). """
+        self.weighted_matrix = WeightedMatrix(self) if enabled else None
+
+    def current_weighted_matrix(self):
+        """ Return the materialized weighted matrix, built again if the weights changed since,
+        otherwise than by 'rescale_weights', or None if the weights are not materialized. """
+        if self.weighted_matrix is not None and self.weighted_matrix.weights_version != self.weights_version:
+            self.weighted_matrix = WeightedMatrix(self)
+        return self.weighted_matrix
 
     def __call__(self, iterables0, iterables1):
-        distance, _, _, _, _, _, _ = self.verbose_distance(iterables0, iterables1)
-        return distance
+        """ Computed on the sparse supports of the vectorizations (see 'sparse_vectorize_with_norm'). """
+        item_indices0, values0, norm0 = self.sparse_vectorize_with_norm(iterables0)
+        item_indices1, values1, norm1 = self.sparse_vectorize_with_norm(iterables1)
+        return sparse_cosine_distance_from_norms(item_indices0, values0, norm0, item_indices1, values1, norm1)
 
     def vectorize(self, iterables):
         vectorization, _ = self.verbose_vectorize(iterables)
         return vectorization
 
+    def pairwise(self, iterables_collections0, iterables_collections1):
+        """ Return the array of the distances between each collection of iterables from 'iterables_collections0'
+        (rows) and each collection of iterables from 'iterables_collections1' (columns). """
+        normalized_vectorizations0, _ = verbose_normalize_columns(self.vectorization_matrix(iterables_collections0))
+        normalized_vectorizations1, _ = verbose_normalize_columns(self.vectorization_matrix(iterables_collections1))
+        return cosine_distance_matrix(normalized_vectorizations0, normalized_vectorizations1)
+
+    def pairwise_chunks(self, iterables_collections0, iterables_collections1, chunk_size=DEFAULT_PAIRWISE_CHUNK_SIZE):
+        """ Yield the rows of 'self.pairwise(iterables_collections0, iterables_collections1)' in consecutive blocks
+        of at most 'chunk_size' rows. 'iterables_collections0' is consumed lazily and may be a generator. """
+        normalized_vectorizations1, _ = verbose_normalize_columns(self.vectorization_matrix(iterables_collections1))
+        iterables_collections0 = iter(iterables_collections0)
+        chunk = list(islice(iterables_collections0, chunk_size))
+        while chunk:
+            normalized_vectorizations0, _ = verbose_normalize_columns(self.vectorization_matrix(chunk))
+            yield cosine_distance_matrix(normalized_vectorizations0, normalized_vectorizations1)
+            chunk = list(islice(iterables_collections0, chunk_size))
+
+    def vectorization_matrix(self, iterables_collections):
+        """ Return the sparse matrix which 'j'-th column is the vectorization of the 'j'-th collection of iterables. """
+        iterables_matrix = self.iterable_matrix_from_collections(iterables_collections)
+        return dot_matrix_dot_matrix_products(self.item_weights_vector, self.item_iterable_matrix,
+                                              self.iterable_weights_vector, iterables_matrix)
+
+    def sparse_vectorization_matrix(self, iterables_collections):
+        """ Same as 'vectorization_matrix', only reading the columns of the iterables of the collections,
+        so that the cost does not depend on the number of iterables of the vector space. """
+        collections_indices = [self.iterable_indices_from_collection(iterables) for iterables in iterables_collections]
+        all_indices = np.concatenate(collections_indices + [np.zeros(0, dtype=np.int64)])
+        iterable_indices, positions = np.unique(all_indices, return_inverse=True)
+        collection_positions = np.repeat(np.arange(len(collections_indices)),
+                                         [len(indices) for indices in collections_indices])
+        weighted_matrix = self.current_weighted_matrix()
+        # Row 'k' of 'iterables_matrix' holds the weight of the iterable 'iterable_indices[k]'
+        # in the collections containing it, or '1' if the weights are materialized.
+        iterables_matrix = matrix_from_index_arrays(positions, collection_positions,
+                                                    (len(iterable_indices), len(collections_indices)),
+                                                    data=None if weighted_matrix is not None
+                                                    else self.iterable_weights_vector[all_indices],
+                                                    dtype=self.float_dtype()).tocsc()
+        if weighted_matrix is not None:
+            return (weighted_matrix.columns(iterable_indices) @ iterables_matrix).tocsc()
+        columns = columns_of_csc_matrix(self.item_iterable_csc_matrix(), iterable_indices)
+        return scale_rows(columns @ iterables_matrix, self.item_weights_vector)
+
+    def normalized_vectorization_rows(self, iterables_collections, chunk_size=DEFAULT_PAIRWISE_CHUNK_SIZE):
+        """ Return the csr matrix which 'k'-th row is the normalized vectorization of the 'k'-th collection
+        of iterables, computed by 'sparse_vectorization_matrix' on chunks of 'chunk_size' collections.
+        The vectorizations of norm zero are left unchanged. """
+        iterables_collections = iter(iterables_collections)
+        chunks = []
+        chunk = list(islice(iterables_collections, chunk_size))
+        while chunk:
+            normalized_vectorizations, _ = verbose_normalize_columns(self.sparse_vectorization_matrix(chunk))
+            chunks.append(csr_matrix(transpose_matrix(normalized_vectorizations)))
+            chunk = list(islice(iterables_collections, chunk_size))
+        return vertical_stack(chunks, len(self.item_weights_vector))
+
     def set_item_weights(self, item_to_weight):
         item_to_weight = normalize_distribution(item_to_weight)
         self.item_weights_vector = self.item_vector_from_dict(item_to_weight)
+        self.notify_weights_change()
 
     def set_iterable_weights(self, iterable_to_weight):
         iterable_to_weight = normalize_distribution(iterable_to_weight)
         self.iterable_weights_vector = self.iterable_vector_from_dict(iterable_to_weight)
+        self.notify_weights_change()
+
+    def notify_weights_change(self):
+        """ Must be called after each change of 'item_weights_vector' or 'iterable_weights_vector'. """
+        self.weights_version += 1
+
+    def rescale_weights(self, item_indices, item_rescaling, iterable_indices, iterable_rescaling):
+        """ Multiply in place the weights of the items 'item_indices' by 'item_rescaling',
+        and those of the iterables 'iterable_indices' by 'iterable_rescaling'.
+        Read-only weight vectors, such as the memory mapped ones of 'load', are copied first. """
+        if not self.item_weights_vector.flags.writeable:
+            self.item_weights_vector = self.item_weights_vector.copy()
+        if not self.iterable_weights_vector.flags.writeable:
+            self.iterable_weights_vector = self.iterable_weights_vector.copy()
+        self.item_weights_vector[item_indices] *= item_rescaling
+        self.iterable_weights_vector[iterable_indices] *= iterable_rescaling
+        weighted_matrix_is_current = (self.weighted_matrix is not None
+                                      and self.weighted_matrix.weights_version == self.weights_version)
+        self.notify_weights_change()
+        if weighted_matrix_is_current:
+            self.weighted_matrix.rescale(item_indices, item_rescaling, iterable_indices, iterable_rescaling,
+                                         self.weights_version)
 
     def get_item_weights(self):
         return self.item_dict_from_vector(self.item_weights_vector)
@@ -47,24 +239,110 @@ class Distance(VectorSpace):
     def get_iterable_weights(self):
         return self.iterable_dict_from_vector(self.iterable_weights_vector)
 
+    def add_iterables(self, iterables):
+        """ The weights of the existing items and iterables are kept. The new ones get the weights
+        of the scheme 'weighting', normalized as in a distance built from scratch. """
+        number_of_items = len(self.item_weights_vector)
+        number_of_iterables = len(self.iterable_weights_vector)
+        new_iterables = super().add_iterables(iterables)
+        item_weights = item_weights_vector_from_weighting(self, self.weighting)
+        iterable_weights = iterable_weights_vector_from_weighting(self, self.weighting)
+        self.item_weights_vector = np.concatenate([self.item_weights_vector, item_weights[number_of_items:]])
+        self.iterable_weights_vector = np.concatenate([self.iterable_weights_vector,
+                                                       iterable_weights[number_of_iterables:]])
+        self.notify_weights_change()
+        return new_iterables
+
+    def remove_iterables(self, iterables):
+        iterables = list(iterables)
+        removed_iterable_indices = [self.iterable_to_index[iterable] for iterable in iterables]
+        self.iterable_weights_vector = self.iterable_weights_vector.copy()
+        self.iterable_weights_vector[removed_iterable_indices] = 0.
+        super().remove_iterables(iterables)
+        self.notify_weights_change()
+
+    def compact(self):
+        kept_iterable_indices = super().compact()
+        self.iterable_weights_vector = self.iterable_weights_vector[kept_iterable_indices]
+        self.notify_weights_change()
+        return kept_iterable_indices
+
+    def inverse_length_iterable_weights(self):
+        return {iterable: 1 / len(iterable) for iterable in self.iterable_to_index}
+
     def tfidf_item_weights(self):
         iterable_number = len(self.iterable_to_index)
+        document_frequencies = self.document_frequencies()
         # We use log_of_ratio_zero_if_null_denominator to handle the case
-        # where the only iterable containing an item has been removed (operation currently not supported).
-        return {item: log_of_ratio_zero_if_null_denominator(iterable_number, self.count_iterables_containing_item(item))
-                for item in self.item_to_index}
+        # where the only iterable containing an item has been removed.
+        return {item: log_of_ratio_zero_if_null_denominator(iterable_number, document_frequencies[index])
+                for item, index in self.item_to_index.items()}
 
     def verbose_distance(self, iterables0, iterables1):
-        vectorization0, iterables_vector0 = self.verbose_vectorize(iterables0)
-        vectorization1, iterables_vector1 = self.verbose_vectorize(iterables1)
-        distance, norm0, norm1 = verbose_cosine_distance(vectorization0, vectorization1)
+        vectorization0, iterables_vector0, norm0 = self.verbose_vectorize_with_norm(iterables0)
+        vectorization1, iterables_vector1, norm1 = self.verbose_vectorize_with_norm(iterables1)
+        distance, norm0, norm1 = verbose_cosine_distance_from_norms(vectorization0, norm0, vectorization1, norm1)
         return distance, iterables_vector0, vectorization0, norm0, iterables_vector1, vectorization1, norm1
 
     def verbose_vectorize(self, iterables):
+        vectorization, iterables_vector, _ = self.verbose_vectorize_with_norm(iterables)
+        return vectorization, iterables_vector
+
+    def verbose_vectorize_with_norm(self, iterables):
+        """ When the vectorization cache is enabled, the returned vectors are shared with the cache and read-only. """
+        if self.vectorization_cache is None:
+            return self.compute_verbose_vectorization(iterables)
+        key = frozenset(iterables)
+        entry = self.vectorization_cache.get(key, self.weights_version)
+        if entry is None:
+            vectorization, iterables_vector, vectorization_norm = self.compute_verbose_vectorization(iterables)
+            entry = make_read_only(vectorization), make_read_only(iterables_vector), vectorization_norm
+            self.vectorization_cache.put(key, entry, self.weights_version)
+        return entry
+
+    def sparse_vectorize_with_norm(self, iterables):
+        """ Return the sorted indices of the nonzero coefficients of the vectorization of 'iterables',
+        the values of those coefficients, and the norm of the vectorization.
+        Only the columns of 'iterables' are read, so that the cost does not depend on the number of iterables
+        of the vector space. The vectorization cache is used as in 'verbose_vectorize_with_norm'. """
+        if self.vectorization_cache is None:
+            return self.compute_sparse_vectorization(iterables)
+        key = (SPARSE_VECTORIZATION_KEY, frozenset(iterables))
+        entry = self.vectorization_cache.get(key, self.weights_version)
+        if entry is None:
+            item_indices, values, vectorization_norm = self.compute_sparse_vectorization(iterables)
+            entry = make_read_only(item_indices), make_read_only(values), vectorization_norm
+            self.vectorization_cache.put(key, entry, self.weights_version)
+        return entry
+
+    def compute_sparse_vectorization(self, iterables):
+        return self.sparse_vectorize_iterable_indices(self.iterable_indices_from_collection(iterables))
+
+    def sparse_vectorize_iterable_indices(self, iterable_indices):
+        """ Same as 'compute_sparse_vectorization', for the distinct 'iterable_indices'. """
+        if self.current_weighted_matrix() is not None:
+            return self.weighted_matrix.sparse_vectorize_with_norm(iterable_indices)
+        item_indices, values = sparse_dot_columns_dot_products(
+            self.item_weights_vector, columns_of_csc_matrix(self.item_iterable_csc_matrix(), iterable_indices),
+            self.iterable_weights_vector[iterable_indices])
+        return item_indices, values, norm(values)
+
+    def compute_verbose_vectorization(self, iterables):
         iterables_vector = self.iterable_vector_from_collection(iterables)
+        if self.current_weighted_matrix() is not None:
+            vectorization = self.weighted_matrix.vectorize(iterables_vector)
+            return vectorization, iterables_vector, norm(vectorization)
         vectorization = dot_matrix_dot_products(self.item_weights_vector, self.item_iterable_matrix,
                                                 self.iterable_weights_vector, iterables_vector)
-        return vectorization, iterables_vector
+        return vectorization, iterables_vector, norm(vectorization)
+
+
+def as_vector_of_type(vector, dtype):
+    """ Return 'vector' itself, possibly memory mapped, if it already has type 'dtype',
+    and a converted copy otherwise. """
+    if vector is None:
+        return None
+    return vector.astype(dtype, copy=False)
 
 
 def log_of_ratio_zero_if_null_denominator(numerator, denominator):
@@ -0,0 +1,301 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Serving of the distances and vectorizations of a 'Distance' to concurrent clients, threads or asyncio tasks.
+
+The requests are queued, and a single worker thread collects them into micro-batches: a batch starts with the
+first waiting request and gathers the requests arriving within 'batch_window' seconds, up to 'maximum_batch_size'.
+The vectorizations of all the collections of a batch are computed at once by 'Distance.sparse_vectorization_matrix'.
+A batch of a single request, or whose matrix computation fails (for example on an unknown iterable),
+is answered request by request by the distance, so that an error only reaches the request causing it.
+
+The requests are computed on a snapshot of the distance: a shallow copy sharing its matrix and index maps,
+whose weight vectors are those of the distance at the last publication, made read-only.
+Publishing is copy-on-write: the weight vectors are not copied when published, but by 'Distance.rescale_weights'
+at the next update of the weights, so that learning never modifies the vectors read by a batch in flight.
+Learning through 'DistanceServer.learn' publishes the weights when it ends, and every 'publication_period' claims.
+Adding or removing iterables modifies the index maps shared with the snapshot, and must not run while serving.
+
+'DistanceServer.learn_stream' learns online from an iterator of claims, such as a generator, read by groups of
+'batch_size' claims so that only one group is held in memory, each claim being learnt once.
+The weights are published every 'publication_period' claims and after 'publication_interval' seconds, whichever
+comes first. 'async_learn_stream' does the same from an 'asyncio.Queue', learning in the default executor
+so that the event loop keeps running. A publication replaces the snapshot by a single assignment, and a snapshot
+is never modified, so that readers of 'current_distance' switch to the new weights without lock.
+"""
+
+
+import asyncio
+import copy
+import threading
+import time
+from concurrent.futures import Future
+from itertools import islice
+from queue import SimpleQueue, Empty
+from matrix_operations import *
+from oracle_claim_set import OracleClaimSet
+
+
+DEFAULT_BATCH_WINDOW = 0.002
+DEFAULT_MAXIMUM_BATCH_SIZE = 256
+DEFAULT_STREAM_PUBLICATION_PERIOD = 1000
+DISTANCE_REQUEST = 'distance'
+VECTORIZE_REQUEST = 'vectorize'
+
+
+class DistanceServer:
+
+    def __init__(self, distance, batch_window=DEFAULT_BATCH_WINDOW, maximum_batch_size=DEFAULT_MAXIMUM_BATCH_SIZE):
+        if maximum_batch_size < 1:
+            raise ValueError('maximum_batch_size must be positive, got {}'.format(maximum_batch_size))
+        self.distance = distance
+        self.batch_window = batch_window
+        self.maximum_batch_size = maximum_batch_size
+        self.number_of_requests = 0
+        self.number_of_batches = 0
+        self.learning_lock = threading.RLock()
+        self.submission_lock = threading.Lock()
+        self.closed = False
+        self.snapshot = None
+        self.number_of_publications = 0
+        self.publish()
+        self.requests = SimpleQueue()
+        self.worker = threading.Thread(target=self.serve, name='DistanceServer', daemon=True)
+        self.worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+    def close(self):
+        """ Answer the requests already submitted, then stop the worker thread. """
+        with self.submission_lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.requests.put(None)
+        self.worker.join()
+
+    def publish(self):
+        """ Make the current weights of the distance visible to the next batches. """
+        with self.learning_lock:
+            # Merges the added iterables, and computes the column-major matrix shared with the snapshot.
+            self.distance.item_iterable_csc_matrix()
+            snapshot = copy.copy(self.distance)
+            snapshot.item_weights_vector = make_read_only(self.distance.item_weights_vector)
+            snapshot.iterable_weights_vector = make_read_only(self.distance.iterable_weights_vector)
+            snapshot.initialize_vectorization_cache(None)
+            if self.distance.current_weighted_matrix() is not None:
+                # The pending factors of the materialized weights are copied on write as well.
+                snapshot.weighted_matrix = self.distance.weighted_matrix.snapshot()
+            self.snapshot = snapshot
+            self.number_of_publications += 1
+
+    def current_distance(self):
+        """ Return the distance of the last publication, which may be queried directly by any thread:
+        it is never modified, a later publication replacing it by another one. """
+        return self.snapshot
+
+    def learn(self, oracle_claims, publication_period=None, **learning_options):
+        """ Learn from 'oracle_claims' with 'self.distance.learn(oracle_claims, **learning_options)'.
+        With 'publication_period', the claims are learnt by consecutive groups of 'publication_period' claims,
+        each one with its own call to 'learn', and the weights are published after each group. """
+        if not isinstance(oracle_claims, OracleClaimSet):
+            oracle_claims = list(oracle_claims)
+        publication_period = publication_period or max(len(oracle_claims), 1)
+        with self.learning_lock:
+            for start in range(0, len(oracle_claims), publication_period):
+                self.distance.learn(oracle_claims[start:start + publication_period], **learning_options)
+                self.publish()
+
+    def learn_stream(self, oracle_claims, publication_period=DEFAULT_STREAM_PUBLICATION_PERIOD,
+                     publication_interval=None, batch_size=None, ratio_item_iterable_learning=0.5,
+                     convergence_speed=0.5):
+        """ Learn once from each claim of the iterator 'oracle_claims', one by one or, with 'batch_size',
+        by batches (see 'LearningDistance.learn'), and publish the weights every 'publication_period' claims,
+        after 'publication_interval' seconds, and at the end of the iterator. Either period may be 'None'.
+        The interval is checked when claims arrive. Return the number of claims learnt. """
+        schedule = PublicationSchedule(publication_period, publication_interval)
+        oracle_claims = iter(oracle_claims)
+        oracle_claims_group = list(islice(oracle_claims, batch_size or 1))
+        while oracle_claims_group:
+            self.learn_group(oracle_claims_group, schedule, batch_size, ratio_item_iterable_learning,
+                             convergence_speed)
+            oracle_claims_group = list(islice(oracle_claims, batch_size or 1))
+        self.publish()
+        return schedule.number_of_claims
+
+    async def async_learn_stream(self, oracle_claims_queue, publication_period=DEFAULT_STREAM_PUBLICATION_PERIOD,
+                                 publication_interval=None, batch_size=None, ratio_item_iterable_learning=0.5,
+                                 convergence_speed=0.5):
+        """ Same as 'learn_stream', for the claims put in the 'asyncio.Queue' 'oracle_claims_queue',
+        until a 'None'. The claims learnt are published after 'publication_interval' seconds
+        even when no other claim arrives. """
+        loop = asyncio.get_running_loop()
+        schedule = PublicationSchedule(publication_period, publication_interval)
+        ended = False
+        while not ended:
+            oracle_claims_group = []
+            while len(oracle_claims_group) < (batch_size or 1):
+                try:
+                    oracle_claim = await asyncio.wait_for(oracle_claims_queue.get(),
+                                                          schedule.seconds_before_publication())
+                except asyncio.TimeoutError:
+                    break
+                if oracle_claim is None:
+                    ended = True
+                    break
+                oracle_claims_group.append(oracle_claim)
+            await loop.run_in_executor(None, self.learn_group, oracle_claims_group, schedule, batch_size,
+                                       ratio_item_iterable_learning, convergence_speed)
+        await loop.run_in_executor(None, self.publish)
+        return schedule.number_of_claims
+
+    def learn_group(self, oracle_claims, schedule, batch_size, ratio_item_iterable_learning, convergence_speed):
+        with self.learning_lock:
+            if oracle_claims:
+                self.distance.learn(oracle_claims, ratio_item_iterable_learning, convergence_speed,
+                                    number_of_iterations=1, batch_size=batch_size)
+            if schedule.count_claims(len(oracle_claims)):
+                self.publish()
+
+    def __call__(self, iterables0, iterables1):
+        return self.submit(iterables0, iterables1).result()
+
+    def vectorize(self, iterables):
+        return self.submit_vectorize(iterables).result()
+
+    async def async_distance(self, iterables0, iterables1):
+        return await asyncio.wrap_future(self.submit(iterables0, iterables1))
+
+    async def async_vectorize(self, iterables):
+        return await asyncio.wrap_future(self.submit_vectorize(iterables))
+
+    def submit(self, iterables0, iterables1):
+        """ Return a 'concurrent.futures.Future' of the distance between the two collections of iterables. """
+        return self.submit_request(DISTANCE_REQUEST, [list(iterables0), list(iterables1)])
+
+    def submit_vectorize(self, iterables):
+        """ Return a 'concurrent.futures.Future' of the vectorization of the collection of iterables. """
+        return self.submit_request(VECTORIZE_REQUEST, [list(iterables)])
+
+    def submit_request(self, kind, iterables_collections):
+        future = Future()
+        with self.submission_lock:
+            if self.closed:
+                raise RuntimeError('the distance server is closed')
+            self.requests.put((kind, iterables_collections, future))
+        return future
+
+    def serve(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.maximum_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=timeout)
+                except Empty:
+                    break
+                if request is None:
+                    self.answer_batch(batch)
+                    return
+                batch.append(request)
+            self.answer_batch(batch)
+
+    def answer_batch(self, batch):
+        batch = [request for request in batch if request[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        snapshot = self.snapshot
+        self.number_of_requests += len(batch)
+        self.number_of_batches += 1
+        answers = None
+        # A single request is cheaper to answer by the sparse computation of 'Distance' than by a matrix.
+        if len(batch) > 1:
+            try:
+                answers = batch_answers(snapshot, batch)
+            except Exception:
+                answers = None
+        if answers is None:
+            for kind, iterables_collections, future in batch:
+                try:
+                    future.set_result(single_answer(snapshot, kind, iterables_collections))
+                except Exception as exception:
+                    future.set_exception(exception)
+            return
+        for (_, _, future), answer in zip(batch, answers):
+            future.set_result(answer)
+
+
+class PublicationSchedule:
+    """ Tell when to publish the claims learnt: every 'publication_period' claims,
+    and 'publication_interval' seconds after the first claim learnt since the last publication. """
+
+    def __init__(self, publication_period, publication_interval):
+        self.publication_period = publication_period
+        self.publication_interval = publication_interval
+        self.number_of_claims = 0
+        self.number_of_unpublished_claims = 0
+        self.deadline = None
+
+    def count_claims(self, number_of_claims):
+        """ Record 'number_of_claims' learnt claims, and return whether to publish. """
+        self.number_of_claims += number_of_claims
+        self.number_of_unpublished_claims += number_of_claims
+        if self.deadline is None and self.number_of_unpublished_claims and self.publication_interval is not None:
+            self.deadline = time.monotonic() + self.publication_interval
+        if not self.number_of_unpublished_claims:
+            return False
+        if ((self.publication_period is not None and self.number_of_unpublished_claims >= self.publication_period)
+                or (self.deadline is not None and time.monotonic() >= self.deadline)):
+            self.number_of_unpublished_claims = 0
+            self.deadline = None
+            return True
+        return False
+
+    def seconds_before_publication(self):
+        """ Return the time left before the publication deadline, or 'None' if there is none. """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.)
+
+
+def batch_answers(distance, batch):
+    """ Return the answers to the requests of 'batch', computed from one matrix of vectorizations. """
+    iterables_collections = [iterables for _, collections, _ in batch for iterables in collections]
+    vectorizations = distance.sparse_vectorization_matrix(iterables_collections)
+    first_columns = np.cumsum([0] + [len(collections) for _, collections, _ in batch])[:-1]
+    distance_requests = [position for position, (kind, _, _) in enumerate(batch) if kind == DISTANCE_REQUEST]
+    answers = [None] * len(batch)
+    if distance_requests:
+        columns0 = first_columns[distance_requests]
+        normalized_vectorizations, _ = verbose_normalize_columns(vectorizations[:, np.concatenate([columns0,
+                                                                                                  columns0 + 1])])
+        # Columns of norm zero stay zero, so that their distance is '1.', as in 'sparse_cosine_distance_from_norms'.
+        distances = 1. - column_wise_scalar_products(normalized_vectorizations[:, :len(columns0)],
+                                                     normalized_vectorizations[:, len(columns0):])
+        for position, value in zip(distance_requests, distances):
+            answers[position] = float(value)
+    for position, (kind, _, _) in enumerate(batch):
+        if kind == VECTORIZE_REQUEST:
+            answers[position] = vectorizations[:, first_columns[position]].toarray().ravel()
+    return answers
+
+
+def single_answer(distance, kind, iterables_collections):
+    if kind == DISTANCE_REQUEST:
+        return distance(*iterables_collections)
+    return distance.vectorize(iterables_collections[0])
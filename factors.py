@@ -0,0 +1,188 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Bags of factors of texts, computed with NumPy without creating a Python object per factor.
+The iterables are the factors of length at most 'maximum_factor_length' of the texts, and their items are characters.
+Each factor is identified by a 64 bits polynomial rolling hash of its characters (see 'factor_hash'),
+which collides for two distinct factors with a probability of order 'number_of_factors ** 2 / 2 ** 64'.
+"""
+
+
+from array import array
+from collections.abc import Mapping
+import numpy as np
+from matrix_operations import (matrix_from_column_row_indices, index_dtype_from_length, nonzero_rows,
+                               rows_of_matrix)
+
+
+HASH_BASE = 0x100000001b3
+HASH_MODULUS = 2 ** 64
+DEFAULT_FACTOR_BUFFER_SIZE = 2 ** 18
+
+
+class FactorIndex(Mapping):
+    """ Read-only index map from the hashes of factors to consecutive indices,
+    stored as the sorted array of the hashes: the index of a hash is its position in the array.
+    Iterables can therefore not be added to or removed from a vector space using it. """
+
+    def __init__(self, hashes, maximum_factor_length):
+        self.hashes = hashes
+        self.maximum_factor_length = maximum_factor_length
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __iter__(self):
+        return iter(self.hashes.tolist())
+
+    def items(self):
+        return zip(self.hashes.tolist(), range(len(self.hashes)))
+
+    def __getitem__(self, factor_hash):
+        index = self.find(factor_hash)
+        if index < 0:
+            raise KeyError(factor_hash)
+        return index
+
+    def __contains__(self, factor_hash):
+        return self.find(factor_hash) >= 0
+
+    def find(self, factor_hash):
+        """ Return the index of 'factor_hash', or '-1'. """
+        if not isinstance(factor_hash, (int, np.uint64)) or not 0 <= factor_hash < HASH_MODULUS:
+            return -1
+        # Searching a Python integer would convert it to a float.
+        factor_hash = np.uint64(factor_hash)
+        index = int(np.searchsorted(self.hashes, factor_hash))
+        if index == len(self.hashes) or self.hashes[index] != factor_hash:
+            return -1
+        return index
+
+    def factors_of_text(self, text):
+        """ Return the list of the hashes of the factors of 'text' that are in the index,
+        to be used as a collection of iterables. """
+        hashes = factor_hashes(text, self.maximum_factor_length)
+        return hashes[np.isin(hashes, self.hashes, assume_unique=True)].tolist()
+
+
+def factor_hash(factor):
+    """ Hash of the string 'factor', equal to the one computed by 'factor_hashes'. """
+    hash_value = 0
+    for character in factor:
+        hash_value = (hash_value * HASH_BASE + ord(character) + 1) % HASH_MODULUS
+    return hash_value
+
+
+def factor_hashes(text, maximum_factor_length):
+    """ Return the sorted array of the distinct hashes of the factors of 'text'. """
+    hashes, _, _ = factor_hashes_with_positions(code_points_of_text(text), maximum_factor_length)
+    return np.unique(hashes)
+
+
+def code_points_of_text(text):
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+
+
+def factor_hashes_with_positions(code_points, maximum_factor_length):
+    """ Return the hashes, start positions and lengths of all the factor occurrences of 'code_points',
+    the hashes of the factors of length 'k + 1' being computed from those of length 'k'. """
+    shifted_code_points = code_points.astype(np.uint64) + np.uint64(1)
+    hashes, starts, lengths = [], [], []
+    length_hashes = np.zeros(len(code_points), dtype=np.uint64)
+    for length in range(1, min(maximum_factor_length, len(code_points)) + 1):
+        length_hashes = length_hashes[:-1] if length > 1 else length_hashes
+        length_hashes = length_hashes * np.uint64(HASH_BASE) + shifted_code_points[length - 1:]
+        hashes.append(length_hashes)
+        starts.append(np.arange(len(length_hashes)))
+        lengths.append(np.full(len(length_hashes), length))
+    if not hashes:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(hashes), np.concatenate(starts), np.concatenate(lengths)
+
+
+def factor_components_from_texts(texts, maximum_factor_length, minimum_document_frequency=1,
+                                 maximum_document_frequency=None, dtype=np.int64):
+    """ Return the index maps and the item / iterable matrix of the vector space whose iterables are
+    the factors of length at most 'maximum_factor_length' of the texts, the index map of the iterables being
+    a 'FactorIndex'. The factors contained in fewer than 'minimum_document_frequency' texts,
+    or in more than 'maximum_document_frequency' texts, are dropped.
+    'texts' is read once, so it may be a one-shot generator: only the code points of the texts and
+    the distinct factors seen so far, with their document frequencies, are kept in arrays.
+    The counts of the matrix have type 'dtype'. """
+    code_points = array('I')
+    factor_counts = FactorCounts()
+    for text in texts:
+        text_code_points = code_points_of_text(text)
+        factor_counts.add_text(text_code_points, len(code_points), maximum_factor_length)
+        code_points.frombytes(text_code_points.tobytes())
+    code_points = np.frombuffer(code_points, dtype=np.uint32)
+    hashes, document_frequencies, starts, lengths = factor_counts.merged()
+    kept = document_frequencies >= minimum_document_frequency
+    if maximum_document_frequency is not None:
+        kept &= document_frequencies <= maximum_document_frequency
+    hashes, starts, lengths = hashes[kept], starts[kept], lengths[kept]
+    # The characters of each kept factor are read at one of its occurrences,
+    # all the characters of the texts being rows of the matrix until the empty rows are dropped.
+    characters = np.unique(code_points)
+    item_indices = item_indices_of_factors(code_points, characters, starts, lengths, maximum_factor_length)
+    matrix = matrix_from_column_row_indices(item_indices, lengths, (len(characters), len(hashes)), dtype=dtype)
+    kept_rows = nonzero_rows(matrix)
+    matrix = rows_of_matrix(matrix, kept_rows)
+    item_to_index = {chr(code_point): index for index, code_point in enumerate(characters[kept_rows].tolist())}
+    return item_to_index, FactorIndex(hashes, maximum_factor_length), matrix
+
+
+def item_indices_of_factors(code_points, characters, starts, lengths, maximum_factor_length):
+    """ Return the concatenation of the indices in 'characters' of the characters of the factors. """
+    item_indices_of_code_points = np.searchsorted(characters, code_points).astype(
+        index_dtype_from_length(len(characters)))
+    positions = starts[:, np.newaxis] + np.arange(maximum_factor_length)
+    in_factors = np.arange(maximum_factor_length) < lengths[:, np.newaxis]
+    return item_indices_of_code_points[np.minimum(positions, len(code_points) - 1)[in_factors]]
+
+
+class FactorCounts:
+    """ Sorted arrays of the distinct factors seen so far, with their document frequencies
+    and the start and length of one of their occurrences.
+    The distinct factors of the last texts are buffered, and merged once they reach 'buffer_size'. """
+
+    def __init__(self, buffer_size=DEFAULT_FACTOR_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.document_frequencies = np.zeros(0, dtype=np.int32)
+        self.starts = np.zeros(0, dtype=np.int64)
+        self.lengths = np.zeros(0, dtype=np.int32)
+        self.buffered_arrays = []
+        self.buffered_size = 0
+
+    def add_text(self, code_points, offset, maximum_factor_length):
+        """ 'offset' is the position of the text among the code points of all the texts. """
+        hashes, starts, lengths = factor_hashes_with_positions(code_points, maximum_factor_length)
+        hashes, first_occurrences = np.unique(hashes, return_index=True)
+        self.buffered_arrays.append((hashes, np.ones(len(hashes), dtype=np.int32),
+                                     starts[first_occurrences] + offset, lengths[first_occurrences]))
+        self.buffered_size += len(hashes)
+        if self.buffered_size >= self.buffer_size:
+            self.merge()
+
+    def merge(self):
+        arrays = self.buffered_arrays + [(self.hashes, self.document_frequencies, self.starts, self.lengths)]
+        hashes, document_frequencies, starts, lengths = (np.concatenate(array_list) for array_list in zip(*arrays))
+        self.hashes, first_occurrences, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        self.document_frequencies = np.bincount(inverse, weights=document_frequencies,
+                                                minlength=len(self.hashes)).astype(np.int32)
+        self.starts = starts[first_occurrences]
+        self.lengths = lengths[first_occurrences].astype(np.int32)
+        self.buffered_arrays = []
+        self.buffered_size = 0
+
+    def merged(self):
+        """ Return the hashes, document frequencies, starts and lengths of all the factors seen so far. """
+        if self.buffered_arrays:
+            self.merge()
+        return self.hashes, self.document_frequencies, self.starts, self.lengths
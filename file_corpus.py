@@ -0,0 +1,171 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Out-of-core construction of the item / iterable matrix of iterables read from files, for 'VectorSpace.from_files'.
+
+The iterables are read once, by chunks whose number of item occurrences is bounded by the memory budget.
+The count matrix of each chunk is spilled to a segment of '.npy' files in a temporary directory.
+Its columns are the global indices of the iterables, so a repeated iterable adds to the column of its first
+occurrence, and its rows are the items seen so far. The segments are then merged by blocks of rows,
+whose number of entries in all the segments is bounded by the budget, and the rows of each block are appended
+to the data and indices files of the final csr matrix, which is opened memory-mapped and read-only.
+Only the index maps, the row pointers of the segments and one chunk or block of entries stay in memory.
+"""
+
+
+import json
+import os
+import shutil
+import tempfile
+from itertools import chain
+from matrix_operations import *
+
+
+DEFAULT_MEMORY_BUDGET = 2 ** 28
+# Estimated bytes per item occurrence of a chunk: the index arrays of the occurrences, then their conversion to csr.
+BYTES_PER_OCCURRENCE = 64
+# Estimated bytes per entry of a block of the merge: its coordinates and value, then their conversion to csr.
+BYTES_PER_MERGED_ENTRY = 64
+MATRIX_FILE_NAMES = {'data': 'item_iterable_matrix_data.bin', 'indices': 'item_iterable_matrix_indices.bin',
+                     'indptr': 'item_iterable_matrix_indptr.npy'}
+
+
+def lines_of_file(path):
+    """ Yield the lines of the text file 'path', without their line break: each line is an iterable
+    whose items are its characters. """
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            yield line[:-1] if line.endswith('\n') else line
+
+
+def json_records_of_file(path):
+    """ Yield the records of the file 'path', made of one JSON array per line, as tuples. """
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield tuple(json.loads(line))
+
+
+def iterables_from_files(paths, read_file=None):
+    """ Yield the iterables of the files 'paths', read by 'read_file', by default 'lines_of_file'. """
+    read_file = read_file or lines_of_file
+    for path in paths:
+        yield from read_file(path)
+
+
+class SpilledMatrices:
+    """ Sparse count matrices written to a temporary directory of 'directory', whose sum is computed by 'merged'.
+    The matrices may have fewer rows and columns than their sum, the missing ones being zero. """
+
+    def __init__(self, directory, dtype=np.int64):
+        self.path = tempfile.mkdtemp(prefix='segments_', dir=directory)
+        self.dtype = dtype
+        self.numbers_of_rows = []
+        self.numbers_of_entries = []
+
+    def __len__(self):
+        return len(self.numbers_of_rows)
+
+    def spill(self, matrix):
+        matrix = csr_matrix(matrix)
+        for array_name in ('data', 'indices', 'indptr'):
+            np.save(self.array_path(len(self), array_name), getattr(matrix, array_name))
+        self.numbers_of_rows.append(matrix.shape[0])
+        self.numbers_of_entries.append(matrix.nnz)
+
+    def array_path(self, segment, array_name):
+        return os.path.join(self.path, '{}_{}.npy'.format(segment, array_name))
+
+    def segment_arrays(self, segment):
+        return [np.load(self.array_path(segment, array_name), mmap_mode='r')
+                for array_name in ('data', 'indices', 'indptr')]
+
+    def merged(self, shape, path, memory_budget=DEFAULT_MEMORY_BUDGET) -> csr_matrix:
+        """ Return the sum of the matrices, of shape 'shape', as a csr matrix whose arrays are read-only memory maps
+        of files of the directory 'path'. """
+        os.makedirs(path, exist_ok=True)
+        # The indices and the row pointers have the same type, so that scipy does not copy them.
+        index_dtype = index_dtype_from_length(max(*shape, sum(self.numbers_of_entries)))
+        segments = [self.segment_arrays(segment) for segment in range(len(self))]
+        row_lengths = np.zeros(shape[0], dtype=np.int64)
+        for (_, _, indptr), number_of_rows in zip(segments, self.numbers_of_rows):
+            row_lengths[:number_of_rows] += np.diff(indptr)
+        indptr = np.zeros(shape[0] + 1, dtype=index_dtype)
+        with open(os.path.join(path, MATRIX_FILE_NAMES['data']), 'wb') as data_file, \
+                open(os.path.join(path, MATRIX_FILE_NAMES['indices']), 'wb') as indices_file:
+            for start, end in blocks_of_bounded_cost(row_lengths * BYTES_PER_MERGED_ENTRY, memory_budget):
+                block = self.merged_rows(segments, start, end, shape[1])
+                block.data.astype(self.dtype, copy=False).tofile(data_file)
+                block.indices.astype(index_dtype, copy=False).tofile(indices_file)
+                indptr[start + 1:end + 1] = indptr[start] + block.indptr[1:]
+        np.save(os.path.join(path, MATRIX_FILE_NAMES['indptr']), indptr)
+        number_of_entries = int(indptr[-1])
+        matrix = csr_matrix((read_only_memory_map(os.path.join(path, MATRIX_FILE_NAMES['data']), self.dtype,
+                                                  number_of_entries),
+                             read_only_memory_map(os.path.join(path, MATRIX_FILE_NAMES['indices']), index_dtype,
+                                                  number_of_entries),
+                             np.load(os.path.join(path, MATRIX_FILE_NAMES['indptr']), mmap_mode='r')),
+                            shape=shape, copy=False)
+        # Each block was written in canonical format, which scipy cannot know without checking.
+        matrix.has_canonical_format = True
+        return matrix
+
+    def merged_rows(self, segments, start, end, number_of_columns):
+        """ Return the sum of the rows 'start' to 'end' of the matrices. """
+        row_indices, column_indices, data = [], [], []
+        for (segment_data, segment_indices, segment_indptr), number_of_rows in zip(segments, self.numbers_of_rows):
+            segment_end = min(end, number_of_rows)
+            if segment_end <= start:
+                continue
+            row_lengths = np.diff(segment_indptr[start:segment_end + 1])
+            row_indices.append(np.repeat(np.arange(segment_end - start), row_lengths))
+            column_indices.append(segment_indices[segment_indptr[start]:segment_indptr[segment_end]])
+            data.append(segment_data[segment_indptr[start]:segment_indptr[segment_end]])
+        if not data:
+            return csr_matrix((end - start, number_of_columns), dtype=self.dtype)
+        block = matrix_from_index_arrays(np.concatenate(row_indices), np.concatenate(column_indices),
+                                         (end - start, number_of_columns), np.concatenate(data), dtype=self.dtype)
+        block.sum_duplicates()
+        return block
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def spill_iterables(iterables, item_to_index, iterable_to_index, spilled_matrices,
+                    memory_budget=DEFAULT_MEMORY_BUDGET):
+    """ Read 'iterables' once, by chunks of at most 'memory_budget / BYTES_PER_OCCURRENCE' item occurrences,
+    and spill the count matrix of each chunk to 'spilled_matrices'. As in 'index_arrays_from_iterables',
+    the index maps are only accessed through '__getitem__' and assign new indices on the fly. """
+    maximum_number_of_occurrences = max(memory_budget // BYTES_PER_OCCURRENCE, 1)
+    iterables = iter(iterables)
+    for first_iterable in iterables:
+        chunk = chain([first_iterable], iterables_up_to(iterables, maximum_number_of_occurrences - len(first_iterable)))
+        item_indices, iterable_indices = index_arrays_from_iterables(chunk, item_to_index, iterable_to_index)
+        if len(item_indices):
+            shape = (int(item_indices.max()) + 1, int(iterable_indices.max()) + 1)
+            spilled_matrices.spill(matrix_from_index_arrays(item_indices, iterable_indices, shape,
+                                                            dtype=spilled_matrices.dtype))
+
+
+def iterables_up_to(iterables, number_of_occurrences):
+    """ Yield the next iterables of the iterator 'iterables' while their total length is below
+    'number_of_occurrences', and the first one reaching it. """
+    while number_of_occurrences > 0:
+        iterable = next(iterables, None)
+        if iterable is None:
+            return
+        yield iterable
+        number_of_occurrences -= len(iterable)
+
+
+def read_only_memory_map(path, dtype, length):
+    if length == 0:
+        # Empty files cannot be memory-mapped.
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
@@ -0,0 +1,118 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+from itertools import chain
+from matrix_operations import *
+from distance import Distance
+from learning_distance import LearningDistance
+from hashed_vector_space import HashedVectorSpace
+from oracle_claim import OracleClaim
+from oracle_claim_set import OracleClaimSet
+from vector_space import map_to_index_from_iterable
+
+
+class HashedDistance(Distance, HashedVectorSpace):
+    """ 'Distance' on a 'HashedVectorSpace'. The options 'number_of_buckets', 'signed_hashing' and 'seed'
+    are passed to the vector space, and item weights are given per bucket.
+    Collections may contain iterables that are not in the vector space: their columns are hashed on the fly,
+    and they get the mean weight of the iterables of the vector space (see 'unseen_iterable_weight').
+    They contribute to the vectorizations, but their weights are not learnt. """
+
+    unseen_iterable_weight_cache = (None, None)
+
+    def unseen_iterable_weight(self):
+        weights_version, weight = self.unseen_iterable_weight_cache
+        if weights_version != self.weights_version:
+            # The weights of the removed iterables are zero.
+            weight = float(np.sum(self.iterable_weights_vector)) / max(len(self.iterable_to_index), 1)
+            self.unseen_iterable_weight_cache = self.weights_version, weight
+        return weight
+
+    def compute_verbose_vectorization(self, iterables):
+        """ The returned vector of iterables only covers the iterables of the vector space. """
+        iterables = list(dict.fromkeys(iterables))
+        unseen_iterables = [iterable for iterable in iterables if iterable not in self.iterable_to_index]
+        if not unseen_iterables:
+            return super().compute_verbose_vectorization(iterables)
+        iterables_vector = self.iterable_vector_from_collection(iterable for iterable in iterables
+                                                                if iterable in self.iterable_to_index)
+        vectorization = dot_matrix_dot_products(self.item_weights_vector, self.item_iterable_matrix,
+                                                self.iterable_weights_vector, iterables_vector)
+        unseen_vectorization = dot_matrix_dot_products(
+            self.item_weights_vector, self.columns_of_iterables(unseen_iterables), 1.,
+            self.unseen_iterable_weight() * one_vector_from_length(len(unseen_iterables), self.float_dtype()))
+        vectorization = vectorization + unseen_vectorization
+        return vectorization, iterables_vector, norm(vectorization)
+
+    def compute_sparse_vectorization(self, iterables):
+        iterables = list(dict.fromkeys(iterables))
+        unseen_iterables = [iterable for iterable in iterables if iterable not in self.iterable_to_index]
+        if not unseen_iterables:
+            return super().compute_sparse_vectorization(iterables)
+        iterable_indices = self.iterable_indices_from_collection(iterable for iterable in iterables
+                                                                 if iterable in self.iterable_to_index)
+        columns = horizontal_stack_with_row_padding([columns_of_csc_matrix(self.item_iterable_csc_matrix(),
+                                                                           iterable_indices),
+                                                     self.columns_of_iterables(unseen_iterables)],
+                                                    len(self.item_to_index))
+        column_coefficients = np.concatenate([self.iterable_weights_vector[iterable_indices],
+                                              [self.unseen_iterable_weight()] * len(unseen_iterables)])
+        item_indices, values = sparse_dot_columns_dot_products(self.item_weights_vector, columns,
+                                                               column_coefficients)
+        return item_indices, values, norm(values)
+
+    def vectorization_matrix(self, iterables_collections):
+        seen_collections, unseen_vectorizations = self.split_unseen_iterables(iterables_collections)
+        vectorizations = super().vectorization_matrix(seen_collections)
+        if unseen_vectorizations is None:
+            return vectorizations
+        return (vectorizations + unseen_vectorizations).tocsc()
+
+    def sparse_vectorization_matrix(self, iterables_collections):
+        seen_collections, unseen_vectorizations = self.split_unseen_iterables(iterables_collections)
+        vectorizations = super().sparse_vectorization_matrix(seen_collections)
+        if unseen_vectorizations is None:
+            return vectorizations
+        return (vectorizations + unseen_vectorizations).tocsc()
+
+    def split_unseen_iterables(self, iterables_collections):
+        """ Return the collections restricted to the iterables of the vector space, and the matrix whose 'j'-th column
+        is the part of the vectorization of the 'j'-th collection due to its other iterables, or None if there are
+        no such iterables. """
+        seen_collections = []
+        unseen_collections = []
+        for iterables in iterables_collections:
+            iterables = list(dict.fromkeys(iterables))
+            seen_collections.append([iterable for iterable in iterables if iterable in self.iterable_to_index])
+            unseen_collections.append([iterable for iterable in iterables if iterable not in self.iterable_to_index])
+        unseen_iterable_to_index = map_to_index_from_iterable(chain.from_iterable(unseen_collections))
+        if not unseen_iterable_to_index:
+            return seen_collections, None
+        unseen_iterables_matrix = indicator_matrix_from_index_map_and_collections(
+            unseen_iterable_to_index, unseen_collections, dtype=self.float_dtype())
+        unseen_vectorizations = scale_rows(self.columns_of_iterables(list(unseen_iterable_to_index))
+                                           @ unseen_iterables_matrix,
+                                           self.unseen_iterable_weight() * self.item_weights_vector)
+        return seen_collections, unseen_vectorizations
+
+
+class HashedLearningDistance(LearningDistance, HashedDistance):
+    """ 'LearningDistance' on a 'HashedVectorSpace' (see 'HashedDistance').
+    In a batch, as in a single oracle claim, only the weights of the iterables of the vector space are learnt. """
+
+    def compile_oracle_claims_batch(self, oracle_claims):
+        oracle_claims = list(oracle_claims)
+        seen_collections0, unseen_vectorizations0 = self.split_unseen_iterables(
+            oracle_claim.iterables_pair[0] for oracle_claim in oracle_claims)
+        seen_collections1, unseen_vectorizations1 = self.split_unseen_iterables(
+            oracle_claim.iterables_pair[1] for oracle_claim in oracle_claims)
+        seen_oracle_claims = [OracleClaim((collection0, collection1), oracle_claim.distance_interval)
+                              for collection0, collection1, oracle_claim
+                              in zip(seen_collections0, seen_collections1, oracle_claims)]
+        return (OracleClaimSet.from_oracle_claims(seen_oracle_claims, self), unseen_vectorizations0,
+                unseen_vectorizations1)
@@ -0,0 +1,112 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import zlib
+from array import array
+from collections.abc import Mapping
+from matrix_operations import *
+from vector_space import VectorSpace, IndexAssigner
+from vocabulary import encode_key
+
+
+DEFAULT_NUMBER_OF_BUCKETS = 2 ** 18
+SIGN_BIT = 2 ** 31
+
+
+class HashedVectorSpace(VectorSpace):
+    """ Vector space whose rows are a fixed number of buckets instead of the items:
+    each item is sent to a bucket by a seeded hash of its canonical encoding (see 'vocabulary.encode_key'),
+    so that no item dictionary is stored, and iterables made of unseen items can still be turned into columns.
+    With 'signed_hashing', each item also has a hashed sign, so that the collisions cancel out on average.
+    The 'item_to_index' attribute is an 'ItemBuckets' object, mapping each bucket to itself:
+    item weights are therefore given per bucket. """
+
+    def __init__(self, iterables, number_of_buckets=DEFAULT_NUMBER_OF_BUCKETS, signed_hashing=False, seed=0,
+                 precision=DEFAULT_PRECISION):
+        item_to_index = ItemBuckets(number_of_buckets, signed_hashing, seed)
+        iterable_to_index = dict()
+        matrix = columns_of_hashed_iterables(iterables, item_to_index, IndexAssigner(iterable_to_index, 0),
+                                             dtype=count_dtype_from_precision(precision))
+        self.initialize_components(item_to_index, iterable_to_index, matrix, precision=precision)
+
+    def columns_of_new_iterables(self, new_iterables):
+        first_new_iterable_index = self.number_of_iterable_slots()
+        return columns_of_hashed_iterables(new_iterables, self.item_to_index,
+                                           IndexAssigner(self.iterable_to_index, first_new_iterable_index),
+                                           first_new_iterable_index, dtype=self.count_dtype())
+
+    def columns_of_iterables(self, iterables):
+        """ Return the matrix of the columns that 'iterables' would have, without adding them to the vector space. """
+        return columns_of_hashed_iterables(iterables, self.item_to_index, {iterable: index for index, iterable
+                                                                           in enumerate(iterables)},
+                                           dtype=self.count_dtype())
+
+    def count_iterables_containing_item(self, item):
+        """ Count the iterables containing an item of the same bucket as 'item'. """
+        bucket, _ = self.item_to_index.bucket_and_sign(item)
+        return count_nonzero_entries_in_matrix_row(self.item_iterable_matrix, bucket,
+                                                   ignored_column_indices=self.removed_iterable_indices)
+
+
+class ItemBuckets(Mapping):
+    """ Index map of the rows of a 'HashedVectorSpace', from each bucket to itself,
+    which also holds the parameters of the hash of the items. """
+
+    def __init__(self, number_of_buckets, signed_hashing=False, seed=0):
+        self.number_of_buckets = number_of_buckets
+        self.signed_hashing = signed_hashing
+        self.seed = seed
+
+    def __len__(self):
+        return self.number_of_buckets
+
+    def __iter__(self):
+        return iter(range(self.number_of_buckets))
+
+    def __getitem__(self, bucket):
+        if not isinstance(bucket, (int, np.integer)) or not 0 <= bucket < self.number_of_buckets:
+            raise KeyError(bucket)
+        return bucket
+
+    def bucket_and_sign(self, item):
+        hash_value = mixed_hash(zlib.crc32(encode_key(item), self.seed))
+        sign = -1 if self.signed_hashing and hash_value & SIGN_BIT else 1
+        return (hash_value & (SIGN_BIT - 1)) % self.number_of_buckets, sign
+
+
+def mixed_hash(hash_value):
+    """ Finalizer of MurmurHash3 on 32 bits. The crc32 being linear, keys differing by a few bits
+    would otherwise collide in structured ways. """
+    hash_value ^= hash_value >> 16
+    hash_value = (hash_value * 0x85ebca6b) & 0xffffffff
+    hash_value ^= hash_value >> 13
+    hash_value = (hash_value * 0xc2b2ae35) & 0xffffffff
+    return hash_value ^ (hash_value >> 16)
+
+
+def columns_of_hashed_iterables(iterables, item_buckets, iterable_to_index, first_iterable_index=0, dtype=np.int64):
+    """ Same as 'index_arrays_from_iterables' followed by 'matrix_from_index_arrays',
+    with the buckets of the items instead of their indices, and their signs as data of type 'dtype'.
+    The columns start with the iterable of index 'first_iterable_index'. """
+    bucket_and_sign = item_buckets.bucket_and_sign
+    buckets = array('q')
+    signs = array('b')
+    iterable_indices = array('q')
+    number_of_columns = 0
+    for iterable in iterables:
+        iterable_index = iterable_to_index[iterable] - first_iterable_index
+        number_of_columns = max(number_of_columns, iterable_index + 1)
+        for item in iterable:
+            bucket, sign = bucket_and_sign(item)
+            buckets.append(bucket)
+            signs.append(sign)
+            iterable_indices.append(iterable_index)
+    return matrix_from_index_arrays(np.frombuffer(buckets, dtype=np.int64),
+                                    np.frombuffer(iterable_indices, dtype=np.int64),
+                                    (len(item_buckets), number_of_columns),
+                                    data=np.frombuffer(signs, dtype=np.int8), dtype=dtype)
@@ -9,6 +9,8 @@
 import random
 from matrix_operations import *
 from distance import Distance
+from weighting import DEFAULT_WEIGHTING
+from oracle_claim_set import OracleClaimSet
 
 
 DEFAULT_NUMBER_OF_ITERATIONS = 5
@@ -16,33 +18,174 @@ DEFAULT_NUMBER_OF_ITERATIONS = 5
 
 class LearningDistance(Distance):
 
-    def __init__(self, iterables, item_to_weight=None, iterable_to_weight=None):
-        super().__init__(iterables, item_to_weight, iterable_to_weight)
+    def __init__(self, iterables, item_to_weight=None, iterable_to_weight=None, vectorization_cache_size=None,
+                 weighting=DEFAULT_WEIGHTING, **vector_space_options):
+        super().__init__(iterables, item_to_weight, iterable_to_weight,
+                         vectorization_cache_size=vectorization_cache_size, weighting=weighting,
+                         **vector_space_options)
 
     def learn(self, oracle_claims, ratio_item_iterable_learning=0.5, convergence_speed=0.5,
-              number_of_iterations=DEFAULT_NUMBER_OF_ITERATIONS):
+              number_of_iterations=DEFAULT_NUMBER_OF_ITERATIONS, batch_size=None):
+        """ If 'batch_size' is provided, the oracle claims are treated by batches of 'batch_size' claims,
+        each batch leading to a single update of the weights (see 'learn_from_oracle_claims_batch').
+        'oracle_claims' may be an 'OracleClaimSet', compiled once against this distance. """
+        if isinstance(oracle_claims, OracleClaimSet):
+            return self.learn_from_oracle_claim_set(oracle_claims, ratio_item_iterable_learning, convergence_speed,
+                                                    number_of_iterations, batch_size)
         oracle_claims = list(oracle_claims)
         for _ in range(number_of_iterations):
             random.shuffle(oracle_claims)
-            for oracle_claim in oracle_claims:
-                self.learn_from_one_oracle_claim(oracle_claim,
-                                                 ratio_item_iterable_learning=ratio_item_iterable_learning,
-                                                 effort=convergence_speed)
+            if batch_size is None:
+                for oracle_claim in oracle_claims:
+                    self.learn_from_one_oracle_claim(oracle_claim,
+                                                     ratio_item_iterable_learning=ratio_item_iterable_learning,
+                                                     effort=convergence_speed)
+            else:
+                for start in range(0, len(oracle_claims), batch_size):
+                    self.learn_from_oracle_claims_batch(oracle_claims[start:start + batch_size],
+                                                        ratio_item_iterable_learning=ratio_item_iterable_learning,
+                                                        effort=convergence_speed)
+
+    def learn_from_oracle_claim_set(self, oracle_claim_set, ratio_item_iterable_learning=0.5, convergence_speed=0.5,
+                                    number_of_iterations=DEFAULT_NUMBER_OF_ITERATIONS, batch_size=None):
+        """ Same as 'learn', the claims being read from the arrays of 'oracle_claim_set' by their indices. """
+        for _ in range(number_of_iterations):
+            claim_indices = oracle_claim_set.shuffled_claim_indices()
+            if batch_size is None:
+                for claim_index in claim_indices:
+                    self.learn_from_sparse_enriched_oracle_claim(
+                        SparseEnrichedOracleClaim.from_oracle_claim_set(oracle_claim_set, claim_index, self,
+                                                                        effort=convergence_speed),
+                        ratio_item_iterable_learning)
+            else:
+                for start in range(0, len(claim_indices), batch_size):
+                    self.learn_from_oracle_claims_batch(oracle_claim_set[claim_indices[start:start + batch_size]],
+                                                        ratio_item_iterable_learning=ratio_item_iterable_learning,
+                                                        effort=convergence_speed)
 
     def learn_from_one_oracle_claim(self, oracle_claim, ratio_item_iterable_learning=0.5, effort=1.):
         """ 'effort' is a value between '0.' and '1.'. It represents the amplitude of the change applied to the weights
         so that the distance conforms to 'oracle_claim'.
         Let 't' denote the target distance between the two sets of iterables from oracle_claim,
         'c' their current distance, and 'd' the distance achieved after the update.
-        Then 'effort' is around '(t - d) / (t - c)'. """
-        enriched_oracle_claim = EnrichedOracleClaim(oracle_claim, self, effort=effort)
-        if enriched_oracle_claim.has_bad_values():
+        Then 'effort' is around '(t - d) / (t - c)'.
+        The gradients are only computed on the items of the vectorizations of the two collections
+        and on their iterables, which are the only weights rescaled (see 'SparseEnrichedOracleClaim'). """
+        self.learn_from_sparse_enriched_oracle_claim(SparseEnrichedOracleClaim(oracle_claim, self, effort=effort),
+                                                     ratio_item_iterable_learning)
+
+    def learn_from_sparse_enriched_oracle_claim(self, sparse_enriched_oracle_claim, ratio_item_iterable_learning=0.5):
+        """ Return whether the weights were updated, which is not the case when the claim has bad values. """
+        if sparse_enriched_oracle_claim.has_bad_values():
+            return False
+        rescalings = self.compute_sparse_rescalings(sparse_enriched_oracle_claim, ratio_item_iterable_learning)
+        self.rescale_weights(*rescalings)
+        return True
+
+    def learn_from_oracle_claims_batch(self, oracle_claims, ratio_item_iterable_learning=0.5, effort=1.):
+        """ The gradients of all the oracle claims are computed from the same weights, as sparse matrices.
+        On each coordinate, the gradients of the claims that modify this coordinate are averaged,
+        and the result is turned into a single rescaling vector, as in 'learn_from_one_oracle_claim'. """
+        batch = EnrichedOracleClaimsBatch(oracle_claims, self, effort=effort)
+        if not any(batch.has_good_values):
             return None
-        rescaling_item_vector, rescaling_iterable_vector = self.compute_rescaling_vectors(enriched_oracle_claim,
-                                                                                          ratio_item_iterable_learning)
-        self.item_weights_vector = coefficient_wise_vector_product(rescaling_item_vector, self.item_weights_vector)
-        self.iterable_weights_vector = coefficient_wise_vector_product(rescaling_iterable_vector,
-                                                                       self.iterable_weights_vector)
+        rescaling_item_vector, rescaling_iterable_vector = self.compute_batch_rescaling_vectors(
+            batch, ratio_item_iterable_learning)
+        self.rescale_weights(slice(None), rescaling_item_vector, slice(None), rescaling_iterable_vector)
+
+    def compile_oracle_claims_batch(self, oracle_claims):
+        """ Return the 'OracleClaimSet' of 'oracle_claims', and the two matrices to add to the vectorizations
+        of its collections, or None. """
+        return OracleClaimSet.from_oracle_claims(oracle_claims, self), None, None
+
+    def compute_batch_rescaling_vectors(self, enriched_oracle_claims_batch, ratio_item_iterable_learning):
+        gradients_item, gradients_iterable = self.compute_batch_item_and_iterable_gradients(
+            enriched_oracle_claims_batch, ratio_item_iterable_learning)
+        gradient_item = row_wise_mean_of_nonzero_entries(gradients_item)
+        gradient_iterable = row_wise_mean_of_nonzero_entries(gradients_iterable)
+        gradient_item = rescale_vector_from_gradient_and_effort(gradient_item, enriched_oracle_claims_batch.effort)
+        gradient_iterable = rescale_vector_from_gradient_and_effort(gradient_iterable,
+                                                                    enriched_oracle_claims_batch.effort)
+        return gradient_item, gradient_iterable
+
+    def compute_batch_item_and_iterable_gradients(self, enriched_oracle_claims_batch, ratio_item_iterable_learning):
+        """ Column 'k' of each returned matrix is the gradient that 'compute_item_and_iterable_gradients'
+        would return for the 'k'-th oracle claim of the batch, or zero if this claim has bad values. """
+        batch = enriched_oracle_claims_batch
+        r = ratio_item_iterable_learning
+        diagonal_coefficient0 = safe_division((1. - batch.current_distances) * batch.norms1, batch.norms0)
+        diagonal_coefficient1 = safe_division((1. - batch.current_distances) * batch.norms0, batch.norms1)
+        gradients_item = (scale_columns(coefficient_wise_matrix_product(batch.vectorizations0, batch.vectorizations0),
+                                        diagonal_coefficient0)
+                          - 2. * coefficient_wise_matrix_product(batch.vectorizations0, batch.vectorizations1)
+                          + scale_columns(coefficient_wise_matrix_product(batch.vectorizations1, batch.vectorizations1),
+                                          diagonal_coefficient1))
+        # Only the iterables of the oracle claims have a nonzero gradient,
+        # so 'u0' and 'u1' are computed on those iterables only.
+        batch_iterables = np.union1d(nonzero_rows(batch.iterables_matrix0), nonzero_rows(batch.iterables_matrix1))
+        transposed_matrix = transpose_matrix(columns_of_csc_matrix(self.item_iterable_csc_matrix(), batch_iterables))
+        batch_iterable_weights_vector = self.iterable_weights_vector[batch_iterables]
+        u0 = dot_matrix_dot_matrix_products(batch_iterable_weights_vector, transposed_matrix,
+                                            self.item_weights_vector, batch.vectorizations0)
+        u1 = dot_matrix_dot_matrix_products(batch_iterable_weights_vector, transposed_matrix,
+                                            self.item_weights_vector, batch.vectorizations1)
+        iterables_matrix0 = rows_of_matrix(batch.iterables_matrix0, batch_iterables)
+        iterables_matrix1 = rows_of_matrix(batch.iterables_matrix1, batch_iterables)
+        gradients_iterable = (scale_columns(coefficient_wise_matrix_product(iterables_matrix0, u0),
+                                            diagonal_coefficient0)
+                              - coefficient_wise_matrix_product(iterables_matrix0, u1)
+                              - coefficient_wise_matrix_product(iterables_matrix1, u0)
+                              + scale_columns(coefficient_wise_matrix_product(iterables_matrix1, u1),
+                                              diagonal_coefficient1))
+        common_factors = safe_division(batch.norms0 * batch.norms1 * (batch.target_distances - batch.current_distances),
+                                       r ** 2 * column_norms(gradients_item) ** 2
+                                       + (1. - r) ** 2 * column_norms(gradients_iterable) ** 2)
+        common_factors[~batch.has_good_values] = 0.
+        gradients_item = scale_columns(gradients_item, common_factors * r)
+        gradients_iterable = scale_columns(gradients_iterable, common_factors * (1. - r))
+        gradients_iterable = matrix_with_rows_at_indices(gradients_iterable, batch_iterables,
+                                                         len(self.iterable_weights_vector))
+        return gradients_item, gradients_iterable
+
+    def compute_sparse_rescalings(self, sparse_enriched_oracle_claim, ratio_item_iterable_learning):
+        """ Return the indices of the rescaled items, their rescaling factors,
+        the indices of the rescaled iterables and their rescaling factors. """
+        gradient_item, gradient_iterable = self.compute_sparse_item_and_iterable_gradients(
+            sparse_enriched_oracle_claim, ratio_item_iterable_learning)
+        effort = sparse_enriched_oracle_claim.effort
+        return (sparse_enriched_oracle_claim.item_indices,
+                rescale_vector_from_gradient_and_effort(gradient_item, effort),
+                sparse_enriched_oracle_claim.iterable_indices,
+                rescale_vector_from_gradient_and_effort(gradient_iterable, effort))
+
+    def compute_sparse_item_and_iterable_gradients(self, sparse_enriched_oracle_claim, ratio_item_iterable_learning):
+        """ Same as 'compute_item_and_iterable_gradients', restricted to the items and iterables
+        of 'sparse_enriched_oracle_claim', out of which the gradients are zero. """
+        eoc = sparse_enriched_oracle_claim
+        r = ratio_item_iterable_learning
+        matrix_of_coefficients = (((1. - eoc.current_distance) * eoc.norm1 / eoc.norm0, -1.),
+                                  (-1., (1. - eoc.current_distance) * eoc.norm0 / eoc.norm1))
+        vector_of_vectorizations = (eoc.vectorization0, eoc.vectorization1)
+        gradient_item = non_trivial_hadamard_scalar_product(vector_of_vectorizations,
+                                                            matrix_of_coefficients,
+                                                            vector_of_vectorizations)
+        columns = columns_of_csc_matrix(self.item_iterable_csc_matrix(), eoc.iterable_indices)
+        item_weights_vector = self.item_weights_vector[eoc.item_indices]
+        iterable_weights_vector = self.iterable_weights_vector[eoc.iterable_indices]
+        u0 = coefficient_wise_vector_product(iterable_weights_vector, sparse_transposed_dot_products(
+            columns, eoc.item_indices, coefficient_wise_vector_product(item_weights_vector, eoc.vectorization0)))
+        u1 = coefficient_wise_vector_product(iterable_weights_vector, sparse_transposed_dot_products(
+            columns, eoc.item_indices, coefficient_wise_vector_product(item_weights_vector, eoc.vectorization1)))
+        gradient_iterable = non_trivial_hadamard_scalar_product((eoc.iterables_vector0, eoc.iterables_vector1),
+                                                                matrix_of_coefficients,
+                                                                (u0, u1))
+        # The gradients vanish when the two vectorizations are colinear, and then no update is made.
+        common_factor = safe_scalar_division(eoc.norm0 * eoc.norm1 * (eoc.target_distance - eoc.current_distance),
+                                             r ** 2 * norm(gradient_item) ** 2
+                                             + (1. - r) ** 2 * norm(gradient_iterable) ** 2)
+        gradient_item *= common_factor * r
+        gradient_iterable *= common_factor * (1. - r)
+        return gradient_item, gradient_iterable
 
     def compute_rescaling_vectors(self, enriched_oracle_claim, ratio_item_iterable_learning):
         gradient_item, gradient_iterable = self.compute_item_and_iterable_gradients(enriched_oracle_claim,
@@ -52,6 +195,7 @@ class LearningDistance(Distance):
         return gradient_item, gradient_iterable
 
     def compute_item_and_iterable_gradients(self, enriched_oracle_claim, ratio_item_iterable_learning):
+        """ Dense gradients on all the items and iterables, kept as a reference for the sparse version. """
         eoc = enriched_oracle_claim
         r = ratio_item_iterable_learning
         matrix_of_coefficients = (((1. - eoc.current_distance) * eoc.norm1 / eoc.norm0, -1.),
@@ -67,8 +211,10 @@ class LearningDistance(Distance):
         gradient_iterable = non_trivial_hadamard_scalar_product((eoc.iterables_vector0, eoc.iterables_vector1),
                                                                 matrix_of_coefficients,
                                                                 (u0, u1))
-        common_factor = (eoc.norm0 * eoc.norm1 * (eoc.target_distance - eoc.current_distance)
-                         / (r ** 2 * norm(gradient_item) ** 2 + (1. - r) ** 2 * norm(gradient_iterable) ** 2))
+        # The gradients vanish when the two vectorizations are colinear, and then no update is made.
+        common_factor = safe_scalar_division(eoc.norm0 * eoc.norm1 * (eoc.target_distance - eoc.current_distance),
+                                             r ** 2 * norm(gradient_item) ** 2
+                                             + (1. - r) ** 2 * norm(gradient_iterable) ** 2)
         gradient_item *= common_factor * r
         gradient_iterable *= common_factor * (1. - r)
         return gradient_item, gradient_iterable
@@ -91,6 +237,92 @@ class EnrichedOracleClaim:
                 or math.isclose(self.norm0, 0) or math.isclose(self.norm1, 0))
 
 
+class SparseEnrichedOracleClaim(EnrichedOracleClaim):
+    """ Version of 'EnrichedOracleClaim' whose vectors are only given on their support:
+    the vectorizations on the sorted 'item_indices', union of the supports of the two vectorizations,
+    and the vectors of iterables on the sorted 'iterable_indices', union of the iterables of the vector space
+    found in the two collections. Its cost only depends on the size of the claim. """
+
+    def __init__(self, oracle_claim, distance, effort=1.):
+        self.iterables0, self.iterables1 = oracle_claim.iterables_pair
+        self.enrich(distance, distance.sparse_vectorize_with_norm(self.iterables0),
+                    distance.sparse_vectorize_with_norm(self.iterables1),
+                    known_iterable_indices(distance, self.iterables0),
+                    known_iterable_indices(distance, self.iterables1),
+                    oracle_claim.distance_interval, effort)
+
+    @classmethod
+    def from_oracle_claim_set(cls, oracle_claim_set, claim_index, distance, effort=1.):
+        """ Same as '__init__' for the claim 'claim_index' of 'oracle_claim_set', whose collections are only known
+        by their iterable indices: the attributes 'iterables0' and 'iterables1' are 'None'. """
+        sparse_enriched_oracle_claim = cls.__new__(cls)
+        sparse_enriched_oracle_claim.iterables0 = sparse_enriched_oracle_claim.iterables1 = None
+        iterable_indices0, iterable_indices1 = oracle_claim_set.iterable_indices(claim_index)
+        sparse_enriched_oracle_claim.enrich(distance, distance.sparse_vectorize_iterable_indices(iterable_indices0),
+                                            distance.sparse_vectorize_iterable_indices(iterable_indices1),
+                                            iterable_indices0, iterable_indices1,
+                                            oracle_claim_set.distance_interval(claim_index), effort)
+        return sparse_enriched_oracle_claim
+
+    def enrich(self, distance, sparse_vectorization0, sparse_vectorization1, iterable_indices0, iterable_indices1,
+               distance_interval, effort):
+        self.effort = effort
+        self.distance_interval = distance_interval
+        item_indices0, values0, self.norm0 = sparse_vectorization0
+        item_indices1, values1, self.norm1 = sparse_vectorization1
+        self.current_distance = sparse_cosine_distance_from_norms(item_indices0, values0, self.norm0,
+                                                                  item_indices1, values1, self.norm1)
+        self.item_indices = np.union1d(item_indices0, item_indices1)
+        self.vectorization0 = vector_on_support(item_indices0, values0, self.item_indices)
+        self.vectorization1 = vector_on_support(item_indices1, values1, self.item_indices)
+        self.iterable_indices = np.union1d(iterable_indices0, iterable_indices1)
+        self.iterables_vector0 = np.isin(self.iterable_indices, iterable_indices0).astype(distance.float_dtype())
+        self.iterables_vector1 = np.isin(self.iterable_indices, iterable_indices1).astype(distance.float_dtype())
+        self.target_distance = closest_point_from_interval(self.current_distance, self.distance_interval)
+        self.target_distance = (self.current_distance + self.effort * (self.target_distance - self.current_distance))
+
+
+def known_iterable_indices(distance, iterables):
+    return distance.iterable_indices_from_collection(iterable for iterable in iterables
+                                                     if iterable in distance.iterable_to_index)
+
+
+class EnrichedOracleClaimsBatch:
+    """ Matrix version of 'EnrichedOracleClaim': column 'k' of each matrix,
+    and entry 'k' of each vector, correspond to the 'k'-th oracle claim. """
+
+    def __init__(self, oracle_claims, distance, effort=1.):
+        """ 'oracle_claims' is an iterable of 'OracleClaim' objects or an 'OracleClaimSet'. """
+        self.effort = effort
+        additional_vectorizations0 = additional_vectorizations1 = None
+        if not isinstance(oracle_claims, OracleClaimSet):
+            oracle_claims, additional_vectorizations0, additional_vectorizations1 = \
+                distance.compile_oracle_claims_batch(oracle_claims)
+        self.iterables_matrix0, self.iterables_matrix1 = oracle_claims.iterables_matrices(distance)
+        self.lower_bounds = oracle_claims.lower_bounds
+        self.upper_bounds = oracle_claims.upper_bounds
+        self.vectorizations0 = dot_matrix_dot_matrix_products(distance.item_weights_vector,
+                                                              distance.item_iterable_matrix,
+                                                              distance.iterable_weights_vector, self.iterables_matrix0)
+        self.vectorizations1 = dot_matrix_dot_matrix_products(distance.item_weights_vector,
+                                                              distance.item_iterable_matrix,
+                                                              distance.iterable_weights_vector, self.iterables_matrix1)
+        if additional_vectorizations0 is not None:
+            self.vectorizations0 = (self.vectorizations0 + additional_vectorizations0).tocsc()
+        if additional_vectorizations1 is not None:
+            self.vectorizations1 = (self.vectorizations1 + additional_vectorizations1).tocsc()
+        self.norms0 = column_norms(self.vectorizations0)
+        self.norms1 = column_norms(self.vectorizations1)
+        self.current_distances = 1. - safe_division(column_wise_scalar_products(self.vectorizations0,
+                                                                                self.vectorizations1),
+                                                    self.norms0 * self.norms1)
+        self.target_distances = np.clip(self.current_distances, self.lower_bounds, self.upper_bounds)
+        self.target_distances = (self.current_distances
+                                 + self.effort * (self.target_distances - self.current_distances))
+        self.has_good_values = ~(are_close_values(self.current_distances, self.target_distances)
+                                 | (self.norms0 == 0.) | (self.norms1 == 0.))
+
+
 def closest_point_from_interval(value, interval):
     lower_bound, upper_bound = interval
     if value < lower_bound:
@@ -102,8 +334,7 @@ def closest_point_from_interval(value, interval):
 
 def rescale_vector_from_gradient_and_effort(gradient, effort):
     gradient = rescale_vector_to_satisfy_lower_negative_bound(gradient, -1. * effort)
-    one_vector = one_vector_from_length(len(gradient))
-    return one_vector + gradient
+    return 1. + gradient
 
 
 def non_trivial_hadamard_scalar_product(left_vectors, matrix, right_vectors):
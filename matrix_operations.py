@@ -7,23 +7,124 @@
 
 
 import math
+from array import array
 import numpy as np
-from scipy.sparse.csr import csr_matrix
-from scipy.sparse import lil_matrix
+from scipy.sparse import csr_matrix, csc_matrix, coo_matrix, diags, hstack, vstack
 
 
-def matrix_from_iterables_and_index_maps(iterables, item_to_index: dict, iterable_to_index: dict) -> csr_matrix:
-    matrix = lil_matrix((len(item_to_index), len(iterable_to_index)), dtype='int')
+MAX_INT32_INDEX = np.iinfo(np.int32).max
+# With the 'float32' precision, the weights and vectorizations are float32 and the counts of the matrices int32.
+FLOAT64 = 'float64'
+FLOAT32 = 'float32'
+PRECISIONS = (FLOAT64, FLOAT32)
+DEFAULT_PRECISION = FLOAT64
+
+
+def check_precision(precision):
+    if precision not in PRECISIONS:
+        raise ValueError('unknown precision {!r}, expected one of {}'.format(precision, ', '.join(PRECISIONS)))
+
+
+def float_dtype_from_precision(precision):
+    check_precision(precision)
+    return np.float32 if precision == FLOAT32 else np.float64
+
+
+def count_dtype_from_precision(precision):
+    check_precision(precision)
+    return np.int32 if precision == FLOAT32 else np.int64
+
+
+def float_dtype_of(*operands):
+    """ Floating type of the results computed from 'operands': float32 if they are all float32 or integers
+    of at most 2 bytes, float64 otherwise. """
+    return np.result_type(*operands, np.float32)
+
+
+def precision_from_dtype(dtype):
+    """ Precision of the weights or counts of type 'dtype': 'float32' for 4 bytes types, 'float64' otherwise. """
+    return FLOAT32 if np.dtype(dtype).itemsize <= 4 else FLOAT64
+
+
+def matrix_from_iterables_and_index_maps(iterables, item_to_index: dict, iterable_to_index: dict,
+                                         dtype=np.int64) -> csr_matrix:
+    item_indices, iterable_indices = index_arrays_from_iterables(iterables, item_to_index, iterable_to_index)
+    return matrix_from_index_arrays(item_indices, iterable_indices, (len(item_to_index), len(iterable_to_index)),
+                                    dtype=dtype)
+
+
+def index_arrays_from_iterables(iterables, item_to_index, iterable_to_index):
+    """ Walk 'iterables' once and return two flat arrays of the same length,
+    holding the item index and the iterable index of every item occurrence.
+    The index maps are only accessed through '__getitem__', so they may be 'defaultdict' objects
+    that assign new indices on the fly. """
+    item_indices = array('q')
+    iterable_indices = array('q')
+    iterable_lengths = array('q')
     for iterable in iterables:
-        for item in iterable:
-            matrix[item_to_index[item], iterable_to_index[iterable]] += 1
+        start = len(item_indices)
+        item_indices.extend(map(item_to_index.__getitem__, iterable))
+        iterable_indices.append(iterable_to_index[iterable])
+        iterable_lengths.append(len(item_indices) - start)
+    item_indices = np.frombuffer(item_indices, dtype=np.int64)
+    iterable_indices = np.repeat(np.frombuffer(iterable_indices, dtype=np.int64),
+                                 np.frombuffer(iterable_lengths, dtype=np.int64))
+    return item_indices, iterable_indices
+
+
+def matrix_from_index_arrays(row_indices, column_indices, shape, data=None, dtype=np.int64) -> csr_matrix:
+    """ Each pair '(row_indices[k], column_indices[k])' adds 'data[k]', by default '1', to the corresponding entry,
+    so repeated pairs are summed during the conversion to csr. The entries have type 'dtype'. """
+    index_dtype = index_dtype_from_length(max(shape))
+    row_indices = np.asarray(row_indices, dtype=index_dtype)
+    column_indices = np.asarray(column_indices, dtype=index_dtype)
+    if data is None:
+        data = np.ones(len(row_indices), dtype=dtype)
+    data = np.asarray(data, dtype=dtype)
+    return coo_matrix((data, (row_indices, column_indices)), shape=shape).tocsr()
+
+
+def matrix_from_column_row_indices(row_indices, column_lengths, shape, dtype=np.int64) -> csr_matrix:
+    """ Same as 'matrix_from_index_arrays', when the pairs are sorted by column and column 'j' has 'column_lengths[j]'
+    pairs, which avoids storing the column indices. """
+    index_dtype = index_dtype_from_length(max(shape[0], len(row_indices)))
+    column_pointers = np.zeros(len(column_lengths) + 1, dtype=index_dtype)
+    np.cumsum(column_lengths, out=column_pointers[1:])
+    data = np.ones(len(row_indices), dtype=dtype)
+    matrix = csc_matrix((data, np.asarray(row_indices, dtype=index_dtype), column_pointers), shape=shape)
+    matrix.sum_duplicates()
     return matrix.tocsr()
 
 
-def vector_from_index_and_value_maps(to_index: dict, to_value, length=None):
+def index_dtype_from_length(length):
+    if length <= MAX_INT32_INDEX:
+        return np.int32
+    return np.int64
+
+
+def indicator_matrix_from_index_map_and_collections(to_index: dict, collections, length=None,
+                                                    dtype=np.float64) -> csr_matrix:
+    """ Column 'j' of the returned matrix is the indicator vector of the 'j'-th collection,
+    duplicate keys in a collection being counted once. """
+    if length is None:
+        length = len(to_index)
+    row_indices = array('q')
+    collection_lengths = array('q')
+    for collection in collections:
+        start = len(row_indices)
+        row_indices.extend(map(to_index.__getitem__, dict.fromkeys(collection)))
+        collection_lengths.append(len(row_indices) - start)
+    row_indices = np.frombuffer(row_indices, dtype=np.int64)
+    collection_lengths = np.frombuffer(collection_lengths, dtype=np.int64)
+    column_indices = np.repeat(np.arange(len(collection_lengths)), collection_lengths)
+    data = np.ones(len(row_indices), dtype=dtype)
+    return coo_matrix((data, (row_indices, column_indices)), shape=(length, len(collection_lengths))).tocsr()
+
+
+def vector_from_index_and_value_maps(to_index: dict, to_value, length=None, dtype=np.float64):
     if length is None:
         length = len(to_index)
-    vector = zero_vector_from_length(length)
+    vector = zero_vector_from_length(length, dtype)
     for key, value in to_value.items():
         vector[to_index[key]] = value
     return vector
@@ -33,11 +134,40 @@ def dict_from_index_map_and_vector(to_index, vector):
     return {item: vector[index] for item, index in to_index.items()}
 
 
-def count_nonzero_entries_in_matrix_row(matrix, row_index):
+def count_nonzero_entries_in_matrix_row(matrix, row_index, ignored_column_indices=()):
     row = matrix.getrow(row_index)
+    if ignored_column_indices:
+        return sum(1 for column_index in row.indices if column_index not in ignored_column_indices)
     return row.getnnz()
 
 
+def horizontal_stack_with_row_padding(matrices, number_of_rows) -> csr_matrix:
+    """ Concatenate the columns of the matrices, after completing each of them with zero rows
+    so that they all have 'number_of_rows' rows. """
+    matrices = [csr_matrix(matrix) for matrix in matrices]
+    for matrix in matrices:
+        matrix.resize((number_of_rows, matrix.shape[1]))
+    return hstack(matrices, format='csr')
+
+
+def vertical_stack(matrices, number_of_columns) -> csr_matrix:
+    """ Concatenate the rows of the matrices, which all have 'number_of_columns' columns. """
+    if not matrices:
+        return csr_matrix((0, number_of_columns))
+    return vstack(matrices, format='csr')
+
+
+def nonzero_pattern(matrix) -> csr_matrix:
+    """ Return the matrix with entries '1' where 'matrix' has a nonzero entry, and '0' elsewhere. """
+    return csr_matrix(matrix != 0, dtype='int')
+
+
+def mask_from_indices(indices, length) -> np.ndarray:
+    mask = np.zeros(length, dtype=bool)
+    mask[indices] = True
+    return mask
+
+
 def cosine_distance(vector0, vector1):
     distance, _, _ = verbose_cosine_distance(vector0, vector1)
     return distance
@@ -49,6 +179,22 @@ def verbose_cosine_distance(vector0, vector1):
     return 1. - scalar_product(normalized_vector0, normalized_vector1), norm0, norm1
 
 
+def verbose_cosine_distance_from_norms(vector0, norm0, vector1, norm1):
+    """ Same as 'verbose_cosine_distance', when the norms of the vectors are already known. """
+    normalized_vector0 = normalize_from_norm(vector0, norm0)
+    normalized_vector1 = normalize_from_norm(vector1, norm1)
+    return 1. - scalar_product(normalized_vector0, normalized_vector1), norm0, norm1
+
+
+def sparse_cosine_distance_from_norms(indices0, values0, norm0, indices1, values1, norm1):
+    """ Same as 'verbose_cosine_distance_from_norms', for vectors given by the sorted indices
+    of their nonzero coefficients and the values of those coefficients. Only the distance is returned. """
+    if norm0 == 0 or norm1 == 0:
+        return 1.
+    _, positions0, positions1 = np.intersect1d(indices0, indices1, assume_unique=True, return_indices=True)
+    return 1. - scalar_product(values0[positions0], values1[positions1]) / (norm0 * norm1)
+
+
 def scalar_product(vector0, vector1):
     return np.dot(vector0, vector1)
 
@@ -65,6 +211,12 @@ def verbose_normalize(vector):
     return vector / vector_norm, vector_norm
 
 
+def normalize_from_norm(vector, vector_norm):
+    if vector_norm == 0:
+        return vector
+    return vector / vector_norm
+
+
 def is_zero_vector(vector):
     return not np.any(vector)
 
@@ -82,27 +234,205 @@ def matrix_vector_product(matrix: csr_matrix, vector: np.ndarray) -> np.ndarray:
 
 
 def dot_matrix_dot_products(dot_vector0, matrix, dot_vector1, vector):
+    """ The result has the floating type of the vectors, the integer counts of 'matrix' promoting it to float64. """
+    dtype = float_dtype_of(dot_vector0, dot_vector1, vector)
     vector = coefficient_wise_vector_product(dot_vector1, vector)
     vector = matrix_vector_product(matrix, vector)
     vector = coefficient_wise_vector_product(dot_vector0, vector)
+    return vector.astype(dtype, copy=False)
+
+
+def diagonal_matrix_from_vector(vector: np.ndarray):
+    return diags(vector)
+
+
+def sparse_dot_columns_dot_products(dot_vector0, columns, column_coefficients):
+    """ Sparse version of 'dot_matrix_dot_products', where 'columns' only holds the columns of the matrix
+    on which the vector is nonzero, and 'column_coefficients' the values of the vector on those columns.
+    Return the sorted indices of the nonzero rows of 'columns', and the coefficients of the result on those rows.
+    The cost only depends on the number of nonzero entries of 'columns'.
+    The values have the floating type of 'dot_vector0'. """
+    row_indices, values = sparse_columns_combination(columns, column_coefficients)
+    return row_indices, coefficient_wise_vector_product(dot_vector0[row_indices], values).astype(
+        float_dtype_of(dot_vector0), copy=False)
+
+
+def sparse_columns_combination(columns, column_coefficients):
+    """ Return the sorted indices of the nonzero rows of 'columns', and the coefficients on those rows
+    of 'columns @ column_coefficients', computed in float64. """
+    columns = columns.tocoo()
+    return sum_of_sparse_vectors([columns.row], [columns.data * column_coefficients[columns.col]])
+
+
+def sum_of_sparse_vectors(indices_list, values_list):
+    """ Return the sorted indices and the values of the sum of the vectors which are 'values_list[k]'
+    on 'indices_list[k]', repeated indices being summed. The values are float64. """
+    indices, inverse = np.unique(np.concatenate(indices_list), return_inverse=True)
+    return indices, np.bincount(inverse, weights=np.concatenate(values_list), minlength=len(indices))
+
+
+def sparse_transposed_dot_products(columns, row_indices, row_values) -> np.ndarray:
+    """ Return 'transpose(columns) @ vector', where 'vector' is 'row_values' on the sorted 'row_indices'
+    and zero on the other rows. The cost only depends on the number of nonzero entries of 'columns'.
+    The result has the floating type of 'row_values'. """
+    columns = columns.tocoo()
+    if len(row_indices) == 0:
+        return zero_vector_from_length(columns.shape[1], float_dtype_of(row_values))
+    positions = np.minimum(np.searchsorted(row_indices, columns.row), len(row_indices) - 1)
+    on_rows = row_indices[positions] == columns.row
+    return np.bincount(columns.col[on_rows], weights=columns.data[on_rows] * row_values[positions[on_rows]],
+                       minlength=columns.shape[1]).astype(float_dtype_of(row_values), copy=False)
+
+
+def vector_on_support(indices, values, support) -> np.ndarray:
+    """ Return the coefficients on the sorted 'support' of the vector which is 'values' on 'indices',
+    'indices' being a subset of 'support'. """
+    vector = zero_vector_from_length(len(support), float_dtype_of(values))
+    vector[np.searchsorted(support, indices)] = values
     return vector
 
 
-def zero_vector_from_length(length: int) -> np.ndarray:
-    return np.zeros(length)
+def dot_matrix_dot_matrix_products(dot_vector0, matrix, dot_vector1, columns):
+    """ Same as 'dot_matrix_dot_products', applied at once to every column of the sparse matrix 'columns'. """
+    dtype = float_dtype_of(dot_vector0, dot_vector1, columns.dtype)
+    columns = diagonal_matrix_from_vector(dot_vector1) @ columns
+    columns = matrix @ columns
+    columns = diagonal_matrix_from_vector(dot_vector0) @ columns
+    return columns.tocsc().astype(dtype, copy=False)
 
 
-def one_vector_from_length(length: int) -> np.ndarray:
-    return np.ones(length)
+def absolute_column_sums(matrix) -> np.ndarray:
+    return np.asarray(abs(matrix).sum(axis=0)).ravel()
+
+
+def column_norms(matrix) -> np.ndarray:
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+
+
+def verbose_normalize_columns(matrix):
+    """ Columns of norm zero are left unchanged, as in 'verbose_normalize'. """
+    norms = column_norms(matrix)
+    inverse_norms = np.divide(1., norms, out=one_vector_from_length(len(norms), norms.dtype), where=norms != 0.)
+    return (matrix @ diagonal_matrix_from_vector(inverse_norms)).tocsc(), norms
+
+
+def scale_columns(matrix, vector: np.ndarray):
+    return (matrix @ diagonal_matrix_from_vector(vector)).tocsc()
+
+
+def scale_rows(matrix, vector: np.ndarray):
+    """ Multiply row 'i' of 'matrix' by 'vector[i]'. The cost only depends on the number of nonzero entries of 'matrix'.
+    The result has the floating type of 'vector'. """
+    matrix = matrix.tocoo()
+    return coo_matrix((matrix.data * vector[matrix.row], (matrix.row, matrix.col)), shape=matrix.shape).tocsc().astype(
+        float_dtype_of(vector), copy=False)
+
+
+def coefficient_wise_matrix_product(matrix0, matrix1):
+    return matrix0.multiply(matrix1).tocsc()
+
+
+def column_wise_scalar_products(matrix0, matrix1) -> np.ndarray:
+    """ Entry 'j' is the scalar product of the 'j'-th columns of 'matrix0' and 'matrix1'. """
+    return np.asarray(matrix0.multiply(matrix1).sum(axis=0)).ravel()
+
+
+def row_wise_mean_of_nonzero_entries(matrix) -> np.ndarray:
+    """ Entry 'i' is the mean of the nonzero entries of row 'i' of 'matrix', or '0.' if there is none. """
+    matrix = csr_matrix(matrix)
+    matrix.eliminate_zeros()
+    sums = np.asarray(matrix.sum(axis=1)).ravel()
+    counts = np.diff(matrix.indptr)
+    return np.divide(sums, counts, out=zero_vector_from_length(len(sums), sums.dtype), where=counts != 0)
+
+
+def safe_division(numerators, denominators) -> np.ndarray:
+    """ Coefficient-wise division, returning '0.' where the denominator is '0.'. """
+    numerators, denominators = np.broadcast_arrays(numerators, denominators)
+    dtype = float_dtype_of(numerators, denominators)
+    return np.divide(numerators, denominators, out=zero_vector_from_length(len(numerators), dtype),
+                     where=denominators != 0)
+
+
+def safe_scalar_division(numerator, denominator):
+    """ Same as 'safe_division' for two numbers. """
+    if denominator == 0:
+        return 0.
+    return numerator / denominator
+
+
+def are_close_values(values0, values1) -> np.ndarray:
+    """ Coefficient-wise version of 'math.isclose' with its default tolerances. """
+    return np.abs(values0 - values1) <= 1e-9 * np.maximum(np.abs(values0), np.abs(values1))
+
+
+def nonzero_rows(matrix) -> np.ndarray:
+    return np.flatnonzero(np.diff(csr_matrix(matrix).indptr))
+
+
+def rows_of_matrix(matrix, row_indices):
+    return csr_matrix(matrix)[row_indices]
+
+
+def columns_of_csc_matrix(matrix, column_indices):
+    return matrix[:, column_indices]
+
+
+def matrix_with_rows_at_indices(rows, row_indices, number_of_rows):
+    """ Return the matrix with 'number_of_rows' rows, which row 'row_indices[k]' is the 'k'-th row of 'rows',
+    the other rows being zero. """
+    rows = rows.tocoo()
+    return coo_matrix((rows.data, (np.asarray(row_indices)[rows.row], rows.col)),
+                      shape=(number_of_rows, rows.shape[1])).tocsr()
+
+
+def matrix_with_replaced_rows(matrix, row_indices, rows) -> csr_matrix:
+    """ Return a copy of 'matrix' which row 'row_indices[k]' is the 'k'-th row of 'rows'. """
+    matrix, rows = matrix.tocoo(), rows.tocoo()
+    kept = ~mask_from_indices(row_indices, matrix.shape[0])[matrix.row]
+    return coo_matrix((np.concatenate([matrix.data[kept], rows.data]),
+                       (np.concatenate([matrix.row[kept], np.asarray(row_indices)[rows.row]]),
+                        np.concatenate([matrix.col[kept], rows.col]))), shape=matrix.shape).tocsr()
+
+
+def cosine_distance_matrix(normalized_columns0, normalized_columns1) -> np.ndarray:
+    """ Entry '(i, j)' is the cosine distance between column 'i' of 'normalized_columns0'
+    and column 'j' of 'normalized_columns1', both matrices having normalized columns. """
+    scalar_products = normalized_columns0.transpose() @ normalized_columns1
+    return 1. - scalar_products.toarray()
+
+
+def columns_nonzero_on_rows(matrix: csr_matrix, row_indices) -> np.ndarray:
+    """ Return the sorted indices of the columns of 'matrix' with a stored entry on one of the rows 'row_indices'. """
+    return np.unique(matrix[row_indices].indices)
+
+
+def nonzero_indices(vector: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(vector)
+
+
+def zero_vector_from_length(length: int, dtype=np.float64) -> np.ndarray:
+    return np.zeros(length, dtype=dtype)
+
+
+def one_vector_from_length(length: int, dtype=np.float64) -> np.ndarray:
+    return np.ones(length, dtype=dtype)
 
 
 def rescale_vector_to_satisfy_lower_negative_bound(vector, lower_bound):
-    min_element = min(vector)
+    if len(vector) == 0:
+        return vector
+    min_element = np.min(vector)
     if min_element < lower_bound:
         vector = lower_bound / min_element * vector
     return vector
 
 
+def make_read_only(vector: np.ndarray) -> np.ndarray:
+    vector.setflags(write=False)
+    return vector
+
+
 def transpose_matrix(matrix):
     return matrix.transpose()
 
@@ -130,3 +460,17 @@ def are_almost_colinear_vectors(vector0, vector1):
     for index in range(len(vector0)):
         if vector0[index] != 0.:
             return are_almost_equal_vectors(vector0 / vector0[index] * vector1[index], vector1)
+
+
+def blocks_of_bounded_cost(costs, budget):
+    """ Split the positions of 'costs' into consecutive blocks of total cost at most 'budget',
+    except for the blocks made of a single position. """
+    blocks = []
+    start = 0
+    cumulated_costs = np.cumsum(costs)
+    while start < len(costs):
+        offset = cumulated_costs[start - 1] if start > 0 else 0.
+        end = max(int(np.searchsorted(cumulated_costs, offset + budget, side='right')), start + 1)
+        blocks.append((start, end))
+        start = end
+    return blocks
@@ -0,0 +1,136 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Oracle claims compiled once against a 'VectorSpace': row 'k' of 'iterables_matrix0' and 'iterables_matrix1'
+is the indicator vector, on the iterable indices of the vector space, of the two collections of the 'k'-th claim,
+and its distance interval is '(lower_bounds[k], upper_bounds[k])'.
+The indices stay valid when iterables are added to the vector space, but not after 'compact',
+and the claims must then be compiled again. Collections containing iterables that are not in the vector space
+raise a 'KeyError', as when learning from them.
+
+An 'OracleClaimSet' is saved in a directory, one file per array, so that it can be opened memory-mapped:
+    metadata.json: format version, number of claims and number of iterable slots of the vector space
+    iterables0_indptr.npy, iterables0_indices.npy, iterables1_indptr.npy, iterables1_indices.npy:
+        the csr arrays of the two matrices, whose entries are all '1'
+    lower_bounds.npy, upper_bounds.npy: the bounds of the distance intervals
+"""
+
+
+import json
+import os
+import random
+from matrix_operations import *
+from persistence import array_path
+
+
+FORMAT_VERSION = 1
+METADATA_FILE_NAME = 'metadata.json'
+INDICATOR_DTYPE = np.int8
+
+
+class OracleClaimSet:
+
+    def __init__(self, iterables_matrix0, iterables_matrix1, lower_bounds, upper_bounds):
+        self.iterables_matrix0 = iterables_matrix0
+        self.iterables_matrix1 = iterables_matrix1
+        self.lower_bounds = lower_bounds
+        self.upper_bounds = upper_bounds
+
+    @classmethod
+    def from_oracle_claims(cls, oracle_claims, vector_space):
+        oracle_claims = list(oracle_claims)
+        iterables_matrices = [indicator_rows_from_index_map_and_collections(
+            vector_space.iterable_to_index, (oracle_claim.iterables_pair[side] for oracle_claim in oracle_claims),
+            vector_space.number_of_iterable_slots()) for side in (0, 1)]
+        lower_bounds = np.array([oracle_claim.distance_interval[0] for oracle_claim in oracle_claims], dtype=float)
+        upper_bounds = np.array([oracle_claim.distance_interval[1] for oracle_claim in oracle_claims], dtype=float)
+        return cls(*iterables_matrices, lower_bounds, upper_bounds)
+
+    def __len__(self):
+        return len(self.lower_bounds)
+
+    def __getitem__(self, claim_indices):
+        """ Return the 'OracleClaimSet' of the claims of 'claim_indices', a slice or an array of indices. """
+        if isinstance(claim_indices, slice):
+            claim_indices = np.arange(len(self))[claim_indices]
+        return OracleClaimSet(self.iterables_matrix0[claim_indices], self.iterables_matrix1[claim_indices],
+                              self.lower_bounds[claim_indices], self.upper_bounds[claim_indices])
+
+    def shuffled_claim_indices(self):
+        """ Return a permutation of the claim indices, drawn from the state of 'random'. """
+        return np.random.RandomState(random.getrandbits(32)).permutation(len(self))
+
+    def iterable_indices(self, claim_index):
+        """ Return the sorted indices of the iterables of the two collections of the claim 'claim_index'. """
+        return (row_indices_of_csr_matrix(self.iterables_matrix0, claim_index),
+                row_indices_of_csr_matrix(self.iterables_matrix1, claim_index))
+
+    def distance_interval(self, claim_index):
+        return float(self.lower_bounds[claim_index]), float(self.upper_bounds[claim_index])
+
+    def iterables_matrices(self, vector_space):
+        """ Return the two matrices whose column 'k' is the indicator vector of a collection of the 'k'-th claim,
+        as 'VectorSpace.iterable_matrix_from_collections' does. """
+        return tuple(transpose_matrix(with_number_of_columns(iterables_matrix,
+                                                             vector_space.number_of_iterable_slots()))
+                     .astype(vector_space.float_dtype()).tocsr()
+                     for iterables_matrix in (self.iterables_matrix0, self.iterables_matrix1))
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name, iterables_matrix in (('iterables0', self.iterables_matrix0), ('iterables1', self.iterables_matrix1)):
+            np.save(array_path(path, name + '_indptr'), iterables_matrix.indptr)
+            np.save(array_path(path, name + '_indices'), iterables_matrix.indices)
+        np.save(array_path(path, 'lower_bounds'), self.lower_bounds)
+        np.save(array_path(path, 'upper_bounds'), self.upper_bounds)
+        metadata = {'format_version': FORMAT_VERSION, 'number_of_claims': len(self),
+                    'number_of_iterable_slots': self.iterables_matrix0.shape[1]}
+        with open(os.path.join(path, METADATA_FILE_NAME), 'w') as metadata_file:
+            json.dump(metadata, metadata_file)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """ With 'mmap', the arrays are read-only memory maps of the files,
+        except the entries of the matrices, which are not stored. """
+        with open(os.path.join(path, METADATA_FILE_NAME)) as metadata_file:
+            metadata = json.load(metadata_file)
+        if metadata['format_version'] != FORMAT_VERSION:
+            raise ValueError('unsupported format version {} in {}'.format(metadata['format_version'], path))
+        mmap_mode = 'r' if mmap else None
+        shape = (metadata['number_of_claims'], metadata['number_of_iterable_slots'])
+        iterables_matrices = []
+        for name in ('iterables0', 'iterables1'):
+            indptr = np.load(array_path(path, name + '_indptr'), mmap_mode=mmap_mode)
+            indices = np.load(array_path(path, name + '_indices'), mmap_mode=mmap_mode)
+            iterables_matrix = csr_matrix((np.ones(len(indices), dtype=INDICATOR_DTYPE), indices, indptr),
+                                          shape=shape, copy=False)
+            iterables_matrix.has_sorted_indices = True
+            iterables_matrices.append(iterables_matrix)
+        return cls(*iterables_matrices, np.load(array_path(path, 'lower_bounds'), mmap_mode=mmap_mode),
+                   np.load(array_path(path, 'upper_bounds'), mmap_mode=mmap_mode))
+
+
+def indicator_rows_from_index_map_and_collections(to_index, collections, length):
+    """ Row 'k' of the returned csr matrix, with sorted indices, is the indicator vector of the 'k'-th collection. """
+    iterables_matrix = transpose_matrix(indicator_matrix_from_index_map_and_collections(
+        to_index, collections, length=length, dtype=INDICATOR_DTYPE)).tocsr()
+    iterables_matrix.sort_indices()
+    return iterables_matrix
+
+
+def row_indices_of_csr_matrix(matrix, row_index):
+    return np.asarray(matrix.indices[matrix.indptr[row_index]:matrix.indptr[row_index + 1]], dtype=np.int64)
+
+
+def with_number_of_columns(matrix, number_of_columns):
+    """ Return the csr 'matrix' padded with zero columns up to 'number_of_columns' columns. """
+    if matrix.shape[1] == number_of_columns:
+        return matrix
+    if matrix.shape[1] > number_of_columns:
+        raise ValueError('the oracle claims were compiled against a larger vector space')
+    return csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], number_of_columns))
@@ -0,0 +1,152 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Learning of a 'LearningDistance' from oracle claims split into shards, each shard being treated by a worker process.
+The item / iterable matrix, its column-major version, computed once by the parent process, and the weight vectors
+are stored in shared memory and opened by the workers without copy.
+So are the oracle claims, compiled once to iterable indices ('OracleClaimSet'): the workers have no index maps,
+and each task only receives the indices of the claims of its shard.
+
+With the 'synchronous' schedule, at each iteration, every worker starts from the current weights,
+learns sequentially from the claims of its shard on a private copy of the weights,
+and returns the rescaling vectors it applied. On each coordinate, the rescalings of the shards that moved
+this coordinate are averaged and applied to the global weights.
+Given a seed, the result does not depend on the timing of the workers.
+
+With the 'asynchronous' schedule, the workers apply the rescaling of each claim directly to the shared weights,
+without lock. The shuffling of the claims is then reproducible given a seed, but not the interleaving of the updates.
+"""
+
+
+import random
+from multiprocessing import Pool
+from matrix_operations import *
+from learning_distance import LearningDistance, SparseEnrichedOracleClaim, DEFAULT_NUMBER_OF_ITERATIONS
+from oracle_claim_set import OracleClaimSet
+from shared_arrays import SharedArrays, csr_matrix_arrays, csr_matrix_from_arrays, csc_matrix_from_arrays
+
+
+SYNCHRONOUS = 'synchronous'
+ASYNCHRONOUS = 'asynchronous'
+SCHEDULES = (SYNCHRONOUS, ASYNCHRONOUS)
+
+worker_state = dict()
+
+
+def learn_in_parallel(learning_distance, oracle_claims, number_of_workers, schedule=SYNCHRONOUS,
+                      ratio_item_iterable_learning=0.5, convergence_speed=0.5,
+                      number_of_iterations=DEFAULT_NUMBER_OF_ITERATIONS, seed=None):
+    """ Same as 'learning_distance.learn', with the oracle claims split among 'number_of_workers' processes.
+    'oracle_claims' may be an 'OracleClaimSet' compiled against 'learning_distance'. """
+    if schedule not in SCHEDULES:
+        raise ValueError('schedule must be one of {}, got {}'.format(SCHEDULES, schedule))
+    if not isinstance(oracle_claims, OracleClaimSet):
+        oracle_claims = OracleClaimSet.from_oracle_claims(oracle_claims, learning_distance)
+    shards = split_into_shards(np.arange(len(oracle_claims)), number_of_workers, seed)
+    matrix = learning_distance.item_iterable_matrix
+    shared_arrays = SharedArrays.from_arrays(csr_matrix_arrays(matrix) + [learning_distance.item_weights_vector,
+                                                                          learning_distance.iterable_weights_vector]
+                                             + oracle_claim_set_arrays(oracle_claims)
+                                             + csr_matrix_arrays(learning_distance.item_iterable_csc_matrix()))
+    learning_parameters = (ratio_item_iterable_learning, convergence_speed, seed)
+    initialization_arguments = (shared_arrays.descriptors, matrix.shape, oracle_claims.iterables_matrix0.shape,
+                                learning_parameters)
+    try:
+        with Pool(number_of_workers, initializer=initialize_worker, initargs=initialization_arguments) as pool:
+            shared_item_weights_vector, shared_iterable_weights_vector = shared_arrays.arrays[3:5]
+            if schedule == SYNCHRONOUS:
+                for iteration in range(number_of_iterations):
+                    rescalings = pool.starmap(learn_synchronously_on_shard,
+                                              [(shard_index, shard, iteration) for shard_index, shard in
+                                               enumerate(shards)])
+                    item_rescalings, iterable_rescalings = zip(*rescalings)
+                    shared_item_weights_vector *= averaged_rescaling_vector(item_rescalings)
+                    shared_iterable_weights_vector *= averaged_rescaling_vector(iterable_rescalings)
+            else:
+                pool.starmap(learn_asynchronously_on_shard,
+                             [(shard_index, shard, number_of_iterations) for shard_index, shard in enumerate(shards)])
+        learning_distance.item_weights_vector = shared_item_weights_vector.copy()
+        learning_distance.iterable_weights_vector = shared_iterable_weights_vector.copy()
+        learning_distance.notify_weights_change()
+    finally:
+        shared_arrays.close()
+
+
+def split_into_shards(claim_indices, number_of_shards, seed=None):
+    claim_indices = list(claim_indices)
+    random.Random(seed).shuffle(claim_indices)
+    return [claim_indices[shard_index::number_of_shards] for shard_index in range(number_of_shards)]
+
+
+def oracle_claim_set_arrays(oracle_claim_set):
+    return (csr_matrix_arrays(oracle_claim_set.iterables_matrix0)
+            + csr_matrix_arrays(oracle_claim_set.iterables_matrix1)
+            + [oracle_claim_set.lower_bounds, oracle_claim_set.upper_bounds])
+
+
+def averaged_rescaling_vector(rescaling_vectors):
+    """ On each coordinate, average the rescaling factors different from '1.'. """
+    deviations = csr_matrix(np.column_stack(rescaling_vectors) - 1.)
+    return 1. + row_wise_mean_of_nonzero_entries(deviations)
+
+
+def initialize_worker(descriptors, matrix_shape, claims_shape, learning_parameters):
+    shared_arrays = SharedArrays.attach(descriptors)
+    matrix = csr_matrix_from_arrays(shared_arrays.arrays[:3], matrix_shape)
+    shared_item_weights_vector, shared_iterable_weights_vector = shared_arrays.arrays[3:5]
+    worker_state['shared_arrays'] = shared_arrays
+    # The claims are given by iterable indices, so that the distance of a worker needs no index map.
+    worker_state['distance'] = LearningDistance.from_components(
+        None, None, matrix, shared_item_weights_vector, shared_iterable_weights_vector,
+        item_iterable_csc_matrix=csc_matrix_from_arrays(shared_arrays.arrays[13:], matrix_shape))
+    worker_state['oracle_claim_set'] = OracleClaimSet(csr_matrix_from_arrays(shared_arrays.arrays[5:8], claims_shape),
+                                                      csr_matrix_from_arrays(shared_arrays.arrays[8:11], claims_shape),
+                                                      *shared_arrays.arrays[11:13])
+    worker_state['learning_parameters'] = learning_parameters
+
+
+def shuffled_shard(shard, shard_index, iteration):
+    _, _, seed = worker_state['learning_parameters']
+    shard = list(shard)
+    generator = random.Random(None if seed is None else '{}-{}-{}'.format(seed, shard_index, iteration))
+    generator.shuffle(shard)
+    return shard
+
+
+def learn_from_claim(claim_index):
+    distance = worker_state['distance']
+    ratio_item_iterable_learning, convergence_speed, _ = worker_state['learning_parameters']
+    distance.learn_from_sparse_enriched_oracle_claim(
+        SparseEnrichedOracleClaim.from_oracle_claim_set(worker_state['oracle_claim_set'], claim_index, distance,
+                                                        effort=convergence_speed),
+        ratio_item_iterable_learning)
+
+
+def learn_synchronously_on_shard(shard_index, shard, iteration):
+    distance = worker_state['distance']
+    shared_item_weights_vector, shared_iterable_weights_vector = worker_state['shared_arrays'].arrays[3:5]
+    distance.item_weights_vector = shared_item_weights_vector.copy()
+    distance.iterable_weights_vector = shared_iterable_weights_vector.copy()
+    for claim_index in shuffled_shard(shard, shard_index, iteration):
+        learn_from_claim(claim_index)
+    item_rescaling = 1. + safe_division(distance.item_weights_vector - shared_item_weights_vector,
+                                        shared_item_weights_vector)
+    iterable_rescaling = 1. + safe_division(distance.iterable_weights_vector - shared_iterable_weights_vector,
+                                            shared_iterable_weights_vector)
+    return item_rescaling, iterable_rescaling
+
+
+def learn_asynchronously_on_shard(shard_index, shard, number_of_iterations):
+    distance = worker_state['distance']
+    shared_item_weights_vector, shared_iterable_weights_vector = worker_state['shared_arrays'].arrays[3:5]
+    distance.item_weights_vector = shared_item_weights_vector
+    distance.iterable_weights_vector = shared_iterable_weights_vector
+    for iteration in range(number_of_iterations):
+        # The weight vectors of the distance are the shared ones, which are rescaled in place.
+        for claim_index in shuffled_shard(shard, shard_index, iteration):
+            learn_from_claim(claim_index)
@@ -0,0 +1,151 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Storage of the components of a 'Distance' in a directory:
+    metadata.json: format version, shape of the item / iterable matrix and weighting scheme
+    item_iterable_matrix_data.npy, item_iterable_matrix_indices.npy, item_iterable_matrix_indptr.npy:
+        the csr arrays of the item / iterable matrix
+    item_weights_vector.npy, iterable_weights_vector.npy: the weight vectors
+    item_vocabulary_<array name>.npy, iterable_vocabulary_<array name>.npy: the arrays of the index maps,
+        stored as 'Vocabulary' objects whenever their keys can be encoded by 'encode_key',
+        or, for the other index maps,
+        item_keys.pickle, iterable_keys.pickle: the items and iterables, ordered by index,
+        or, for index maps that are 'FactorIndex' objects,
+        iterable_factor_hashes.npy: the sorted hashes of the factors,
+        and nothing for index maps that are 'ItemBuckets' objects, described in metadata.json
+The '.npy' files can be opened memory-mapped, so that processes opening the same directory share their pages.
+"""
+
+
+import json
+import os
+import pickle
+import numpy as np
+from scipy.sparse import csr_matrix
+from vocabulary import Vocabulary, encode_key
+from factors import FactorIndex
+from hashed_vector_space import ItemBuckets
+from weighting import DEFAULT_WEIGHTING
+
+
+FORMAT_VERSION = 1
+METADATA_FILE_NAME = 'metadata.json'
+MATRIX_ARRAY_NAMES = ('data', 'indices', 'indptr')
+VOCABULARY_ARRAY_NAMES = ('buffer', 'offsets', 'hashes', 'table')
+PICKLE_INDEX_MAP = 'pickle'
+VOCABULARY_INDEX_MAP = 'vocabulary'
+FACTOR_INDEX_MAP = 'factors'
+BUCKETS_INDEX_MAP = 'buckets'
+
+
+def save_components(path, item_to_index, iterable_to_index, item_iterable_matrix,
+                    item_weights_vector, iterable_weights_vector, weighting=DEFAULT_WEIGHTING):
+    os.makedirs(path, exist_ok=True)
+    for array_name in MATRIX_ARRAY_NAMES:
+        np.save(array_path(path, 'item_iterable_matrix_' + array_name), getattr(item_iterable_matrix, array_name))
+    np.save(array_path(path, 'item_weights_vector'), item_weights_vector)
+    np.save(array_path(path, 'iterable_weights_vector'), iterable_weights_vector)
+    metadata = {'format_version': FORMAT_VERSION, 'shape': list(item_iterable_matrix.shape),
+                'item_index_map': save_index_map(path, 'item', item_to_index),
+                'iterable_index_map': save_index_map(path, 'iterable', iterable_to_index), 'weighting': weighting}
+    with open(os.path.join(path, METADATA_FILE_NAME), 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
+
+
+def load_components(path, mmap=True):
+    """ Return the arguments of 'Distance.from_components'.
+    With 'mmap', the arrays are read-only memory maps of the files. """
+    metadata = load_metadata(path)
+    mmap_mode = 'r' if mmap else None
+    matrix_arrays = [np.load(array_path(path, 'item_iterable_matrix_' + array_name), mmap_mode=mmap_mode)
+                     for array_name in MATRIX_ARRAY_NAMES]
+    item_iterable_matrix = csr_matrix(tuple(matrix_arrays), shape=tuple(metadata['shape']), copy=False)
+    item_weights_vector = np.load(array_path(path, 'item_weights_vector'), mmap_mode=mmap_mode)
+    iterable_weights_vector = np.load(array_path(path, 'iterable_weights_vector'), mmap_mode=mmap_mode)
+    item_to_index = load_index_map(path, 'item', metadata.get('item_index_map', PICKLE_INDEX_MAP), mmap_mode)
+    iterable_to_index = load_index_map(path, 'iterable', metadata.get('iterable_index_map', PICKLE_INDEX_MAP),
+                                       mmap_mode)
+    return item_to_index, iterable_to_index, item_iterable_matrix, item_weights_vector, iterable_weights_vector
+
+
+def load_weighting(path):
+    """ Return the weighting scheme of the saved distance, 'DEFAULT_WEIGHTING' for directories saved without it. """
+    return load_metadata(path).get('weighting', DEFAULT_WEIGHTING)
+
+
+def load_metadata(path):
+    with open(os.path.join(path, METADATA_FILE_NAME)) as metadata_file:
+        metadata = json.load(metadata_file)
+    if metadata['format_version'] != FORMAT_VERSION:
+        raise ValueError('unsupported format version {} in {}'.format(metadata['format_version'], path))
+    return metadata
+
+
+def array_path(path, array_name):
+    return os.path.join(path, array_name + '.npy')
+
+
+def save_index_map(path, name, to_index):
+    """ Return the kind of storage used for 'to_index', with its parameters if any.
+    Dicts are stored as vocabularies when possible, so that they are memory-mapped when loaded. """
+    if not isinstance(to_index, (Vocabulary, FactorIndex, ItemBuckets)):
+        to_index = vocabulary_from_index_map(to_index) or to_index
+    if isinstance(to_index, Vocabulary):
+        for array_name, array in zip(VOCABULARY_ARRAY_NAMES, to_index.arrays()):
+            np.save(array_path(path, name + '_vocabulary_' + array_name), array)
+        return VOCABULARY_INDEX_MAP
+    if isinstance(to_index, FactorIndex):
+        np.save(array_path(path, name + '_factor_hashes'), to_index.hashes)
+        return [FACTOR_INDEX_MAP, to_index.maximum_factor_length]
+    if isinstance(to_index, ItemBuckets):
+        return [BUCKETS_INDEX_MAP, to_index.number_of_buckets, to_index.signed_hashing, to_index.seed]
+    save_keys(os.path.join(path, name + '_keys.pickle'), to_index)
+    return PICKLE_INDEX_MAP
+
+
+def load_index_map(path, name, index_map_kind, mmap_mode):
+    if index_map_kind == VOCABULARY_INDEX_MAP:
+        return Vocabulary.from_arrays(*[np.load(array_path(path, name + '_vocabulary_' + array_name),
+                                                mmap_mode=mmap_mode)
+                                        for array_name in VOCABULARY_ARRAY_NAMES])
+    if isinstance(index_map_kind, list) and index_map_kind[0] == FACTOR_INDEX_MAP:
+        return FactorIndex(np.load(array_path(path, name + '_factor_hashes'), mmap_mode=mmap_mode), index_map_kind[1])
+    if isinstance(index_map_kind, list) and index_map_kind[0] == BUCKETS_INDEX_MAP:
+        return ItemBuckets(*index_map_kind[1:])
+    return load_keys(os.path.join(path, name + '_keys.pickle'))
+
+
+def vocabulary_from_index_map(to_index):
+    """ Return the 'Vocabulary' with the keys and indices of 'to_index',
+    or None if a key cannot be encoded or the indices are not consecutive. """
+    keys = [None] * len(to_index)
+    try:
+        for key, index in to_index.items():
+            encode_key(key)
+            keys[index] = key
+    except (TypeError, IndexError):
+        return None
+    vocabulary = Vocabulary()
+    for index, key in enumerate(keys):
+        if vocabulary.add(key) != index:
+            return None
+    return vocabulary
+
+
+def save_keys(file_path, to_index):
+    keys = [None] * len(to_index)
+    for key, index in to_index.items():
+        keys[index] = key
+    with open(file_path, 'wb') as keys_file:
+        pickle.dump(keys, keys_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_keys(file_path):
+    with open(file_path, 'rb') as keys_file:
+        keys = pickle.load(keys_file)
+    return {key: index for index, key in enumerate(keys)}
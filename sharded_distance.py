@@ -0,0 +1,369 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Distance whose iterables are split among shards, each shard being held by a worker process.
+
+The vectorization of a collection is 'item_weights * (item_iterable_matrix @ (iterable_weights * iterables_vector))',
+so the iterable dimension partitions: each shard holds the columns of its iterables, on all the items,
+with their weights, and computes 'columns @ (iterable_weights * iterables_vector)' on its part of a collection.
+The coordinator, the 'ShardedDistance' object, holds the index map and the weights of the items.
+It sums the partial vectorizations of the shards, multiplies them by the item weights and computes the distance.
+An iterable belongs to the shard given by the crc32 of its encoding by 'encode_key' (see vocabulary.py),
+so its keys must be those of a 'Vocabulary', and equal iterables of different types, such as '1' and '1.',
+may belong to different shards.
+
+Learning follows 'LearningDistance.learn_from_one_oracle_claim': for each claim, the shards owning its iterables
+compute their partial vectorizations, then the products of their columns with the weighted vectorizations,
+and finally rescale the weights of their iterables, while the coordinator rescales the weights of the items.
+The shards communicate with the coordinator through pipes, and all the requests of a step are sent
+before waiting for the answers, so that the shards work concurrently. The weights are float64.
+"""
+
+
+import math
+import random
+import zlib
+from collections import defaultdict
+from itertools import chain, count
+from multiprocessing import Pipe, Process
+from matrix_operations import *
+from vocabulary import encode_key
+from distance import normalize_distribution
+from learning_distance import (DEFAULT_NUMBER_OF_ITERATIONS, closest_point_from_interval,
+                               rescale_vector_from_gradient_and_effort, non_trivial_hadamard_scalar_product)
+from weighting import (DEFAULT_WEIGHTING, check_weighting, item_weights_vector_from_document_frequencies,
+                       unnormalized_iterable_weights)
+
+
+DEFAULT_NUMBER_OF_SHARDS = 2
+DEFAULT_CHUNK_SIZE = 4096
+
+
+class ShardedDistance:
+
+    def __init__(self, iterables, number_of_shards=DEFAULT_NUMBER_OF_SHARDS, item_to_weight=None,
+                 iterable_to_weight=None, weighting=DEFAULT_WEIGHTING, chunk_size=DEFAULT_CHUNK_SIZE):
+        """ 'iterables' is read once and sent to the shards by chunks of 'chunk_size' iterables.
+        The weights that are not provided follow the scheme 'weighting', computed on all the iterables,
+        as in 'Distance'. """
+        if number_of_shards < 1:
+            raise ValueError('number_of_shards must be positive, got {}'.format(number_of_shards))
+        check_weighting(weighting)
+        self.number_of_shards = number_of_shards
+        self.connections = []
+        self.processes = []
+        for _ in range(number_of_shards):
+            connection, worker_connection = Pipe()
+            process = Process(target=serve_shard, args=(worker_connection,), name='Shard', daemon=True)
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        self.closed = False
+        try:
+            self.item_to_index = self.distribute_iterables(iterables, chunk_size)
+            self.initialize_weights(item_to_weight, iterable_to_weight, weighting)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+    def close(self):
+        """ Stop the worker processes. """
+        if self.closed:
+            return
+        self.closed = True
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for connection, process in zip(self.connections, self.processes):
+            process.join()
+            connection.close()
+
+    def shard_of_iterable(self, iterable):
+        return zlib.crc32(encode_key(iterable)) % self.number_of_shards
+
+    def distribute_iterables(self, iterables, chunk_size):
+        """ Send the iterables to their shards, and return the index map of the items. """
+        item_to_index = defaultdict(count().__next__)
+        chunks = [[] for _ in range(self.number_of_shards)]
+        for iterable in iterables:
+            shard = self.shard_of_iterable(iterable)
+            chunks[shard].append(iterable)
+            if len(chunks[shard]) == chunk_size:
+                self.send_chunk(shard, chunks[shard], item_to_index)
+                chunks[shard] = []
+        for shard, chunk in enumerate(chunks):
+            if chunk:
+                self.send_chunk(shard, chunk, item_to_index)
+        item_to_index = dict(item_to_index)
+        self.shard_statistics = self.request_all('finish_construction', len(item_to_index))
+        return item_to_index
+
+    def send_chunk(self, shard, chunk, item_to_index):
+        """ The items are given their global indices here, and each distinct iterable of the chunk
+        is sent once, with the positions of its occurrences. """
+        iterable_to_position = defaultdict(count().__next__)
+        item_indices, positions = index_arrays_from_iterables(chunk, item_to_index, iterable_to_position)
+        self.post(shard, 'add_iterables', list(iterable_to_position), item_indices, positions)
+
+    def initialize_weights(self, item_to_weight, iterable_to_weight, weighting):
+        self.weighting = weighting
+        document_frequencies, numbers_of_iterables, total_lengths = zip(*self.shard_statistics.values())
+        number_of_iterables = sum(numbers_of_iterables)
+        if item_to_weight is None:
+            self.item_weights_vector = item_weights_vector_from_document_frequencies(
+                np.sum(document_frequencies, axis=0), number_of_iterables, weighting)
+        else:
+            self.item_weights_vector = vector_from_index_and_value_maps(self.item_to_index,
+                                                                        normalize_distribution(item_to_weight))
+        if iterable_to_weight is None:
+            mean_length = sum(total_lengths) / max(number_of_iterables, 1)
+            total_weight = sum(self.request_all('set_default_iterable_weights', mean_length, weighting).values())
+            if total_weight != 0:
+                self.request_all('scale_iterable_weights', 1. / total_weight)
+        else:
+            iterable_to_weight = normalize_distribution(iterable_to_weight)
+            parts = [dict() for _ in range(self.number_of_shards)]
+            for iterable, weight in iterable_to_weight.items():
+                parts[self.shard_of_iterable(iterable)][iterable] = weight
+            self.request({shard: ('set_iterable_weights', (part,)) for shard, part in enumerate(parts)})
+
+    def number_of_iterables(self):
+        return sum(number_of_iterables for _, number_of_iterables, _ in self.shard_statistics.values())
+
+    def __call__(self, iterables0, iterables1):
+        (item_indices0, values0, norm0), (item_indices1, values1, norm1) = self.sparse_vectorizations_with_norms(
+            [iterables0, iterables1])
+        return sparse_cosine_distance_from_norms(item_indices0, values0, norm0, item_indices1, values1, norm1)
+
+    def vectorize(self, iterables):
+        (item_indices, values, _), = self.sparse_vectorizations_with_norms([iterables])
+        vectorization = zero_vector_from_length(len(self.item_to_index))
+        vectorization[item_indices] = values
+        return vectorization
+
+    def sparse_vectorize_with_norm(self, iterables):
+        """ Same as 'Distance.sparse_vectorize_with_norm'. """
+        return self.sparse_vectorizations_with_norms([iterables])[0]
+
+    def sparse_vectorizations_with_norms(self, iterables_collections):
+        """ Return the list of the results of 'sparse_vectorize_with_norm' on the collections,
+        with a single request to each shard owning some of their iterables. """
+        parts = self.collections_by_shard(iterables_collections)
+        answers = self.request({shard: ('partial_vectorizations', (collections,))
+                                for shard, collections in parts.items()})
+        results = []
+        for position in range(len(iterables_collections)):
+            item_indices, values = sum_of_sparse_vectors(
+                [np.zeros(0, dtype=np.int64)] + [answer[position][0] for answer in answers.values()],
+                [np.zeros(0)] + [answer[position][1] for answer in answers.values()])
+            values = coefficient_wise_vector_product(self.item_weights_vector[item_indices], values)
+            results.append((item_indices, values, norm(values)))
+        return results
+
+    def collections_by_shard(self, iterables_collections):
+        """ Return the dictionary mapping each shard owning some iterables of the collections to the list of
+        the distinct iterables it owns in each collection. """
+        parts = defaultdict(lambda: [[] for _ in iterables_collections])
+        for position, iterables in enumerate(iterables_collections):
+            for iterable in dict.fromkeys(iterables):
+                parts[self.shard_of_iterable(iterable)][position].append(iterable)
+        return parts
+
+    def learn(self, oracle_claims, ratio_item_iterable_learning=0.5, convergence_speed=0.5,
+              number_of_iterations=DEFAULT_NUMBER_OF_ITERATIONS):
+        """ Same as 'LearningDistance.learn' without batches. """
+        oracle_claims = list(oracle_claims)
+        for _ in range(number_of_iterations):
+            random.shuffle(oracle_claims)
+            for oracle_claim in oracle_claims:
+                self.learn_from_one_oracle_claim(oracle_claim,
+                                                 ratio_item_iterable_learning=ratio_item_iterable_learning,
+                                                 effort=convergence_speed)
+
+    def learn_from_one_oracle_claim(self, oracle_claim, ratio_item_iterable_learning=0.5, effort=1.):
+        """ Same update as 'LearningDistance.learn_from_one_oracle_claim' (see above).
+        Return whether the weights were updated. """
+        iterables0, iterables1 = oracle_claim.iterables_pair
+        (item_indices0, values0, norm0), (item_indices1, values1, norm1) = self.sparse_vectorizations_with_norms(
+            [iterables0, iterables1])
+        current_distance = sparse_cosine_distance_from_norms(item_indices0, values0, norm0,
+                                                             item_indices1, values1, norm1)
+        target_distance = closest_point_from_interval(current_distance, oracle_claim.distance_interval)
+        target_distance = current_distance + effort * (target_distance - current_distance)
+        if math.isclose(current_distance, target_distance) or math.isclose(norm0, 0) or math.isclose(norm1, 0):
+            return False
+        r = ratio_item_iterable_learning
+        item_indices = np.union1d(item_indices0, item_indices1)
+        vectorization0 = vector_on_support(item_indices0, values0, item_indices)
+        vectorization1 = vector_on_support(item_indices1, values1, item_indices)
+        matrix_of_coefficients = (((1. - current_distance) * norm1 / norm0, -1.),
+                                  (-1., (1. - current_distance) * norm0 / norm1))
+        gradient_item = non_trivial_hadamard_scalar_product((vectorization0, vectorization1), matrix_of_coefficients,
+                                                            (vectorization0, vectorization1))
+        item_weights_vector = self.item_weights_vector[item_indices]
+        parts = {shard: collections[0] for shard, collections
+                 in self.collections_by_shard([chain(iterables0, iterables1)]).items()}
+        answers = self.request({shard: ('transposed_products', (iterables, item_indices,
+                                                                item_weights_vector * vectorization0,
+                                                                item_weights_vector * vectorization1))
+                                for shard, iterables in parts.items()})
+        claim_iterables = [iterable for iterables in parts.values() for iterable in iterables]
+        set0, set1 = set(iterables0), set(iterables1)
+        iterables_vector0 = np.array([iterable in set0 for iterable in claim_iterables], dtype=np.float64)
+        iterables_vector1 = np.array([iterable in set1 for iterable in claim_iterables], dtype=np.float64)
+        u0 = np.concatenate([np.zeros(0)] + [answer[0] for answer in answers.values()])
+        u1 = np.concatenate([np.zeros(0)] + [answer[1] for answer in answers.values()])
+        gradient_iterable = non_trivial_hadamard_scalar_product((iterables_vector0, iterables_vector1),
+                                                                matrix_of_coefficients, (u0, u1))
+        common_factor = safe_scalar_division(norm0 * norm1 * (target_distance - current_distance),
+                                             r ** 2 * norm(gradient_item) ** 2
+                                             + (1. - r) ** 2 * norm(gradient_iterable) ** 2)
+        self.item_weights_vector[item_indices] *= rescale_vector_from_gradient_and_effort(
+            gradient_item * common_factor * r, effort)
+        iterable_rescaling = rescale_vector_from_gradient_and_effort(gradient_iterable * common_factor * (1. - r),
+                                                                     effort)
+        boundaries = np.cumsum([0] + [len(iterables) for iterables in parts.values()])
+        self.request({shard: ('rescale_iterable_weights', (iterables, iterable_rescaling[start:end]))
+                      for (shard, iterables), start, end in zip(parts.items(), boundaries[:-1], boundaries[1:])})
+        return True
+
+    def get_item_weights(self):
+        return dict_from_index_map_and_vector(self.item_to_index, self.item_weights_vector)
+
+    def get_iterable_weights(self):
+        iterable_to_weight = dict()
+        for part in self.request_all('iterable_weights').values():
+            iterable_to_weight.update(part)
+        return iterable_to_weight
+
+    def post(self, shard, command, *arguments):
+        """ Send a command without waiting for its answer. Its error, if any, is raised by the next 'request'. """
+        self.connections[shard].send((command, arguments, False))
+
+    def request(self, messages):
+        """ Send the pairs '(command, arguments)' of the dictionary 'messages' to their shards,
+        and return the dictionary of the answers. The first error of a shard is raised
+        once all the answers are received, so that the pipes stay synchronized. """
+        for shard, (command, arguments) in messages.items():
+            self.connections[shard].send((command, arguments, True))
+        answers = dict()
+        errors = []
+        for shard in messages:
+            answers[shard], error = self.connections[shard].recv()
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise errors[0]
+        return answers
+
+    def request_all(self, command, *arguments):
+        return self.request({shard: (command, arguments) for shard in range(self.number_of_shards)})
+
+
+class Shard:
+    """ Part of a 'ShardedDistance' held by a worker process: the columns of its iterables
+    in the item / iterable matrix, on all the items, and the weights of its iterables. """
+
+    def __init__(self):
+        self.iterable_to_index = defaultdict(count().__next__)
+        self.item_index_arrays = [np.zeros(0, dtype=np.int64)]
+        self.iterable_index_arrays = [np.zeros(0, dtype=np.int64)]
+
+    def add_iterables(self, iterables, item_indices, positions):
+        iterable_indices = np.fromiter(map(self.iterable_to_index.__getitem__, iterables), dtype=np.int64,
+                                       count=len(iterables))
+        self.item_index_arrays.append(item_indices)
+        self.iterable_index_arrays.append(iterable_indices[positions])
+
+    def finish_construction(self, number_of_items):
+        """ Build the matrix, and return the document frequencies of the items in the shard,
+        its number of iterables and the total length of its iterables. """
+        self.iterable_to_index = dict(self.iterable_to_index)
+        self.matrix = matrix_from_index_arrays(np.concatenate(self.item_index_arrays),
+                                               np.concatenate(self.iterable_index_arrays),
+                                               (number_of_items, len(self.iterable_to_index))).tocsc()
+        self.item_index_arrays = self.iterable_index_arrays = None
+        self.lengths = absolute_column_sums(self.matrix)
+        self.iterable_weights_vector = zero_vector_from_length(len(self.iterable_to_index))
+        document_frequencies = np.bincount(self.matrix.indices, minlength=number_of_items)
+        return document_frequencies, len(self.iterable_to_index), float(np.sum(self.lengths))
+
+    def set_default_iterable_weights(self, mean_length, weighting):
+        """ Return the total of the weights, which the coordinator normalizes on all the shards. """
+        self.iterable_weights_vector = unnormalized_iterable_weights(self.lengths, mean_length, weighting)
+        return float(np.sum(self.iterable_weights_vector))
+
+    def scale_iterable_weights(self, factor):
+        self.iterable_weights_vector *= factor
+
+    def set_iterable_weights(self, iterable_to_weight):
+        self.iterable_weights_vector = vector_from_index_and_value_maps(self.iterable_to_index, iterable_to_weight)
+
+    def iterable_indices(self, iterables):
+        return np.fromiter(map(self.iterable_to_index.__getitem__, iterables), dtype=np.int64, count=len(iterables))
+
+    def partial_vectorizations(self, iterables_collections):
+        """ Return, for each collection of iterables of the shard, the sorted indices and the values
+        of the combination of their columns by their weights. """
+        results = []
+        for iterables in iterables_collections:
+            iterable_indices = self.iterable_indices(iterables)
+            results.append(sparse_columns_combination(columns_of_csc_matrix(self.matrix, iterable_indices),
+                                                      self.iterable_weights_vector[iterable_indices]))
+        return results
+
+    def transposed_products(self, iterables, item_indices, weighted_vectorization0, weighted_vectorization1):
+        """ Return the vectors 'u0' and 'u1' of 'LearningDistance.compute_sparse_item_and_iterable_gradients'
+        on 'iterables'. """
+        iterable_indices = self.iterable_indices(iterables)
+        columns = columns_of_csc_matrix(self.matrix, iterable_indices)
+        iterable_weights_vector = self.iterable_weights_vector[iterable_indices]
+        return (coefficient_wise_vector_product(iterable_weights_vector, sparse_transposed_dot_products(
+                    columns, item_indices, weighted_vectorization0)),
+                coefficient_wise_vector_product(iterable_weights_vector, sparse_transposed_dot_products(
+                    columns, item_indices, weighted_vectorization1)))
+
+    def rescale_iterable_weights(self, iterables, rescaling):
+        self.iterable_weights_vector[self.iterable_indices(iterables)] *= rescaling
+
+    def iterable_weights(self):
+        return dict_from_index_map_and_vector(self.iterable_to_index, self.iterable_weights_vector)
+
+
+def serve_shard(connection):
+    """ Loop of a worker process: apply the commands received to its 'Shard' until receiving 'None'.
+    The error of a command sent without waiting for its answer is returned with the next answer. """
+    shard = Shard()
+    pending_error = None
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        command, arguments, answered = message
+        result, error = None, None
+        try:
+            result = getattr(shard, command)(*arguments)
+        except Exception as exception:
+            error = exception
+        if not answered:
+            pending_error = pending_error or error
+            continue
+        connection.send((result, pending_error or error))
+        pending_error = None
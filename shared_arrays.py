@@ -0,0 +1,70 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+from multiprocessing import shared_memory
+import numpy as np
+from scipy.sparse import csr_matrix, csc_matrix
+
+
+class SharedArrays:
+    """ NumPy arrays stored in shared memory blocks, which other processes can open without copy.
+    The 'descriptors' attribute is a picklable description of the arrays, to be provided to 'attach'. """
+
+    def __init__(self, shared_memories, arrays, descriptors, owner):
+        self.shared_memories = shared_memories
+        self.arrays = arrays
+        self.descriptors = descriptors
+        self.owner = owner
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        shared_memories, shared_arrays, descriptors = [], [], []
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            shared_memory_block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            shared_array = np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory_block.buf)
+            shared_array[...] = array
+            shared_memories.append(shared_memory_block)
+            shared_arrays.append(shared_array)
+            descriptors.append((shared_memory_block.name, array.shape, array.dtype.str))
+        return cls(shared_memories, shared_arrays, descriptors, owner=True)
+
+    @classmethod
+    def attach(cls, descriptors):
+        shared_memories, shared_arrays = [], []
+        for name, shape, dtype in descriptors:
+            shared_memory_block = shared_memory.SharedMemory(name=name)
+            shared_memories.append(shared_memory_block)
+            shared_arrays.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shared_memory_block.buf))
+        return cls(shared_memories, shared_arrays, descriptors, owner=False)
+
+    def close(self):
+        """ Release the arrays, and destroy the shared memory blocks if this object created them. """
+        self.arrays = []
+        for shared_memory_block in self.shared_memories:
+            shared_memory_block.close()
+            if self.owner:
+                shared_memory_block.unlink()
+        self.shared_memories = []
+
+
+def csr_matrix_arrays(matrix):
+    """ Return the arrays of a csr or csc matrix. """
+    return [matrix.data, matrix.indices, matrix.indptr]
+
+
+def csr_matrix_from_arrays(arrays, shape):
+    """ The returned matrix uses the memory of 'arrays' without copy. """
+    data, indices, indptr = arrays
+    return csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def csc_matrix_from_arrays(arrays, shape):
+    """ The returned matrix uses the memory of 'arrays' without copy. """
+    data, indices, indptr = arrays
+    return csc_matrix((data, indices, indptr), shape=shape, copy=False)
@@ -0,0 +1,157 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" All the pairs of collections of iterables at distance at most 'threshold', without computing every distance.
+
+The collections are vectorized and normalized once. A pair can only be at distance at most 'threshold'
+if the scalar product 's' of its normalized vectorizations is at least '1 - threshold'. Two filters discard
+the pairs that cannot reach 's':
+    prefix filter: the items are ordered by increasing number of vectorizations containing them, and the prefix
+        of a vectorization is made of its first items, until the norm of the remaining coefficients is below 's'.
+        A pair sharing no item of both prefixes has a scalar product below 's', so only the pairs sharing
+        such an item are candidates.
+    length filter: the scalar product of two normalized vectorizations is at most the largest coefficient
+        of one of them times the sum of the coefficients of the other.
+The scalar products of the remaining candidates are then computed from the rows of the vectorizations.
+
+The collections are treated by blocks of consecutive rows, whose number of candidates is bounded using the
+number of prefixes containing each item, so that the memory of a block stays within 'memory_budget' bytes.
+The pairs are yielded block by block, as arrays '(rows, columns, distances)' with 'rows < columns'.
+With 'number_of_workers', the blocks are computed by a pool of processes sharing the vectorizations.
+"""
+
+
+from multiprocessing import Pool
+from matrix_operations import *
+from shared_arrays import SharedArrays, csr_matrix_arrays, csr_matrix_from_arrays
+
+
+DEFAULT_MEMORY_BUDGET = 2 ** 28
+# Estimated bytes per candidate pair: its entry in the candidate matrix,
+# plus the two rows copied to compute its scalar product, per nonzero coefficient of a row.
+BYTES_PER_CANDIDATE = 32
+BYTES_PER_CANDIDATE_COEFFICIENT = 24
+# Tolerance on the scalar products, so that rounding errors never discard a pair at distance 'threshold'.
+TOLERANCE = 1e-9
+
+worker_state = dict()
+
+
+class SimilarityJoin:
+
+    def __init__(self, distance, iterables_collections, threshold, memory_budget=DEFAULT_MEMORY_BUDGET):
+        """ 'threshold' must be smaller than '1.': pairs of collections sharing no item are at distance '1.'. """
+        if not threshold < 1.:
+            raise ValueError('threshold must be smaller than 1, got {}'.format(threshold))
+        self.threshold = threshold
+        self.minimum_scalar_product = 1. - threshold
+        # Row 'k' of 'vectorizations' is the normalized vectorization of the 'k'-th collection.
+        self.vectorizations = distance.normalized_vectorization_rows(iterables_collections)
+        self.prefixes = prefix_matrix(self.vectorizations, self.minimum_scalar_product)
+        self.largest_coefficients, self.coefficient_sums = row_maxima_and_sums(self.vectorizations)
+        self.blocks = self.blocks_within_budget(memory_budget)
+        self.number_of_candidates = 0
+        self.number_of_verified_pairs = 0
+
+    def __len__(self):
+        return self.vectorizations.shape[0]
+
+    def blocks_within_budget(self, memory_budget):
+        """ Return the list of the pairs '(start, end)' of the blocks of rows. """
+        prefix_frequencies = np.bincount(self.prefixes.indices, minlength=self.prefixes.shape[1])
+        candidate_bounds = matrix_vector_product(self.prefixes, prefix_frequencies.astype(np.float64))
+        mean_row_length = self.vectorizations.nnz / max(len(self), 1)
+        costs = candidate_bounds * (BYTES_PER_CANDIDATE + BYTES_PER_CANDIDATE_COEFFICIENT * mean_row_length)
+        return blocks_of_bounded_cost(costs, memory_budget)
+
+    def chunks(self, number_of_workers=None):
+        """ Yield the arrays '(rows, columns, distances)' of the pairs of each block. """
+        arrays = [self.vectorizations, self.prefixes, self.largest_coefficients, self.coefficient_sums]
+        if number_of_workers is None:
+            for start, end in self.blocks:
+                yield self.counted(join_block(*arrays, self.threshold, start, end))
+            return
+        shared_arrays = SharedArrays.from_arrays(csr_matrix_arrays(self.vectorizations)
+                                                 + csr_matrix_arrays(self.prefixes) + arrays[2:])
+        initialization_arguments = (shared_arrays.descriptors, self.vectorizations.shape, self.prefixes.shape,
+                                    self.threshold)
+        try:
+            with Pool(number_of_workers, initializer=initialize_worker, initargs=initialization_arguments) as pool:
+                for result in pool.imap(join_block_in_worker, self.blocks):
+                    yield self.counted(result)
+        finally:
+            shared_arrays.close()
+
+    def counted(self, result):
+        rows, columns, distances, number_of_candidates, number_of_verified_pairs = result
+        self.number_of_candidates += number_of_candidates
+        self.number_of_verified_pairs += number_of_verified_pairs
+        return rows, columns, distances
+
+
+def similarity_join(distance, iterables_collections, threshold, memory_budget=DEFAULT_MEMORY_BUDGET,
+                    number_of_workers=None):
+    """ Yield the arrays '(rows, columns, distances)' of the pairs of positions 'rows[k] < columns[k]'
+    of collections of 'iterables_collections' at distance 'distances[k] <= threshold' (see above). """
+    return SimilarityJoin(distance, iterables_collections, threshold, memory_budget).chunks(number_of_workers)
+
+
+def prefix_matrix(rows, minimum_scalar_product):
+    """ Return the matrix which row 'k' is nonzero on the items of the prefix of row 'k' of 'rows'. """
+    rows = csr_matrix(rows)
+    row_indices = np.repeat(np.arange(rows.shape[0]), np.diff(rows.indptr))
+    item_ranks = np.argsort(np.argsort(np.bincount(rows.indices, minlength=rows.shape[1]), kind='stable'))
+    order = np.lexsort((item_ranks[rows.indices], row_indices))
+    squares = rows.data[order].astype(np.float64) ** 2
+    cumulated_squares = np.cumsum(squares)
+    row_boundaries = np.concatenate([[0.], cumulated_squares])[rows.indptr]
+    row_starts, row_squares = row_boundaries[:-1], np.diff(row_boundaries)
+    # Squared norm of the coefficients of the row from the current one, in the order of the items.
+    remaining_squares = row_squares[row_indices] - (cumulated_squares - squares - row_starts[row_indices])
+    in_prefix = remaining_squares >= minimum_scalar_product ** 2 - TOLERANCE
+    return matrix_from_index_arrays(row_indices[in_prefix], rows.indices[order][in_prefix], rows.shape,
+                                    dtype=np.float32)
+
+
+def row_maxima_and_sums(rows):
+    rows = csr_matrix(abs(rows))
+    return np.asarray(rows.max(axis=1).todense()).ravel(), np.asarray(rows.sum(axis=1)).ravel()
+
+
+def join_block(vectorizations, prefixes, largest_coefficients, coefficient_sums, threshold, start, end):
+    """ Return the pairs of the block of rows 'start' to 'end', their distances,
+    the number of candidates of the prefix filter and the number of scalar products computed. """
+    minimum_scalar_product = 1. - threshold
+    candidates = (prefixes[start:end] @ transpose_matrix(prefixes)).tocoo()
+    rows, columns = candidates.row.astype(np.int64) + start, candidates.col.astype(np.int64)
+    kept = rows < columns
+    rows, columns = rows[kept], columns[kept]
+    number_of_candidates = len(rows)
+    kept = (np.minimum(largest_coefficients[rows] * coefficient_sums[columns],
+                       largest_coefficients[columns] * coefficient_sums[rows])
+            >= minimum_scalar_product - TOLERANCE)
+    rows, columns = rows[kept], columns[kept]
+    scalar_products = np.asarray(vectorizations[rows].multiply(vectorizations[columns]).sum(axis=1)).ravel()
+    distances = np.maximum(1. - scalar_products, 0.)
+    kept = distances <= threshold + TOLERANCE
+    order = np.lexsort((columns[kept], rows[kept]))
+    return rows[kept][order], columns[kept][order], distances[kept][order], number_of_candidates, len(rows)
+
+
+def initialize_worker(descriptors, vectorizations_shape, prefixes_shape, threshold):
+    shared_arrays = SharedArrays.attach(descriptors)
+    worker_state['shared_arrays'] = shared_arrays
+    worker_state['arrays'] = [csr_matrix_from_arrays(shared_arrays.arrays[:3], vectorizations_shape),
+                              csr_matrix_from_arrays(shared_arrays.arrays[3:6], prefixes_shape)]
+    worker_state['arrays'] += shared_arrays.arrays[6:]
+    worker_state['threshold'] = threshold
+
+
+def join_block_in_worker(block):
+    start, end = block
+    return join_block(*worker_state['arrays'], worker_state['threshold'], start, end)
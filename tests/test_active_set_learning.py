@@ -0,0 +1,69 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from active_set_learning import *
+from learning_distance import LearningDistance
+from oracle_claim import OracleClaim
+
+
+iterables = ['aa', 'ab', 'bbb', 'abc', 'cca']
+item_to_weight = {'a': 1, 'b': 2, 'c': 1}
+iterable_to_weight = {'aa': 1, 'ab': 2, 'bbb': 3, 'abc': 1, 'cca': 2}
+iterables_pairs = [({'ab'}, {'bbb'}), ({'aa', 'abc'}, {'cca'}), ({'abc'}, {'bbb', 'aa'}), ({'ab'}, {'cca'})]
+
+
+def total_violation(distance, oracle_claims):
+    return sum(violation(distance(*oracle_claim.iterables_pair), oracle_claim.distance_interval)
+               for oracle_claim in oracle_claims)
+
+
+class TestActiveSetLearning(unittest.TestCase):
+
+    def test_satisfied_claims_are_evaluated_once(self):
+        distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        oracle_claims = [OracleClaim(iterables_pair, (0., 1.)) for iterables_pair in iterables_pairs]
+        report = learn_with_active_set(distance, oracle_claims, seed=0)
+        self.assertEqual(report.stopping_reason, CONVERGED)
+        self.assertEqual((report.epochs, report.claim_evaluations, report.claim_updates), (1, 4, 0))
+        self.assertEqual(report.satisfied_fraction, 1.)
+        self.assertEqual(report.losses, [0.])
+
+    def test_violated_claims_are_learnt(self):
+        distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        oracle_claims = [OracleClaim(iterables_pair, (min(1., 1.5 * distance(*iterables_pair)), 1.))
+                         for iterables_pair in iterables_pairs]
+        oracle_claims.append(OracleClaim(({'aa'}, {'aa'}), (0., 0.5)))
+        initial_violation = total_violation(distance, oracle_claims)
+        report = learn_with_active_set(distance, oracle_claims, maximum_number_of_epochs=10, seed=0)
+        self.assertLess(total_violation(distance, oracle_claims), initial_violation)
+        self.assertLessEqual(report.epochs, 10)
+        self.assertEqual(len(report.losses), report.epochs)
+        self.assertLess(report.losses[-1], report.losses[0])
+        self.assertLess(report.claim_evaluations, len(oracle_claims) * (report.epochs + 1))
+        self.assertGreater(report.claim_updates, 0)
+
+    def test_satisfied_fraction(self):
+        distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        oracle_claims = [OracleClaim(iterables_pair, (0., 1.)) for iterables_pair in iterables_pairs[1:]]
+        oracle_claims.append(OracleClaim(iterables_pairs[0], (1., 1.)))
+        report = learn_with_active_set(distance, oracle_claims, satisfied_fraction=0.75, seed=0)
+        self.assertEqual(report.stopping_reason, SATISFIED_FRACTION_REACHED)
+        self.assertEqual(report.epochs, 1)
+
+    def test_maximum_number_of_epochs(self):
+        distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        oracle_claims = [OracleClaim(iterables_pair, (1., 1.)) for iterables_pair in iterables_pairs]
+        report = learn_with_active_set(distance, oracle_claims, maximum_number_of_epochs=2,
+                                       minimum_loss_improvement=0., seed=0)
+        self.assertEqual(report.stopping_reason, MAXIMUM_NUMBER_OF_EPOCHS_REACHED)
+        self.assertEqual(report.epochs, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from approximate_collection_index import *
+from collection_index import CollectionIndex
+from learning_distance import LearningDistance
+from oracle_claim import OracleClaim
+
+
+iterables = ['banana', 'ananas', 'base', 'cc', 'sea']
+catalog = [{'banana'}, {'ananas', 'base'}, {'cc'}, {'sea', 'base'}, {'banana', 'ananas'}]
+
+
+class TestApproximateCollectionIndex(unittest.TestCase):
+
+    def test_exact_with_one_bit(self):
+        # With one bit per table and as many probes, every collection is a candidate.
+        distance = LearningDistance(iterables)
+        index = ApproximateCollectionIndex(distance, catalog, number_of_tables=2, bits_per_table=1, chunk_size=2)
+        exact_index = CollectionIndex(distance, catalog)
+        for query in ({'ananas'}, {'sea'}, {'banana', 'cc'}):
+            computed = index.nearest(query, 3, number_of_probes=1)
+            expected = exact_index.nearest(query, 3)
+            self.assertEqual([position for position, _ in computed], [position for position, _ in expected])
+            for (_, computed_distance), (_, expected_distance) in zip(computed, expected):
+                self.assertAlmostEqual(computed_distance, expected_distance)
+
+    def test_identical_collection_is_found(self):
+        distance = LearningDistance(iterables)
+        index = ApproximateCollectionIndex(distance, catalog, number_of_tables=4, bits_per_table=64)
+        for position, query in enumerate(catalog[:4]):
+            nearest_position, nearest_distance = index.nearest(query, 1)[0]
+            self.assertEqual(nearest_position, position)
+            self.assertAlmostEqual(nearest_distance, 0.)
+
+    def test_incremental_update_after_learning(self):
+        distance = LearningDistance(iterables)
+        index = ApproximateCollectionIndex(distance, catalog, bits_per_table=3)
+        oracle_claim = OracleClaim(({'base'}, {'sea'}), (0.9, 1.))
+        distance.learn([oracle_claim], ratio_item_iterable_learning=1.)
+        self.assertFalse(index.is_up_to_date())
+        index.nearest({'base'}, 2)
+        self.assertTrue(index.is_up_to_date())
+        # Only the weights of the items of 'base' and 'sea' changed: the collection {'cc'} is not computed again.
+        self.assertEqual(index.number_of_computed_signatures, len(catalog) + 4)
+        refreshed_index = ApproximateCollectionIndex(distance, catalog, bits_per_table=3)
+        self.assertTrue(np.array_equal(index.signatures, refreshed_index.signatures))
+        self.assertTrue(np.allclose(index.catalog_matrix.toarray(), refreshed_index.catalog_matrix.toarray()))
+        for table in range(index.number_of_tables):
+            self.assertTrue(np.array_equal(index.sorted_signatures[table], refreshed_index.sorted_signatures[table]))
+            self.assertTrue(np.array_equal(index.signatures[index.table_orders[table], table],
+                                           index.sorted_signatures[table]))
+
+    def test_packed_keys(self):
+        self.assertEqual(packed_keys(np.array([[True, False, True], [False, False, False]])).tolist(), [5, 0])
+        signs = hyperplane_signs(np.array([0, 3]), 4, seed=1)
+        self.assertEqual(signs.shape, (2, 4))
+        self.assertTrue(np.array_equal(np.abs(signs), np.ones((2, 4))))
+        self.assertTrue(np.array_equal(signs, hyperplane_signs(np.array([0, 3]), 4, seed=1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from benchmarks.benchmark_suite import *
+
+
+def report(*results):
+    return {'results': [{'corpus': 'zipf', 'size': 1000, 'stage': stage, 'operations': 1,
+                         'seconds_per_operation': seconds, 'peak_memory_mb': memory}
+                        for stage, seconds, memory in results]}
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_regressions(self):
+        baseline_report = report(('distance', 1., 100.), ('learn', 1e-6, 0.1))
+        # Within the tolerance ratio, or above it but within the slack of the measure: no regression.
+        self.assertEqual(regressions(report(('distance', 1.2, 120.), ('learn', 5e-6, 0.5)), baseline_report), [])
+        # Above both the tolerance ratio and the slack.
+        self.assertEqual(regressions(report(('distance', 1.3, 100.), ('learn', 2e-5, 0.7)), baseline_report),
+                         [('zipf', 1000, 'distance', 'seconds_per_operation', 1., 1.3),
+                          ('zipf', 1000, 'learn', 'seconds_per_operation', 1e-6, 2e-5),
+                          ('zipf', 1000, 'learn', 'peak_memory_mb', 0.1, 0.7)])
+        self.assertEqual(regressions(report(('distance', 1.3, 100.)), baseline_report, tolerance=0.5), [])
+        # The stages missing from the baseline are skipped.
+        self.assertEqual(regressions(report(('vector_space', 100., 1000.)), baseline_report), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from collection_index import *
+from learning_distance import LearningDistance
+from oracle_claim import OracleClaim
+
+
+iterables = ['banana', 'ananas', 'base', 'cc', 'sea']
+catalog = [{'banana'}, {'ananas', 'base'}, {'cc'}, {'sea', 'base'}, {'banana', 'ananas'}]
+
+
+class TestCollectionIndex(unittest.TestCase):
+
+    def assertNearestIsBruteForce(self, distance, index, query, k):
+        computed = index.nearest(query, k)
+        expected = sorted(distance(query, iterables_collection) for iterables_collection in catalog)[:k]
+        self.assertEqual(len(computed), len(expected))
+        for (position, computed_distance), expected_distance in zip(computed, expected):
+            self.assertAlmostEqual(computed_distance, expected_distance)
+            self.assertAlmostEqual(computed_distance, distance(query, catalog[position]))
+
+    def test_nearest(self):
+        distance = LearningDistance(iterables)
+        index = CollectionIndex(distance, catalog)
+        self.assertNearestIsBruteForce(distance, index, {'ananas'}, 2)
+        self.assertNearestIsBruteForce(distance, index, {'sea'}, 5)
+        self.assertNearestIsBruteForce(distance, index, {'banana', 'cc'}, 10)
+        self.assertEqual(index.nearest(set(), 2), [(0, 1.), (1, 1.)])
+
+    def test_nearest_after_learning(self):
+        distance = LearningDistance(iterables)
+        index = CollectionIndex(distance, catalog)
+        query = {'ananas'}
+        oracle_claim = OracleClaim((query, catalog[0]), (0.8, 1.))
+        distance.learn([oracle_claim], ratio_item_iterable_learning=0.5)
+        self.assertFalse(index.is_up_to_date())
+        self.assertNearestIsBruteForce(distance, index, query, 3)
+        self.assertTrue(index.is_up_to_date())
+
+    def test_first_indices_not_in(self):
+        self.assertEqual(list(first_indices_not_in([0, 2], 5, 2)), [1, 3])
+        self.assertEqual(list(first_indices_not_in([0, 2], 5, 0)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
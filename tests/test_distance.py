@@ -46,6 +46,76 @@ class MyTestCase(unittest.TestCase):
                                                                   distance.iterable_weights_vector, iv1),
                                           vz1))
 
+    def test_pairwise(self):
+        collections0 = [{'ab'}, {'bbb', 'aa'}, {'aa', 'aa'}]
+        collections1 = [{'bbb'}, {'ab', 'aa', 'bbb'}]
+        computed = distance.pairwise(collections0, collections1)
+        self.assertEqual(computed.shape, (3, 2))
+        for i, iterables_i in enumerate(collections0):
+            for j, iterables_j in enumerate(collections1):
+                self.assertAlmostEqual(computed[i, j], distance(iterables_i, iterables_j))
+        chunks = list(distance.pairwise_chunks(iter(collections0), collections1, chunk_size=2))
+        self.assertEqual([chunk.shape for chunk in chunks], [(2, 2), (1, 2)])
+        self.assertTrue(np.allclose(np.vstack(chunks), computed))
+
+    def test_add_and_remove_iterables(self):
+        growing_distance = Distance(['aa', 'ab'])
+        learned_item_weights_vector = growing_distance.item_weights_vector
+        growing_distance.add_iterables(['bbb', 'abc'])
+        self.assertTrue(are_equal_vectors(growing_distance.item_weights_vector[:2], learned_item_weights_vector))
+        self.assertEqual(len(growing_distance.item_weights_vector), 3)
+        expected_weights = normalize_distribution(Distance(['aa', 'ab', 'bbb', 'abc']).get_iterable_weights())
+        self.assertAlmostEqual(growing_distance.get_iterable_weights()['abc'], expected_weights['abc'])
+        growing_distance.remove_iterables(['aa'])
+        self.assertNotIn('aa', growing_distance.get_iterable_weights())
+        self.assertAlmostEqual(growing_distance({'ab'}, {'abc'}),
+                               Distance(['ab', 'bbb', 'abc'], growing_distance.get_item_weights(),
+                                        growing_distance.get_iterable_weights())({'ab'}, {'abc'}))
+        growing_distance.compact()
+        self.assertEqual(len(growing_distance.iterable_weights_vector), 3)
+        self.assertEqual(growing_distance.item_iterable_matrix.shape, (3, 3))
+
+    def test_vectorization_matrix(self):
+        computed = distance.vectorization_matrix([iterables0, iterables1])
+        self.assertTrue(np.allclose(computed[:, 0].toarray().ravel(), distance.vectorize(iterables0)))
+        self.assertTrue(np.allclose(computed[:, 1].toarray().ravel(), distance.vectorize(iterables1)))
+        collections = [iterables0, iterables1, set(), iterables0]
+        self.assertTrue(np.allclose(distance.sparse_vectorization_matrix(collections).toarray(),
+                                    distance.vectorization_matrix(collections).toarray()))
+        rows = distance.normalized_vectorization_rows(collections, chunk_size=3)
+        self.assertEqual(rows.shape, (4, len(distance.item_to_index)))
+        self.assertTrue(np.allclose(rows[0].toarray().ravel(), normalize(distance.vectorize(iterables0))))
+        self.assertEqual(rows[2].nnz, 0)
+
+    def test_sparse_vectorize_with_norm(self):
+        for cache_size in (None, 2):
+            cached_distance = Distance(iterables, item_to_weight, iterable_to_weight,
+                                       vectorization_cache_size=cache_size)
+            for collection in (iterables0, {'aa', 'bbb'}, set()):
+                item_indices, values, vectorization_norm = cached_distance.sparse_vectorize_with_norm(collection)
+                vectorization = cached_distance.vectorize(collection)
+                self.assertTrue(np.array_equal(item_indices, np.flatnonzero(vectorization)))
+                self.assertTrue(np.allclose(values, vectorization[item_indices]))
+                self.assertAlmostEqual(vectorization_norm, norm(vectorization))
+                self.assertAlmostEqual(cached_distance(collection, iterables1),
+                                       cached_distance.verbose_distance(collection, iterables1)[0])
+
+    def test_float32_precision(self):
+        float32_distance = Distance(iterables, item_to_weight, iterable_to_weight, precision=FLOAT32)
+        self.assertEqual(float32_distance.item_iterable_matrix.dtype, np.int32)
+        self.assertEqual(float32_distance.item_weights_vector.dtype, np.float32)
+        self.assertEqual(float32_distance.iterable_weights_vector.dtype, np.float32)
+        self.assertEqual(float32_distance.vectorize(iterables0).dtype, np.float32)
+        self.assertEqual(float32_distance.sparse_vectorize_with_norm(iterables0)[1].dtype, np.float32)
+        self.assertEqual(float32_distance.vectorization_matrix([iterables0, iterables1]).dtype, np.float32)
+        self.assertEqual(float32_distance.sparse_vectorization_matrix([iterables0, iterables1]).dtype, np.float32)
+        self.assertAlmostEqual(float32_distance(iterables0, iterables1), distance(iterables0, iterables1), places=6)
+        float32_distance.add_iterables(['abc'])
+        self.assertEqual(float32_distance.item_iterable_matrix.dtype, np.int32)
+        self.assertEqual(float32_distance.item_weights_vector.dtype, np.float32)
+        with self.assertRaises(ValueError):
+            Distance(iterables, precision='float16')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,158 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from distance_server import *
+from learning_distance import LearningDistance
+from hashed_distance import HashedDistance
+from oracle_claim import OracleClaim
+
+
+iterables = ['banana', 'ananas', 'base', 'cc', 'sea']
+iterables_pairs = [({'banana'}, {'ananas', 'base'}), ({'cc'}, {'sea'}), ({'base', 'sea'}, {'banana'}),
+                   (set(), {'cc'}), ({'ananas'}, {'ananas', 'cc'})]
+
+
+class TestDistanceServer(unittest.TestCase):
+
+    def test_answers_of_concurrent_threads(self):
+        distance = LearningDistance(iterables)
+        with DistanceServer(distance, batch_window=0.01) as server:
+            with ThreadPoolExecutor(4) as executor:
+                distances = list(executor.map(lambda pair: server(*pair), iterables_pairs * 4))
+                vectorizations = list(executor.map(server.vectorize, [pair[1] for pair in iterables_pairs]))
+        for computed, pair in zip(distances, iterables_pairs * 4):
+            self.assertAlmostEqual(computed, distance(*pair))
+        for computed, pair in zip(vectorizations, iterables_pairs):
+            self.assertTrue(are_almost_equal_vectors(computed, distance.vectorize(pair[1])))
+        self.assertEqual(server.number_of_requests, 25)
+        self.assertLess(server.number_of_batches, 25)
+
+    def test_micro_batches(self):
+        with DistanceServer(LearningDistance(iterables), batch_window=1., maximum_batch_size=3) as server:
+            futures = [server.submit(*pair) for pair in iterables_pairs]
+            [future.result() for future in futures]
+        self.assertEqual(server.number_of_batches, 2)
+
+    def test_errors_only_reach_their_request(self):
+        distance = LearningDistance(iterables)
+        with DistanceServer(distance, batch_window=1., maximum_batch_size=2) as server:
+            future = server.submit({'banana'}, {'unknown'})
+            self.assertAlmostEqual(server({'cc'}, {'sea'}), distance({'cc'}, {'sea'}))
+            with self.assertRaises(KeyError):
+                future.result()
+        with self.assertRaises(RuntimeError):
+            server.submit({'cc'}, {'sea'})
+
+    def test_unseen_iterables_of_hashed_distance(self):
+        distance = HashedDistance(iterables, number_of_buckets=16)
+        with DistanceServer(distance) as server:
+            self.assertAlmostEqual(server({'banana'}, {'bananas'}), distance({'banana'}, {'bananas'}))
+
+    def test_snapshot_isolation(self):
+        distance = LearningDistance(iterables)
+        oracle_claims = [OracleClaim(({'banana'}, {'ananas', 'base'}), (0.8, 1.))]
+        with DistanceServer(distance) as server:
+            initial_distance = server({'banana'}, {'ananas', 'base'})
+            published_weights = server.snapshot.item_weights_vector
+            published_copy = published_weights.copy()
+            distance.learn(oracle_claims)
+            self.assertTrue(are_equal_vectors(published_weights, published_copy))
+            self.assertEqual(server({'banana'}, {'ananas', 'base'}), initial_distance)
+            server.publish()
+            self.assertAlmostEqual(server({'banana'}, {'ananas', 'base'}), distance({'banana'}, {'ananas', 'base'}))
+            server.learn(oracle_claims, publication_period=1, number_of_iterations=2)
+            self.assertEqual(server.snapshot.weights_version, distance.weights_version)
+            self.assertGreater(server({'banana'}, {'ananas', 'base'}), initial_distance)
+
+    def test_asyncio(self):
+        distance = LearningDistance(iterables)
+
+        async def gather(server):
+            return await asyncio.gather(*[server.async_distance(*pair) for pair in iterables_pairs])
+
+        with DistanceServer(distance) as server:
+            distances = asyncio.run(gather(server))
+        for computed, pair in zip(distances, iterables_pairs):
+            self.assertAlmostEqual(computed, distance(*pair))
+
+    def test_learn_stream(self):
+        oracle_claims = [OracleClaim(pair, (0.2 + 0.1 * (k % 3), 0.3 + 0.1 * (k % 3)))
+                         for k, pair in enumerate(iterables_pairs * 2) if pair[0]]
+        reference = LearningDistance(iterables)
+        for oracle_claim in oracle_claims:
+            reference.learn_from_one_oracle_claim(oracle_claim, effort=0.5)
+        distance = LearningDistance(iterables)
+        consumed_claims = []
+
+        def stream():
+            for oracle_claim in oracle_claims:
+                consumed_claims.append(oracle_claim)
+                yield oracle_claim
+
+        with DistanceServer(distance) as server:
+            initial_snapshot = server.current_distance()
+            initial_weights = initial_snapshot.item_weights_vector.copy()
+            self.assertEqual(server.learn_stream(stream(), publication_period=3), len(oracle_claims))
+            # One publication at creation, one every 3 claims and one at the end.
+            self.assertEqual(server.number_of_publications, 1 + len(oracle_claims) // 3 + 1)
+            self.assertTrue(are_equal_vectors(initial_snapshot.item_weights_vector, initial_weights))
+            self.assertEqual(server.current_distance().weights_version, distance.weights_version)
+            self.assertAlmostEqual(server({'cc'}, {'sea'}), reference({'cc'}, {'sea'}))
+            self.assertEqual(len(consumed_claims), len(oracle_claims))
+            server.learn_stream(iter(oracle_claims), publication_period=None, batch_size=4)
+            self.assertEqual(server.number_of_publications, 1 + len(oracle_claims) // 3 + 2)
+
+    def test_async_learn_stream(self):
+        oracle_claims = [OracleClaim(({'banana'}, {'ananas', 'base'}), (0.9, 1.))] * 2
+
+        async def learn_and_read(server):
+            queue = asyncio.Queue(maxsize=1)
+            learning = asyncio.create_task(server.async_learn_stream(queue, publication_period=None,
+                                                                     publication_interval=0.05))
+            for oracle_claim in oracle_claims:
+                await queue.put(oracle_claim)
+            initial_publications = server.number_of_publications
+            # The claims learnt are published after the interval, although the stream has not ended.
+            for _ in range(100):
+                if server.number_of_publications > initial_publications:
+                    break
+                await asyncio.sleep(0.01)
+            published_distance = await server.async_distance({'banana'}, {'ananas', 'base'})
+            await queue.put(None)
+            return initial_publications, published_distance, await learning
+
+        distance = LearningDistance(iterables)
+        initial_distance = distance({'banana'}, {'ananas', 'base'})
+        with DistanceServer(distance) as server:
+            initial_publications, published_distance, number_of_claims = asyncio.run(learn_and_read(server))
+            self.assertEqual(number_of_claims, 2)
+            self.assertGreater(server.number_of_publications, initial_publications)
+            self.assertGreater(published_distance, initial_distance)
+            self.assertEqual(server.current_distance().weights_version, distance.weights_version)
+
+    def test_materialized_snapshot_is_frozen(self):
+        distance = LearningDistance(iterables)
+        distance.materialize_weights()
+        oracle_claims = [OracleClaim(({'banana'}, {'ananas', 'base'}), (0.9, 1.))] * 3
+        with DistanceServer(distance) as server:
+            server.learn_stream(oracle_claims)
+            snapshot = server.current_distance()
+            self.assertTrue(snapshot.weighted_matrix.frozen)
+            self.assertFalse(distance.weighted_matrix.frozen)
+            number_of_refreshes = snapshot.weighted_matrix.number_of_refreshes
+            for _ in range(100):
+                snapshot({'banana'}, {'ananas', 'base'})
+            self.assertEqual(snapshot.weighted_matrix.number_of_refreshes, number_of_refreshes)
+            self.assertAlmostEqual(snapshot({'banana'}, {'ananas', 'base'}),
+                                   distance({'banana'}, {'ananas', 'base'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
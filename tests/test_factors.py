@@ -0,0 +1,73 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import tempfile
+import unittest
+from factors import *
+from distance import Distance
+
+
+texts = ['banana split', 'ananas', 'bandana', 'split pea', 'é']
+maximum_factor_length = 3
+
+
+def factors_of_text(text, maximum_length):
+    return {text[start:start + length] for length in range(1, maximum_length + 1)
+            for start in range(len(text) - length + 1)}
+
+
+class TestFactors(unittest.TestCase):
+
+    def test_factor_hashes(self):
+        hashes = factor_hashes('banana', 3)
+        self.assertEqual(hashes.tolist(), sorted(factor_hash(factor) for factor in factors_of_text('banana', 3)))
+        self.assertEqual(len(factor_hashes('', 3)), 0)
+
+    def test_factor_components_from_texts(self):
+        item_to_index, iterable_to_index, matrix = factor_components_from_texts(iter(texts), maximum_factor_length)
+        factors = set().union(*(factors_of_text(text, maximum_factor_length) for text in texts))
+        self.assertEqual(set(item_to_index), set(''.join(texts)))
+        self.assertEqual(set(iterable_to_index), {factor_hash(factor) for factor in factors})
+        for factor in ('ana', 'a', ' sp'):
+            column = matrix[:, iterable_to_index[factor_hash(factor)]].toarray().ravel()
+            self.assertEqual({item: column[index] for item, index in item_to_index.items() if column[index]},
+                             {character: factor.count(character) for character in factor})
+
+    def test_document_frequency_filter(self):
+        _, iterable_to_index, _ = factor_components_from_texts(texts, maximum_factor_length,
+                                                               minimum_document_frequency=2,
+                                                               maximum_document_frequency=3)
+        self.assertIn(factor_hash('ana'), iterable_to_index)
+        self.assertIn(factor_hash('spl'), iterable_to_index)
+        self.assertNotIn(factor_hash('a'), iterable_to_index)
+        self.assertNotIn(factor_hash('pea'), iterable_to_index)
+
+    def test_distances_match_materialized_factors(self):
+        distance = Distance.from_texts(iter(texts), maximum_factor_length)
+        materialized_distance = Distance(set().union(*(factors_of_text(text, maximum_factor_length)
+                                                       for text in texts)))
+        for text0 in texts:
+            for text1 in texts:
+                self.assertAlmostEqual(distance(distance.iterable_to_index.factors_of_text(text0),
+                                                distance.iterable_to_index.factors_of_text(text1)),
+                                       materialized_distance(factors_of_text(text0, maximum_factor_length),
+                                                             factors_of_text(text1, maximum_factor_length)))
+
+    def test_save_and_load(self):
+        distance = Distance.from_texts(texts, maximum_factor_length, minimum_document_frequency=2)
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            loaded_distance = Distance.load(path)
+            self.assertIsInstance(loaded_distance.iterable_to_index, FactorIndex)
+            iterables0 = loaded_distance.iterable_to_index.factors_of_text('banana')
+            iterables1 = loaded_distance.iterable_to_index.factors_of_text('bandana')
+            self.assertEqual(loaded_distance(iterables0, iterables1), distance(iterables0, iterables1))
+
+
+if __name__ == '__main__':
+    unittest.main()
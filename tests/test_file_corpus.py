@@ -0,0 +1,96 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import json
+import os
+import random
+import tempfile
+import unittest
+from collections import defaultdict
+from itertools import count
+from file_corpus import *
+from vector_space import VectorSpace
+from distance import Distance
+from matrix_operations import FLOAT32
+
+
+generator = random.Random(0)
+lines = [''.join(generator.choice('abcdefgh') for _ in range(generator.randint(0, 8))) for _ in range(200)]
+records = [[generator.choice(['x', 'y', 1, 2.5, None]) for _ in range(generator.randint(1, 4))] for _ in range(50)]
+
+
+def write_files(path, lines_per_file):
+    paths = []
+    for start in range(0, len(lines), lines_per_file):
+        paths.append(os.path.join(path, 'part_{}.txt'.format(len(paths))))
+        with open(paths[-1], 'w', encoding='utf-8') as file:
+            file.writelines(line + '\n' for line in lines[start:start + lines_per_file])
+    return paths
+
+
+class TestFileCorpus(unittest.TestCase):
+
+    def assertSameVectorSpaces(self, vector_space0, vector_space1):
+        self.assertEqual(dict(vector_space0.item_to_index.items()), dict(vector_space1.item_to_index.items()))
+        self.assertEqual(dict(vector_space0.iterable_to_index.items()), dict(vector_space1.iterable_to_index.items()))
+        self.assertEqual(vector_space0.item_iterable_matrix.shape, vector_space1.item_iterable_matrix.shape)
+        self.assertEqual(vector_space0.item_iterable_matrix.dtype, vector_space1.item_iterable_matrix.dtype)
+        self.assertEqual((vector_space0.item_iterable_matrix != vector_space1.item_iterable_matrix).nnz, 0)
+
+    def test_same_vector_space_as_from_iterables(self):
+        # The lines contain duplicates, whose counts are summed, as in '__init__'.
+        self.assertLess(len(set(lines)), len(lines))
+        with tempfile.TemporaryDirectory() as path:
+            paths = write_files(path, 70)
+            for memory_budget in (DEFAULT_MEMORY_BUDGET, 10 * BYTES_PER_OCCURRENCE, 1):
+                for compact_vocabulary in (False, True):
+                    directory = os.path.join(path, 'matrix_{}_{}'.format(memory_budget, compact_vocabulary))
+                    vector_space = VectorSpace.from_files(paths, directory, compact_vocabulary=compact_vocabulary,
+                                                          memory_budget=memory_budget)
+                    self.assertSameVectorSpaces(vector_space, VectorSpace(lines, compact_vocabulary))
+                    self.assertFalse(vector_space.item_iterable_matrix.data.flags.writeable)
+                    # Only the final matrix is left in the directory.
+                    self.assertEqual(sorted(os.listdir(directory)), sorted(MATRIX_FILE_NAMES.values()))
+            vector_space = VectorSpace.from_files(paths, os.path.join(path, 'float32'), precision=FLOAT32)
+            self.assertSameVectorSpaces(vector_space, VectorSpace(lines, precision=FLOAT32))
+
+    def test_spilled_segments(self):
+        with tempfile.TemporaryDirectory() as path:
+            spilled_matrices = SpilledMatrices(path)
+            item_to_index, iterable_to_index = defaultdict(count().__next__), defaultdict(count().__next__)
+            spill_iterables(lines, item_to_index, iterable_to_index, spilled_matrices, 50 * BYTES_PER_OCCURRENCE)
+            self.assertGreater(len(spilled_matrices), 10)
+            self.assertLessEqual(max(spilled_matrices.numbers_of_entries), 50 + 8)
+            self.assertEqual(spilled_matrices.numbers_of_rows, sorted(spilled_matrices.numbers_of_rows))
+            shape = (len(item_to_index), len(iterable_to_index))
+            matrix = spilled_matrices.merged(shape, os.path.join(path, 'matrix'), 20 * BYTES_PER_MERGED_ENTRY)
+            self.assertEqual((matrix != VectorSpace(lines).item_iterable_matrix).nnz, 0)
+            spilled_matrices.remove()
+            self.assertFalse(os.path.exists(spilled_matrices.path))
+
+    def test_records_and_distance(self):
+        with tempfile.TemporaryDirectory() as path:
+            records_path = os.path.join(path, 'records.jsonl')
+            with open(records_path, 'w') as file:
+                file.writelines(json.dumps(record) + '\n' for record in records)
+            iterables = [tuple(record) for record in records]
+            distance = Distance.from_files([records_path], os.path.join(path, 'matrix'),
+                                           read_file=json_records_of_file, memory_budget=1)
+            expected_distance = Distance(iterables)
+            self.assertSameVectorSpaces(distance, expected_distance)
+            self.assertTrue(np.allclose(distance.item_weights_vector, expected_distance.item_weights_vector))
+            self.assertTrue(np.allclose(distance.iterable_weights_vector, expected_distance.iterable_weights_vector))
+            iterables0, iterables1 = iterables[:3], iterables[3:6]
+            self.assertAlmostEqual(distance(iterables0, iterables1), expected_distance(iterables0, iterables1))
+            distance.add_iterables([('z',)])
+            self.assertEqual(distance.item_iterable_matrix.shape, (len(distance.item_to_index),
+                                                                   len(distance.iterable_to_index)))
+
+
+if __name__ == '__main__':
+    unittest.main()
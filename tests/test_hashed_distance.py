@@ -0,0 +1,74 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import tempfile
+import unittest
+from hashed_distance import *
+from oracle_claim import OracleClaim
+
+
+iterables = [('a', 'b', 'a'), ('b', 'c'), ('c', 'c', 'd'), ('a', 'd')]
+iterables0 = {('a', 'b', 'a')}
+iterables1 = {('c', 'c', 'd'), ('a', 'd')}
+
+
+class TestHashedDistance(unittest.TestCase):
+
+    def test_same_distances_as_exact_without_collisions(self):
+        hashed_distance = HashedDistance(iterables, number_of_buckets=2 ** 20)
+        self.assertEqual(len(set(hashed_distance.item_to_index.bucket_and_sign(item) for item in 'abcd')), 4)
+        distance = Distance(iterables)
+        self.assertAlmostEqual(hashed_distance(iterables0, iterables1), distance(iterables0, iterables1))
+
+    def test_unseen_iterables(self):
+        distance = HashedDistance(iterables, number_of_buckets=64, signed_hashing=True)
+        self.assertAlmostEqual(distance(iterables0, {('a', 'a', 'b')}), 0.)
+        self.assertLessEqual(0., distance({('x', 'y', 'z')}, iterables1))
+        vectorization, iterables_vector = distance.verbose_vectorize({('a', 'b', 'a'), ('x', 'y')})
+        self.assertEqual(len(iterables_vector), len(iterables))
+        self.assertEqual(iterables_vector[distance.iterable_to_index[('a', 'b', 'a')]], 1.)
+        self.assertEqual(len(vectorization), 64)
+
+    def test_unseen_iterables_in_pairwise(self):
+        distance = HashedDistance(iterables, number_of_buckets=64, signed_hashing=True)
+        collections0 = [iterables0, {('x', 'y'), ('a', 'd')}]
+        collections1 = [{('a', 'a', 'b')}, iterables1, {('x', 'y', 'z')}]
+        pairwise_distances = distance.pairwise(collections0, collections1)
+        for row, collection0 in enumerate(collections0):
+            for column, collection1 in enumerate(collections1):
+                self.assertAlmostEqual(pairwise_distances[row, column], distance(collection0, collection1))
+        self.assertTrue(np.allclose(distance.sparse_vectorization_matrix(collections0).toarray(),
+                                    distance.vectorization_matrix(collections0).toarray()))
+
+    def test_learning(self):
+        distance = HashedLearningDistance(iterables, number_of_buckets=64)
+        initial_distance = distance(iterables0, iterables1)
+        distance.learn([OracleClaim((iterables0, iterables1), (0., 0.1))], number_of_iterations=3)
+        self.assertLess(distance(iterables0, iterables1), initial_distance)
+
+    def test_batch_learning_with_unseen_iterables(self):
+        oracle_claims = [OracleClaim(({('a', 'b', 'a'), ('x', 'y')}, iterables1), (0., 0.1))]
+        distances = []
+        for batch_size in (None, 1):
+            distance = HashedLearningDistance(iterables, number_of_buckets=64)
+            distance.learn(oracle_claims, number_of_iterations=3, batch_size=batch_size)
+            distances.append(distance(*oracle_claims[0].iterables_pair))
+        self.assertAlmostEqual(distances[0], distances[1])
+
+    def test_save_and_load(self):
+        distance = HashedDistance(iterables, number_of_buckets=64, signed_hashing=True, seed=3)
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            loaded_distance = HashedDistance.load(path)
+        self.assertEqual(loaded_distance.item_to_index.bucket_and_sign('x'),
+                         distance.item_to_index.bucket_and_sign('x'))
+        self.assertEqual(loaded_distance(iterables0, {('x', 'a')}), distance(iterables0, {('x', 'a')}))
+
+
+if __name__ == '__main__':
+    unittest.main()
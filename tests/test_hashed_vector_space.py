@@ -0,0 +1,48 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from hashed_vector_space import *
+
+
+iterables = ['banana', 'ananas', 'base']
+
+
+class TestHashedVectorSpace(unittest.TestCase):
+
+    def test_columns(self):
+        vector_space = HashedVectorSpace(iter(iterables), number_of_buckets=64)
+        self.assertEqual(vector_space.item_iterable_matrix.shape, (64, 3))
+        bucket, sign = vector_space.item_to_index.bucket_and_sign('a')
+        self.assertEqual(sign, 1)
+        self.assertEqual(vector_space.item_iterable_matrix[bucket, vector_space.iterable_to_index['banana']], 3)
+        self.assertEqual(vector_space.count_iterables_containing_item('n'), 2)
+
+    def test_signed_hashing(self):
+        vector_space = HashedVectorSpace(['abcdefghijklmnopqrstuvwxyz'], number_of_buckets=2 ** 20,
+                                         signed_hashing=True)
+        signs = {vector_space.item_to_index.bucket_and_sign(item)[1] for item in 'abcdefghijklmnopqrstuvwxyz'}
+        self.assertEqual(signs, {-1, 1})
+        self.assertEqual(set(vector_space.item_iterable_matrix.data), {-1, 1})
+
+    def test_seed(self):
+        item_buckets0 = ItemBuckets(2 ** 20, seed=0)
+        item_buckets1 = ItemBuckets(2 ** 20, seed=1)
+        self.assertNotEqual([item_buckets0.bucket_and_sign(item) for item in 'abc'],
+                            [item_buckets1.bucket_and_sign(item) for item in 'abc'])
+
+    def test_add_iterables(self):
+        vector_space = HashedVectorSpace(iterables, number_of_buckets=64)
+        self.assertEqual(vector_space.add_iterables(['sea', 'base']), ['sea'])
+        self.assertEqual(vector_space.item_iterable_matrix.shape, (64, 4))
+        self.assertEqual((vector_space.item_iterable_matrix[:, 3] != vector_space.columns_of_iterables(['sea'])).nnz,
+                         0)
+
+
+if __name__ == '__main__':
+    unittest.main()
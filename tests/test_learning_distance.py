@@ -6,6 +6,7 @@
 # Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
 
 
+import random
 import unittest
 from learning_distance import *
 from oracle_claim import OracleClaim
@@ -69,6 +70,80 @@ class TestLearningDistance(unittest.TestCase):
         obtained_distance = distance(iterables0, iterables1)
         self.assertTrue(abs(obtained_distance - target_distance) < abs(current_distance - target_distance))
 
+    def test_learn_from_oracle_claims_batch_of_one_claim(self):
+        sequential_distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        batch_distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        current_distance = sequential_distance(iterables2, iterables3)
+        oracle_claim = OracleClaim((iterables2, iterables3), (0., current_distance / 2.))
+        sequential_distance.learn_from_one_oracle_claim(oracle_claim, effort=0.5)
+        batch_distance.learn_from_oracle_claims_batch([oracle_claim], effort=0.5)
+        self.assertTrue(np.allclose(sequential_distance.item_weights_vector, batch_distance.item_weights_vector))
+        self.assertTrue(np.allclose(sequential_distance.iterable_weights_vector,
+                                    batch_distance.iterable_weights_vector))
+
+    def test_learn_with_batches(self):
+        batch_distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        current_distance0 = batch_distance(iterables0, iterables1)
+        target_distance0 = current_distance0 * 2.
+        current_distance1 = batch_distance(iterables2, iterables3)
+        target_distance1 = current_distance1 / 2.
+        oracle_claims = [OracleClaim((iterables0, iterables1), (target_distance0, 1.)),
+                         OracleClaim((iterables2, iterables3), (0., target_distance1)),
+                         OracleClaim(({'aa'}, {'aa'}), (0., 1.))]
+        batch_distance.learn(oracle_claims, number_of_iterations=5, batch_size=2)
+        obtained_distance0 = batch_distance(iterables0, iterables1)
+        obtained_distance1 = batch_distance(iterables2, iterables3)
+        self.assertTrue(abs(obtained_distance0 - target_distance0) < abs(current_distance0 - target_distance0))
+        self.assertTrue(abs(obtained_distance1 - target_distance1) < abs(current_distance1 - target_distance1))
+
+    def test_sparse_gradients_are_dense_gradients_on_support(self):
+        sparse_distance = LearningDistance(iterables + ['cd'], item_to_weight, iterable_to_weight)
+        oracle_claim = OracleClaim((iterables2, iterables3), (0., sparse_distance(iterables2, iterables3) / 2.))
+        dense_claim = EnrichedOracleClaim(oracle_claim, sparse_distance, effort=0.5)
+        sparse_claim = SparseEnrichedOracleClaim(oracle_claim, sparse_distance, effort=0.5)
+        self.assertAlmostEqual(dense_claim.current_distance, sparse_claim.current_distance)
+        dense_item, dense_iterable = sparse_distance.compute_item_and_iterable_gradients(dense_claim, 0.3)
+        sparse_item, sparse_iterable = sparse_distance.compute_sparse_item_and_iterable_gradients(sparse_claim, 0.3)
+        self.assertTrue(np.allclose(dense_item[sparse_claim.item_indices], sparse_item))
+        self.assertTrue(np.allclose(dense_iterable[sparse_claim.iterable_indices], sparse_iterable))
+        self.assertEqual(np.count_nonzero(dense_item), np.count_nonzero(sparse_item))
+        self.assertEqual(np.count_nonzero(dense_iterable), np.count_nonzero(sparse_iterable))
+
+    def test_float32_learning_agrees_with_float64(self):
+        # Documented accuracy of the float32 precision: distances within 1e-5 of float64, weights within 1e-4.
+        corpus = [tuple((7 * index + 3 * k) % 23 for k in range(1 + index % 5)) for index in range(200)]
+        generator = random.Random(0)
+        oracle_claims = [OracleClaim(({generator.choice(corpus)}, {generator.choice(corpus)}), (0.2, 0.4))
+                         for _ in range(50)]
+        learnt_distances = []
+        for precision in (FLOAT64, FLOAT32):
+            learning_distance = LearningDistance(corpus, precision=precision)
+            random.seed(0)
+            learning_distance.learn(oracle_claims, number_of_iterations=3)
+            learnt_distances.append(learning_distance)
+        float64_distance, float32_distance = learnt_distances
+        self.assertEqual(float32_distance.item_weights_vector.dtype, np.float32)
+        self.assertTrue(np.allclose(float32_distance.item_weights_vector, float64_distance.item_weights_vector,
+                                    rtol=1e-4, atol=0.))
+        self.assertTrue(np.allclose(float32_distance.iterable_weights_vector, float64_distance.iterable_weights_vector,
+                                    rtol=1e-4, atol=0.))
+        for oracle_claim in oracle_claims:
+            self.assertAlmostEqual(float32_distance(*oracle_claim.iterables_pair),
+                                   float64_distance(*oracle_claim.iterables_pair), delta=1e-5)
+
+    def test_vectorization_cache(self):
+        cached_distance = LearningDistance(iterables, vectorization_cache_size=2)
+        current_distance = cached_distance(iterables0, iterables1)
+        self.assertEqual(cached_distance(iterables1, iterables0), current_distance)
+        cache = cached_distance.vectorization_cache
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        oracle_claim = OracleClaim((iterables0, iterables1), (current_distance * 2., 1.))
+        cached_distance.learn_from_one_oracle_claim(oracle_claim, effort=0.5)
+        uncached_distance = LearningDistance(iterables, cached_distance.get_item_weights(),
+                                             cached_distance.get_iterable_weights())
+        self.assertAlmostEqual(cached_distance(iterables0, iterables1), uncached_distance(iterables0, iterables1))
+        self.assertNotAlmostEqual(cached_distance(iterables0, iterables1), current_distance)
+
     def test_closest_point_from_interval(self):
         interval = (-2, 4)
         self.assertEqual(closest_point_from_interval(-3, interval), -2)
@@ -27,6 +27,24 @@ class TestMatrixOperations(unittest.TestCase):
             for j in range(column_number):
                 self.assertEqual(computed[i, j], expected[i, j])
 
+    def test_matrix_from_index_arrays(self):
+        computed = matrix_from_index_arrays([0, 1, 1, 0, 2], [1, 0, 0, 1, 1], (3, 2))
+        expected = csr_matrix([[0, 2], [2, 0], [0, 1]])
+        self.assertEqual(computed.get_shape(), (3, 2))
+        self.assertEqual(computed.indices.dtype, np.int32)
+        self.assertEqual((computed != expected).nnz, 0)
+
+    def test_index_arrays_from_iterables(self):
+        item_indices, iterable_indices = index_arrays_from_iterables(iterables, item_to_index, iterable_to_index)
+        self.assertEqual(list(item_indices), [item_to_index[item] for iterable in iterables for item in iterable])
+        self.assertEqual(list(iterable_indices), [iterable_to_index[iterable]
+                                                  for iterable in iterables for _ in iterable])
+
+    def test_indicator_matrix_from_index_map_and_collections(self):
+        computed = indicator_matrix_from_index_map_and_collections(iterable_to_index, [['base', 'banana', 'base'], []])
+        self.assertEqual(computed.get_shape(), (3, 2))
+        self.assertEqual(computed.toarray().tolist(), [[1., 0.], [0., 0.], [1., 0.]])
+
     def test_vector_from_index_and_value_maps(self):
         to_index = {'a': 0, 'b': 1, 'c': 2}
         to_value = {'a': 0.1, 'c': 3}
@@ -43,6 +61,14 @@ class TestMatrixOperations(unittest.TestCase):
         for i in range(row_number):
             self.assertEqual(computed[i], expected[i])
 
+    def test_columns_nonzero_on_rows(self):
+        self.assertEqual(list(columns_nonzero_on_rows(matrix, [0, 4])), [0, 2])
+        self.assertEqual(list(columns_nonzero_on_rows(matrix, [])), [])
+
+    def test_row_wise_mean_of_nonzero_entries(self):
+        computed = row_wise_mean_of_nonzero_entries(csr_matrix([[1., 0., 3.], [0., 0., 0.], [-2., 0., 0.]]))
+        self.assertTrue(are_equal_vectors(computed, create_vector([2., 0., -2.])))
+
     def test_cosine_distance(self):
         u = create_vector([1., 3., 2.])
         v = create_vector([2., -1., 0.5])
@@ -50,6 +76,59 @@ class TestMatrixOperations(unittest.TestCase):
         self.assertAlmostEqual(cosine_distance(zero_vector, u), 1.)
         self.assertAlmostEqual(cosine_distance(u, v), 1. - scalar_product(u, v) / norm(u) / norm(v))
 
+    def test_sparse_cosine_distance_from_norms(self):
+        u = create_vector([1., 3., 0., 2.])
+        v = create_vector([2., 0., -1., 0.5])
+        indices0, indices1 = np.flatnonzero(u), np.flatnonzero(v)
+        self.assertAlmostEqual(sparse_cosine_distance_from_norms(indices0, u[indices0], norm(u),
+                                                                 indices1, v[indices1], norm(v)), cosine_distance(u, v))
+        self.assertEqual(sparse_cosine_distance_from_norms(indices0, u[indices0], norm(u), [], [], 0.), 1.)
+
+    def test_sparse_dot_columns_dot_products(self):
+        matrix = csr_matrix([[1, 0, 2], [0, 0, 3], [4, 0, 0]]).tocsc()
+        dot_vector = create_vector([1., 2., 3.])
+        column_indices = np.array([0, 1])
+        row_indices, values = sparse_dot_columns_dot_products(dot_vector, columns_of_csc_matrix(matrix, column_indices),
+                                                              create_vector([5., 6.]))
+        expected = dot_matrix_dot_products(dot_vector, matrix, create_vector([5., 6., 0.]), one_vector_from_length(3))
+        self.assertEqual(row_indices.tolist(), [0, 2])
+        self.assertTrue(np.allclose(values, expected[row_indices]))
+
+    def test_sparse_transposed_dot_products(self):
+        matrix = csr_matrix([[1, 0, 2], [0, 0, 3], [4, 0, 0]]).tocsc()
+        computed = sparse_transposed_dot_products(matrix, np.array([0, 2]), create_vector([5., 7.]))
+        expected = transpose_matrix(matrix) @ create_vector([5., 0., 7.])
+        self.assertTrue(np.allclose(computed, expected))
+        self.assertTrue(are_equal_vectors(vector_on_support(np.array([2]), create_vector([7.]), np.array([0, 2])),
+                                          create_vector([0., 7.])))
+
+    def test_scale_rows(self):
+        computed = scale_rows(matrix, create_vector([1., 2., 0., 1., 3.]))
+        expected = diagonal_matrix_from_vector(create_vector([1., 2., 0., 1., 3.])) @ matrix
+        self.assertTrue(np.allclose(computed.toarray(), expected.toarray()))
+
+    def test_matrix_with_replaced_rows(self):
+        rows = csr_matrix([[0, 5, 0], [7, 0, 0]])
+        computed = matrix_with_replaced_rows(matrix, [4, 0], rows)
+        expected = matrix.toarray()
+        expected[[4, 0]] = rows.toarray()
+        self.assertTrue(np.array_equal(computed.toarray(), expected))
+        self.assertEqual(vertical_stack([rows, matrix[:1]], 3).shape, (3, 3))
+        self.assertEqual(vertical_stack([], 3).shape, (0, 3))
+
+    def test_float32_precision(self):
+        matrix = matrix_from_index_arrays([0, 1, 1], [0, 0, 1], (2, 2), dtype=count_dtype_from_precision(FLOAT32))
+        self.assertEqual(matrix.dtype, np.int32)
+        weights = one_vector_from_length(2, float_dtype_from_precision(FLOAT32))
+        self.assertEqual(dot_matrix_dot_products(weights, matrix, weights, weights).dtype, np.float32)
+        self.assertEqual(dot_matrix_dot_products(weights, matrix, 1., create_vector([1, 0])).dtype, np.float64)
+        _, values = sparse_dot_columns_dot_products(weights, matrix.tocsc(), weights)
+        self.assertEqual(values.dtype, np.float32)
+        self.assertEqual(precision_from_dtype(np.int32), FLOAT32)
+        self.assertEqual(precision_from_dtype(np.float64), FLOAT64)
+        with self.assertRaises(ValueError):
+            check_precision('float16')
+
     def test_scale_vector_to_satisfy_lower_bound(self):
         vector = create_vector([6, 2, 4, 8])
         self.assertTrue(are_equal_vectors(rescale_vector_to_satisfy_lower_negative_bound(vector, -1), vector))
@@ -0,0 +1,98 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import random
+import tempfile
+import unittest
+from oracle_claim_set import *
+from learning_distance import LearningDistance, SparseEnrichedOracleClaim
+from oracle_claim import OracleClaim
+
+
+iterables = ['banana', 'ananas', 'base', 'cc', 'sea', 'bab', 'cab', 'abba', 'cabbage', 'seabed', 'ebb']
+generator = random.Random(0)
+collections = [set(generator.sample(iterables, generator.randint(1, 3))) for _ in range(20)]
+oracle_claims = [OracleClaim((collections[2 * k], collections[2 * k + 1]), (0.1 * (k % 3), 0.2 + 0.1 * (k % 3)))
+                 for k in range(10)]
+
+
+class TestOracleClaimSet(unittest.TestCase):
+
+    def test_compilation(self):
+        distance = LearningDistance(iterables)
+        oracle_claim_set = OracleClaimSet.from_oracle_claims(oracle_claims, distance)
+        self.assertEqual(len(oracle_claim_set), len(oracle_claims))
+        for claim_index, oracle_claim in enumerate(oracle_claims):
+            for iterable_indices, collection in zip(oracle_claim_set.iterable_indices(claim_index),
+                                                    oracle_claim.iterables_pair):
+                self.assertEqual(list(iterable_indices), sorted(distance.iterable_to_index[iterable]
+                                                                for iterable in collection))
+            self.assertEqual(oracle_claim_set.distance_interval(claim_index), oracle_claim.distance_interval)
+        subset = oracle_claim_set[np.array([3, 1])]
+        self.assertEqual(subset.distance_interval(0), oracle_claims[3].distance_interval)
+        self.assertTrue(np.array_equal(subset.iterable_indices(1)[0], oracle_claim_set.iterable_indices(1)[0]))
+        self.assertEqual(len(oracle_claim_set[2:5]), 3)
+        with self.assertRaises(KeyError):
+            OracleClaimSet.from_oracle_claims([OracleClaim(({'bees'}, {'sea'}), (0., 1.))], distance)
+        # The claims stay valid for the iterables added afterwards.
+        distance.add_iterables(['bees'])
+        self.assertEqual(oracle_claim_set.iterables_matrices(distance)[0].shape,
+                         (distance.number_of_iterable_slots(), len(oracle_claims)))
+
+    def test_same_learning(self):
+        for batch_size in (None, len(oracle_claims)):
+            distance = LearningDistance(iterables)
+            compiled_distance = LearningDistance(iterables)
+            oracle_claim_set = OracleClaimSet.from_oracle_claims(oracle_claims, compiled_distance)
+            if batch_size is None:
+                for claim_index, oracle_claim in enumerate(oracle_claims):
+                    distance.learn_from_one_oracle_claim(oracle_claim, effort=0.5)
+                    compiled_distance.learn_from_sparse_enriched_oracle_claim(
+                        SparseEnrichedOracleClaim.from_oracle_claim_set(oracle_claim_set, claim_index,
+                                                                        compiled_distance, effort=0.5))
+            else:
+                # A single batch does not depend on the order of the claims.
+                distance.learn(oracle_claims, number_of_iterations=1, batch_size=batch_size)
+                compiled_distance.learn(oracle_claim_set, number_of_iterations=1, batch_size=batch_size)
+            self.assertTrue(np.allclose(distance.item_weights_vector, compiled_distance.item_weights_vector))
+            self.assertTrue(np.allclose(distance.iterable_weights_vector, compiled_distance.iterable_weights_vector))
+        distance = LearningDistance(iterables)
+        losses_before = [loss(distance, oracle_claim) for oracle_claim in oracle_claims]
+        random.seed(0)
+        distance.learn(OracleClaimSet.from_oracle_claims(oracle_claims, distance), number_of_iterations=5)
+        self.assertLess(sum(loss(distance, oracle_claim) for oracle_claim in oracle_claims), sum(losses_before))
+
+    def test_round_trip(self):
+        distance = LearningDistance(iterables)
+        oracle_claim_set = OracleClaimSet.from_oracle_claims(oracle_claims, distance)
+        for mmap in (True, False):
+            with tempfile.TemporaryDirectory() as path:
+                oracle_claim_set.save(path)
+                loaded_oracle_claim_set = OracleClaimSet.load(path, mmap=mmap)
+                self.assertEqual(loaded_oracle_claim_set.lower_bounds.flags.writeable, not mmap)
+                for name in ('iterables_matrix0', 'iterables_matrix1'):
+                    self.assertEqual((getattr(oracle_claim_set, name) != getattr(loaded_oracle_claim_set, name)).nnz, 0)
+                self.assertTrue(np.array_equal(oracle_claim_set.upper_bounds, loaded_oracle_claim_set.upper_bounds))
+                learnt_distances = []
+                for claim_set in (oracle_claim_set, loaded_oracle_claim_set):
+                    learnt_distances.append(LearningDistance(iterables))
+                    random.seed(0)
+                    learnt_distances[-1].learn(claim_set, number_of_iterations=2)
+                self.assertTrue(np.array_equal(learnt_distances[0].item_weights_vector,
+                                               learnt_distances[1].item_weights_vector))
+                del loaded_oracle_claim_set
+
+
+def loss(distance, oracle_claim):
+    lower_bound, upper_bound = oracle_claim.distance_interval
+    current_distance = distance(*oracle_claim.iterables_pair)
+    return max(lower_bound - current_distance, current_distance - upper_bound, 0.)
+
+
+if __name__ == '__main__':
+    unittest.main()
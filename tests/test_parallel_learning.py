@@ -0,0 +1,68 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from parallel_learning import *
+from oracle_claim import OracleClaim
+
+
+iterables = ['aa', 'ab', 'bbb', 'abc', 'cca']
+item_to_weight = {'a': 1, 'b': 2, 'c': 1}
+iterable_to_weight = {'aa': 1, 'ab': 2, 'bbb': 3, 'abc': 1, 'cca': 2}
+iterables_pairs = [({'ab'}, {'bbb'}), ({'aa', 'abc'}, {'cca'}), ({'abc'}, {'bbb', 'aa'}), ({'ab'}, {'cca'})]
+
+
+def oracle_claims_moving_away(distance):
+    return [OracleClaim(iterables_pair, (min(1., 2. * distance(*iterables_pair)), 1.))
+            for iterables_pair in iterables_pairs]
+
+
+def total_distance_to_targets(distance, oracle_claims):
+    return sum(oracle_claim.distance_interval[0] - distance(*oracle_claim.iterables_pair)
+               for oracle_claim in oracle_claims)
+
+
+class TestParallelLearning(unittest.TestCase):
+
+    def test_synchronous_learning_is_reproducible(self):
+        weights = []
+        for _ in range(2):
+            distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+            oracle_claims = oracle_claims_moving_away(distance)
+            initial_total = total_distance_to_targets(distance, oracle_claims)
+            learn_in_parallel(distance, oracle_claims, 2, schedule=SYNCHRONOUS, number_of_iterations=3, seed=7)
+            self.assertLess(total_distance_to_targets(distance, oracle_claims), initial_total)
+            weights.append((distance.item_weights_vector, distance.iterable_weights_vector))
+        self.assertTrue(are_equal_vectors(weights[0][0], weights[1][0]))
+        self.assertTrue(are_equal_vectors(weights[0][1], weights[1][1]))
+        distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        oracle_claim_set = OracleClaimSet.from_oracle_claims(oracle_claims_moving_away(distance), distance)
+        learn_in_parallel(distance, oracle_claim_set, 2, schedule=SYNCHRONOUS, number_of_iterations=3, seed=7)
+        self.assertTrue(are_equal_vectors(distance.item_weights_vector, weights[0][0]))
+
+    def test_asynchronous_learning(self):
+        distance = LearningDistance(iterables, item_to_weight, iterable_to_weight)
+        oracle_claims = oracle_claims_moving_away(distance)
+        initial_total = total_distance_to_targets(distance, oracle_claims)
+        weights_version = distance.weights_version
+        learn_in_parallel(distance, oracle_claims, 2, schedule=ASYNCHRONOUS, number_of_iterations=3, seed=7)
+        self.assertLess(total_distance_to_targets(distance, oracle_claims), initial_total)
+        self.assertGreater(distance.weights_version, weights_version)
+
+    def test_unknown_schedule(self):
+        distance = LearningDistance(iterables)
+        with self.assertRaises(ValueError):
+            learn_in_parallel(distance, [], 2, schedule='eventually')
+
+    def test_averaged_rescaling_vector(self):
+        computed = averaged_rescaling_vector([create_vector([1., 2., 0.5]), create_vector([1., 1., 1.5])])
+        self.assertTrue(are_equal_vectors(computed, create_vector([1., 2., 1.])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import tempfile
+import unittest
+from persistence import *
+from learning_distance import LearningDistance
+from matrix_operations import FLOAT32
+from oracle_claim import OracleClaim
+from weighting import BM25
+
+
+iterables = [('a', 'b', 'a'), ('b', 'c'), ('c', 'c', 'd'), ('a', 'd')]
+iterables0 = {('a', 'b', 'a')}
+iterables1 = {('c', 'c', 'd'), ('a', 'd')}
+
+
+class TestPersistence(unittest.TestCase):
+
+    def assertSameDistances(self, distance0, distance1):
+        self.assertEqual(distance0.item_to_index, distance1.item_to_index)
+        self.assertEqual(distance0.iterable_to_index, distance1.iterable_to_index)
+        self.assertEqual((distance0.item_iterable_matrix != distance1.item_iterable_matrix).nnz, 0)
+        self.assertTrue(np.array_equal(distance0.item_weights_vector, distance1.item_weights_vector))
+        self.assertTrue(np.array_equal(distance0.iterable_weights_vector, distance1.iterable_weights_vector))
+        self.assertEqual(distance0(iterables0, iterables1), distance1(iterables0, iterables1))
+
+    def test_round_trip(self):
+        distance = LearningDistance(iterables)
+        distance.learn([OracleClaim((iterables0, iterables1), (0.9, 1.))], number_of_iterations=2)
+        for mmap in (True, False):
+            with tempfile.TemporaryDirectory() as path:
+                distance.save(path)
+                loaded_distance = LearningDistance.load(path, mmap=mmap)
+                self.assertIsInstance(loaded_distance, LearningDistance)
+                self.assertSameDistances(distance, loaded_distance)
+
+    def test_round_trip_with_compact_vocabulary(self):
+        distance = LearningDistance(iterables, compact_vocabulary=True)
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            loaded_distance = LearningDistance.load(path, mmap=True)
+            self.assertIsInstance(loaded_distance.iterable_to_index, Vocabulary)
+            self.assertSameDistances(distance, loaded_distance)
+            loaded_distance.add_iterables([('e', 'a')])
+            self.assertEqual(loaded_distance.iterable_to_index[('e', 'a')], 4)
+
+    def test_dict_index_maps_are_stored_as_vocabularies(self):
+        distance = LearningDistance(iterables)
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            self.assertFalse(os.path.exists(os.path.join(path, 'iterable_keys.pickle')))
+            loaded_distance = LearningDistance.load(path)
+            self.assertIsInstance(loaded_distance.item_to_index, Vocabulary)
+            self.assertIsInstance(loaded_distance.iterable_to_index, Vocabulary)
+            self.assertSameDistances(distance, loaded_distance)
+
+    def test_keys_that_cannot_be_encoded_are_pickled(self):
+        distance = LearningDistance([(frozenset('a'), 'b'), ('b', 'c')])
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            loaded_distance = LearningDistance.load(path)
+        self.assertIsInstance(loaded_distance.item_to_index, dict)
+        self.assertIsInstance(loaded_distance.iterable_to_index, dict)
+        self.assertEqual(loaded_distance.item_to_index, distance.item_to_index)
+        self.assertEqual(loaded_distance.iterable_to_index, distance.iterable_to_index)
+
+    def test_round_trip_keeps_weighting(self):
+        distance = LearningDistance(iterables, weighting=BM25)
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            loaded_distance = LearningDistance.load(path)
+        self.assertEqual(loaded_distance.weighting, BM25)
+        distance.add_iterables([('a', 'z')])
+        loaded_distance.add_iterables([('a', 'z')])
+        self.assertSameDistances(distance, loaded_distance)
+
+    def test_learning_after_memory_mapped_load(self):
+        distance = LearningDistance(iterables)
+        oracle_claim = OracleClaim((iterables0, iterables1), (0.9, 1.))
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            loaded_distance = LearningDistance.load(path, mmap=True)
+            distance.learn_from_one_oracle_claim(oracle_claim)
+            loaded_distance.learn_from_one_oracle_claim(oracle_claim)
+            self.assertSameDistances(distance, loaded_distance)
+
+    def test_removed_iterables_are_compacted(self):
+        distance = LearningDistance(iterables)
+        distance.remove_iterables([('b', 'c')])
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            loaded_distance = LearningDistance.load(path)
+        self.assertEqual(len(loaded_distance.iterable_weights_vector), 3)
+        self.assertSameDistances(distance, loaded_distance)
+
+    def test_round_trip_keeps_precision(self):
+        distance = LearningDistance(iterables, precision=FLOAT32)
+        with tempfile.TemporaryDirectory() as path:
+            distance.save(path)
+            loaded_distance = LearningDistance.load(path)
+            self.assertEqual(loaded_distance.precision, FLOAT32)
+            self.assertEqual(loaded_distance.item_iterable_matrix.dtype, np.int32)
+            self.assertSameDistances(distance, loaded_distance)
+
+
+if __name__ == '__main__':
+    unittest.main()
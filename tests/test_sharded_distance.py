@@ -0,0 +1,72 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import random
+import unittest
+from sharded_distance import *
+from learning_distance import LearningDistance
+from oracle_claim import OracleClaim
+from weighting import BM25
+
+
+iterables = ['banana', 'ananas', 'base', 'cc', 'sea', 'bab', 'cab', 'abba', 'banana', 'cabbage', 'seabed', 'ebb']
+generator = random.Random(0)
+collections = [set(generator.sample(iterables, generator.randint(1, 3))) for _ in range(20)]
+oracle_claims = [OracleClaim((collections[2 * k], collections[2 * k + 1]), (0.1, 0.3)) for k in range(10)]
+
+
+class TestShardedDistance(unittest.TestCase):
+
+    def assertSameWeights(self, weights0, weights1):
+        self.assertEqual(set(weights0), set(weights1))
+        for key, weight in weights0.items():
+            self.assertAlmostEqual(weight, weights1[key])
+
+    def assertSameDistances(self, sharded_distance, distance):
+        self.assertSameWeights(sharded_distance.get_item_weights(), distance.get_item_weights())
+        self.assertSameWeights(sharded_distance.get_iterable_weights(), distance.get_iterable_weights())
+        for collection0, collection1 in zip(collections, collections[1:]):
+            self.assertAlmostEqual(sharded_distance(collection0, collection1), distance(collection0, collection1))
+            self.assertTrue(np.allclose(sharded_distance.vectorize(collection0),
+                                        distance.vectorize(collection0)[[distance.item_to_index[item]
+                                                                         for item in sharded_distance.item_to_index]]))
+
+    def test_same_distances_as_distance(self):
+        for number_of_shards in (1, 3):
+            for weighting in (DEFAULT_WEIGHTING, BM25):
+                with ShardedDistance(iterables, number_of_shards, weighting=weighting, chunk_size=2) as distance:
+                    self.assertEqual(distance.number_of_iterables(), len(set(iterables)))
+                    self.assertSameDistances(distance, LearningDistance(iterables, weighting=weighting))
+        item_to_weight = {item: index + 1. for index, item in enumerate('abcegnsd')}
+        iterable_to_weight = {iterable: len(iterable) for iterable in iterables}
+        with ShardedDistance(iterables, 4, item_to_weight, iterable_to_weight) as distance:
+            self.assertSameDistances(distance, LearningDistance(iterables, item_to_weight, iterable_to_weight))
+
+    def test_learning_routed_to_shards(self):
+        reference = LearningDistance(iterables)
+        with ShardedDistance(iterables, 3) as distance:
+            random.seed(1)
+            distance.learn(oracle_claims, ratio_item_iterable_learning=0.7, number_of_iterations=3)
+            random.seed(1)
+            reference.learn(oracle_claims, ratio_item_iterable_learning=0.7, number_of_iterations=3)
+            self.assertSameDistances(distance, reference)
+            self.assertNotAlmostEqual(distance.get_item_weights()['b'],
+                                      LearningDistance(iterables).get_item_weights()['b'])
+
+    def test_unknown_iterable(self):
+        with ShardedDistance(iterables, 3) as distance:
+            with self.assertRaises(KeyError):
+                distance({'banana'}, {'unknown', 'cc'})
+            # The shards are still synchronized with the coordinator.
+            self.assertAlmostEqual(distance({'banana'}, {'banana', 'cc'}),
+                                   LearningDistance(iterables)({'banana'}, {'banana', 'cc'}))
+            self.assertEqual(distance({'banana'}, set()), 1.)
+
+
+if __name__ == '__main__':
+    unittest.main()
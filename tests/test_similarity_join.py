@@ -0,0 +1,84 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+import random
+from similarity_join import *
+from distance import Distance
+
+
+iterables = ['banana', 'ananas', 'base', 'cc', 'sea', 'bab', 'cab', 'abba']
+generator = random.Random(0)
+collections = [set(generator.sample(iterables, generator.randint(0, 3))) for _ in range(40)]
+
+
+def brute_force_pairs(distance, threshold):
+    distances = distance.pairwise(collections, collections)
+    return {(i, j): distances[i, j] for i in range(len(collections)) for j in range(i + 1, len(collections))
+            if distances[i, j] <= threshold}
+
+
+def joined_pairs(chunks):
+    pairs = dict()
+    for rows, columns, distances in chunks:
+        assert (rows < columns).all()
+        pairs.update(zip(zip(rows.tolist(), columns.tolist()), distances.tolist()))
+    return pairs
+
+
+class TestSimilarityJoin(unittest.TestCase):
+
+    def assertSamePairs(self, computed, expected):
+        self.assertEqual(set(computed), set(expected))
+        for pair, distance in expected.items():
+            self.assertAlmostEqual(computed[pair], distance)
+
+    def test_same_pairs_as_brute_force(self):
+        distance = Distance(iterables)
+        for threshold in (0.01, 0.1, 0.4, 0.9):
+            join = SimilarityJoin(distance, collections, threshold)
+            self.assertSamePairs(joined_pairs(join.chunks()), brute_force_pairs(distance, threshold))
+            self.assertLessEqual(join.number_of_verified_pairs, join.number_of_candidates)
+        with self.assertRaises(ValueError):
+            SimilarityJoin(distance, collections, 1.)
+
+    def test_exact_duplicates(self):
+        distance = Distance(iterables)
+        duplicated_collections = [collection for collection in collections if collection] * 2
+        pairs = joined_pairs(SimilarityJoin(distance, duplicated_collections, 0.).chunks())
+        number_of_collections = len(duplicated_collections) // 2
+        for index in range(number_of_collections):
+            self.assertIn((index, index + number_of_collections), pairs)
+        for (index0, index1), pair_distance in pairs.items():
+            self.assertEqual(duplicated_collections[index0], duplicated_collections[index1])
+            self.assertGreaterEqual(pair_distance, 0.)
+
+    def test_blocks_within_memory_budget(self):
+        distance = Distance(iterables)
+        join = SimilarityJoin(distance, collections, 0.4, memory_budget=1000)
+        self.assertGreater(len(join.blocks), 1)
+        self.assertEqual(join.blocks[0][0], 0)
+        self.assertEqual(join.blocks[-1][1], len(collections))
+        self.assertSamePairs(joined_pairs(join.chunks()), brute_force_pairs(distance, 0.4))
+        self.assertEqual(blocks_of_bounded_cost(np.array([2., 5., 1., 1., 3.]), 4.), [(0, 1), (1, 2), (2, 4), (4, 5)])
+
+    def test_process_pool(self):
+        distance = Distance(iterables)
+        chunks = similarity_join(distance, collections, 0.4, memory_budget=1000, number_of_workers=2)
+        self.assertSamePairs(joined_pairs(chunks), brute_force_pairs(distance, 0.4))
+
+    def test_prefix_matrix(self):
+        rows = csr_matrix(np.array([[0.6, 0.8, 0.], [0., 0., 1.]]))
+        # The items are equally frequent, so they are ordered by index. The norm of the first row
+        # from item 1 is '0.8': item 1 is in the prefix for '0.7', but not for '0.9'.
+        self.assertEqual(prefix_matrix(rows, 0.7).toarray().tolist(), [[1., 1., 0.], [0., 0., 1.]])
+        self.assertEqual(prefix_matrix(rows, 0.9).toarray().tolist(), [[1., 0., 0.], [0., 0., 1.]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -40,6 +40,29 @@ class TestVectorSpace(unittest.TestCase):
             computed_string += letter
         self.assertEqual(computed_string, 'abcdef')
 
+    def test_index_maps_and_matrix_from_iterables(self):
+        iterables_with_duplicate = ['banana', 'ananas', 'base', 'ananas', '']
+        item_to_index, iterable_to_index, matrix = index_maps_and_matrix_from_iterables(
+            iterable for iterable in iterables_with_duplicate)
+        expected_item_to_index = map_to_index_from_iterable(iterables_union(iterables_with_duplicate))
+        expected_iterable_to_index = map_to_index_from_iterable(iterables_with_duplicate)
+        expected_matrix = matrix_from_iterables_and_index_maps(iterables_with_duplicate, expected_item_to_index,
+                                                               expected_iterable_to_index)
+        self.assertEqual(item_to_index, expected_item_to_index)
+        self.assertEqual(iterable_to_index, expected_iterable_to_index)
+        self.assertEqual(matrix.get_shape(), (5, 4))
+        self.assertEqual((matrix != expected_matrix).nnz, 0)
+        self.assertEqual(matrix[item_to_index['a'], iterable_to_index['ananas']], 6)
+
+    def test_compact_vocabulary(self):
+        space = VectorSpace(iterables, compact_vocabulary=True)
+        self.assertEqual(dict(space.item_to_index.items()), vector_space.item_to_index)
+        self.assertEqual(dict(space.iterable_to_index.items()), vector_space.iterable_to_index)
+        self.assertEqual((space.item_iterable_matrix != vector_space.item_iterable_matrix).nnz, 0)
+        space.add_iterables(['sea'])
+        space.remove_iterables(['banana', 'ananas'])
+        self.assertEqual(dict(space.iterable_to_index.items()), {'base': 0, 'sea': 1})
+
     def test_count_iterables_containing_item(self):
         self.assertEqual(vector_space.count_iterables_containing_item('a'), 3)
         self.assertEqual(vector_space.count_iterables_containing_item('b'), 2)
@@ -47,6 +70,74 @@ class TestVectorSpace(unittest.TestCase):
         self.assertEqual(vector_space.count_iterables_containing_item('e'), 1)
         self.assertEqual(vector_space.count_iterables_containing_item('f'), 0)
 
+    def test_add_iterables(self):
+        space = VectorSpace(['banana', 'ananas'])
+        self.assertEqual(space.add_iterables(['base', 'banana', 'base']), ['base'])
+        self.assertEqual(space.add_iterables(['sea']), ['sea'])
+        expected = VectorSpace(['banana', 'ananas', 'base', 'sea'])
+        self.assertEqual(space.item_to_index, expected.item_to_index)
+        self.assertEqual(space.iterable_to_index, expected.iterable_to_index)
+        self.assertEqual((space.item_iterable_matrix != expected.item_iterable_matrix).nnz, 0)
+
+    def test_counts_and_csc_matrix_updated_by_additions(self):
+        space = VectorSpace(['banana', 'ananas', 'base'])
+        csc_matrix_cache = space.item_iterable_csc_matrix()
+        space.document_frequencies()
+        space.iterable_lengths()
+        for new_iterables in (['sea'], ['bee', 'cabbage'], ['zz']):
+            space.add_iterables(new_iterables)
+            self.assertEqual(space.merged_item_iterable_matrix.shape[1], 3)
+        space.remove_iterables(['ananas'])
+        expected = VectorSpace(['banana', 'base', 'sea', 'bee', 'cabbage', 'zz', 'ananas'])
+        expected.remove_iterables(['ananas'])
+        self.assertIsNot(space.item_iterable_csc_matrix(), csc_matrix_cache)
+        self.assertEqual(space.item_iterable_csc_matrix().shape, space.item_iterable_matrix.shape)
+        self.assertEqual((space.item_iterable_csc_matrix() != space.item_iterable_matrix).nnz, 0)
+        for item, index in space.item_to_index.items():
+            self.assertEqual(space.document_frequencies()[index],
+                             expected.document_frequencies()[expected.item_to_index[item]])
+        self.assertEqual(list(space.iterable_lengths()), [6, 6, 4, 3, 3, 7, 2])
+
+    def test_csc_matrix_from_components_is_not_copied(self):
+        csc_matrix_of_counts = vector_space.item_iterable_csc_matrix().copy()
+        space = VectorSpace.from_components(dict(vector_space.item_to_index), dict(vector_space.iterable_to_index),
+                                            vector_space.item_iterable_matrix,
+                                            item_iterable_csc_matrix=csc_matrix_of_counts)
+        self.assertTrue(np.shares_memory(space.item_iterable_csc_matrix().data, csc_matrix_of_counts.data))
+        space.add_iterables(['sea'])
+        self.assertEqual(csc_matrix_of_counts.shape, (5, 3))
+        self.assertEqual((space.item_iterable_csc_matrix() != space.item_iterable_matrix).nnz, 0)
+
+    def test_remove_iterables_and_compact(self):
+        space = VectorSpace(['banana', 'ananas', 'base', 'sea', 'bee'])
+        space.remove_iterables(['ananas'])
+        self.assertEqual(space.number_of_iterable_slots(), 5)
+        self.assertEqual(space.count_iterables_containing_item('n'), 1)
+        self.assertEqual(list(space.document_frequencies()), [3, 3, 1, 2, 3])
+        space.remove_iterables(['banana'])
+        self.assertEqual(space.number_of_iterable_slots(), 3)
+        expected = VectorSpace(['base', 'sea', 'bee'])
+        self.assertEqual(space.iterable_to_index, expected.iterable_to_index)
+        for item in 'bases':
+            for iterable in ['base', 'sea', 'bee']:
+                self.assertEqual(space.item_iterable_matrix[space.item_to_index[item],
+                                                            space.iterable_to_index[iterable]],
+                                 expected.item_iterable_matrix[expected.item_to_index[item],
+                                                               expected.iterable_to_index[iterable]])
+
+    def test_compact_map_not_in_index_order(self):
+        reference = VectorSpace(['ab', 'bc', 'cd'])
+        matrix = csr_matrix(reference.item_iterable_matrix[:, [reference.iterable_to_index[iterable]
+                                                               for iterable in ['ab', 'bc', 'cd']]])
+        space = VectorSpace.from_components(dict(reference.item_to_index), {'bc': 1, 'ab': 0, 'cd': 2}, matrix)
+        space.remove_iterables(['cd'])
+        space.compact()
+        self.assertEqual(space.iterable_to_index, {'ab': 0, 'bc': 1})
+        for iterable in ['ab', 'bc']:
+            self.assertTrue(are_equal_vectors(
+                space.item_iterable_matrix[:, space.iterable_to_index[iterable]].toarray(),
+                reference.item_iterable_matrix[:, reference.iterable_to_index[iterable]].toarray()))
+
     def test_vector_length(self):
         vector = vector_space.iterable_vector_from_collection(['ananas', 'banana'])
         projection = matrix_vector_product(vector_space.item_iterable_matrix, vector)
@@ -0,0 +1,41 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from vectorization_cache import *
+
+
+class TestVectorizationCache(unittest.TestCase):
+
+    def test_least_recently_used_eviction(self):
+        cache = VectorizationCache(2)
+        cache.put('a', 1, 0)
+        cache.put('b', 2, 0)
+        self.assertEqual(cache.get('a', 0), 1)
+        cache.put('c', 3, 0)
+        self.assertIsNone(cache.get('b', 0))
+        self.assertEqual(cache.get('a', 0), 1)
+        self.assertEqual(cache.get('c', 0), 3)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        self.assertEqual(len(cache), 2)
+
+    def test_weights_version_invalidation(self):
+        cache = VectorizationCache(2)
+        cache.put('a', 1, 0)
+        self.assertIsNone(cache.get('a', 1))
+        self.assertEqual(len(cache), 0)
+        cache.put('a', 2, 1)
+        self.assertEqual(cache.get('a', 1), 2)
+
+    def test_maximum_size(self):
+        with self.assertRaises(ValueError):
+            VectorizationCache(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import unittest
+from vocabulary import *
+
+
+keys = ['a', ('a', 'b'), ('b', 'a'), (1, -2), (2 ** 40, 1), (), 1, -300, 2 ** 70, 2.5, None, True, b'a',
+        (('x', 2), ()), 'é', '']
+
+
+class TestVocabulary(unittest.TestCase):
+
+    def test_encode_and_decode_key(self):
+        for key in keys:
+            decoded = decode_key(encode_key(key))
+            self.assertEqual(decoded, key)
+            self.assertIs(type(decoded), type(key))
+        self.assertEqual(encode_key(('ab', 'ab')), encode_key(('a' + 'b', ''.join(['a', 'b']))))
+        with self.assertRaises(TypeError):
+            encode_key(frozenset())
+
+    def test_mapping_interface(self):
+        vocabulary = Vocabulary(keys)
+        self.assertEqual(len(vocabulary), len(keys))
+        self.assertEqual(list(vocabulary), keys)
+        self.assertEqual(list(vocabulary.items()), [(key, index) for index, key in enumerate(keys)])
+        self.assertEqual(vocabulary[('b', 'a')], 2)
+        self.assertEqual(vocabulary.add(('b', 'a')), 2)
+        self.assertNotIn(1., vocabulary)
+        self.assertIsNone(vocabulary.get('z'))
+        with self.assertRaises(KeyError):
+            vocabulary['z']
+
+    def test_growth(self):
+        vocabulary = Vocabulary()
+        for index in range(1000):
+            self.assertEqual(vocabulary.add(('key', index)), index)
+        self.assertTrue(all(vocabulary[('key', index)] == index for index in range(1000)))
+        self.assertEqual(vocabulary.key_from_index(999), ('key', 999))
+
+    def test_deletion_and_compaction(self):
+        vocabulary = Vocabulary(['a', 'b', 'c'])
+        del vocabulary['b']
+        self.assertNotIn('b', vocabulary)
+        self.assertEqual(len(vocabulary), 2)
+        self.assertEqual(dict(vocabulary.items()), {'a': 0, 'c': 2})
+        vocabulary[('d',)] = 3
+        with self.assertRaises(ValueError):
+            vocabulary['e'] = 7
+        self.assertEqual(dict(vocabulary.compacted().items()), {'a': 0, 'c': 1, ('d',): 2})
+
+    def test_from_arrays(self):
+        vocabulary = Vocabulary(keys)
+        copy = Vocabulary.from_arrays(*vocabulary.arrays())
+        self.assertEqual(dict(copy.items()), dict(vocabulary.items()))
+        self.assertEqual(copy.add('new'), len(keys))
+        self.assertNotIn('new', vocabulary)
+
+
+if __name__ == '__main__':
+    unittest.main()
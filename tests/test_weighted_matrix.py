@@ -0,0 +1,95 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import copy
+import random
+import unittest
+from weighted_matrix import *
+from learning_distance import LearningDistance
+from oracle_claim import OracleClaim
+
+
+iterables = ['banana', 'ananas', 'base', 'cc', 'sea', 'bab', 'cab', 'abba', 'cabbage', 'seabed', 'ebb']
+generator = random.Random(0)
+collections = [set(generator.sample(iterables, generator.randint(0, 3))) for _ in range(20)]
+oracle_claims = [OracleClaim((collections[2 * k], collections[2 * k + 1]), (0.1, 0.3)) for k in range(10)]
+
+
+class TestWeightedMatrix(unittest.TestCase):
+
+    def assertSameDistances(self, distance0, distance1):
+        for collection0, collection1 in zip(collections, collections[1:]):
+            self.assertAlmostEqual(distance0(collection0, collection1), distance1(collection0, collection1))
+            self.assertTrue(np.allclose(distance0.vectorize(collection0), distance1.vectorize(collection0)))
+        self.assertTrue(np.allclose(distance0.sparse_vectorization_matrix(collections).toarray(),
+                                    distance1.sparse_vectorization_matrix(collections).toarray()))
+
+    def test_same_vectorizations(self):
+        distance = LearningDistance(iterables)
+        materialized_distance = LearningDistance(iterables)
+        materialized_distance.materialize_weights()
+        self.assertSameDistances(materialized_distance, distance)
+        item_indices, values, vectorization_norm = materialized_distance.sparse_vectorize_with_norm({'cabbage'})
+        self.assertFalse(values.flags.writeable)
+        self.assertAlmostEqual(vectorization_norm, norm(distance.vectorize({'cabbage'})))
+        materialized_distance.materialize_weights(False)
+        self.assertIsNone(materialized_distance.weighted_matrix)
+
+    def test_lazy_rescaling_after_learning(self):
+        distance = LearningDistance(iterables)
+        materialized_distance = LearningDistance(iterables)
+        materialized_distance.materialize_weights()
+        weighted_matrix = materialized_distance.weighted_matrix
+        for learnt_distance in (distance, materialized_distance):
+            random.seed(0)
+            learnt_distance.learn(oracle_claims, number_of_iterations=2)
+        # The stored matrix was updated by pending factors, not built again.
+        self.assertIs(materialized_distance.weighted_matrix, weighted_matrix)
+        self.assertEqual(weighted_matrix.weights_version, materialized_distance.weights_version)
+        self.assertTrue(np.allclose(materialized_distance.item_weights_vector, distance.item_weights_vector))
+        self.assertSameDistances(materialized_distance, distance)
+        # The reads applying the pending factors eventually fold them into the matrix.
+        self.assertGreater(weighted_matrix.number_of_refreshes, 0)
+        weighted_matrix.rescale([0], 2., [1], 0.5, weighted_matrix.weights_version)
+        self.assertTrue(weighted_matrix.has_pending_scales())
+        weighted_matrix.refresh()
+        self.assertFalse(weighted_matrix.has_pending_scales())
+        expected_matrix = LearningDistance(iterables)
+        expected_matrix.item_weights_vector = materialized_distance.item_weights_vector.copy()
+        expected_matrix.iterable_weights_vector = materialized_distance.iterable_weights_vector.copy()
+        expected_matrix.item_weights_vector[0] *= 2.
+        expected_matrix.iterable_weights_vector[1] *= 0.5
+        self.assertTrue(np.allclose(weighted_matrix.matrix.toarray(), WeightedMatrix(expected_matrix).matrix.toarray()))
+
+    def test_rebuilt_after_other_changes(self):
+        distance = LearningDistance(iterables)
+        distance.materialize_weights()
+        distance.set_item_weights({item: 1. for item in distance.item_to_index})
+        distance.add_iterables(['bees'])
+        reference = LearningDistance(iterables)
+        reference.set_item_weights({item: 1. for item in reference.item_to_index})
+        reference.add_iterables(['bees'])
+        self.assertSameDistances(distance, reference)
+        self.assertAlmostEqual(distance({'bees'}, {'sea'}), reference({'bees'}, {'sea'}))
+        self.assertEqual(distance.weighted_matrix.matrix.shape, distance.item_iterable_matrix.shape)
+
+    def test_snapshot_isolation(self):
+        distance = LearningDistance(iterables)
+        distance.materialize_weights()
+        distance.learn(oracle_claims[:2], number_of_iterations=1)
+        snapshot = copy.copy(distance)
+        snapshot.weighted_matrix = distance.weighted_matrix.snapshot()
+        before = [snapshot(collection0, collection1) for collection0, collection1 in zip(collections, collections[1:])]
+        distance.learn(oracle_claims, number_of_iterations=2)
+        distance.weighted_matrix.refresh()
+        after = [snapshot(collection0, collection1) for collection0, collection1 in zip(collections, collections[1:])]
+        self.assertEqual(before, after)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import math
+import unittest
+from weighting import *
+from distance import Distance, normalize_distribution
+from vector_space import VectorSpace
+
+
+iterables = ['banana', 'ananas', 'base', 'ab']
+vector_space = VectorSpace(iterables)
+
+
+def normalized_vector(coefficients):
+    return np.array(coefficients) / sum(coefficients)
+
+
+class TestWeighting(unittest.TestCase):
+
+    def test_tfidf_matches_dictionaries(self):
+        distance = Distance(iterables)
+        expected_item_weights = distance.item_vector_from_dict(normalize_distribution(distance.tfidf_item_weights()))
+        expected_iterable_weights = distance.iterable_vector_from_dict(
+            normalize_distribution(distance.inverse_length_iterable_weights()))
+        self.assertTrue(np.allclose(item_weights_vector_from_weighting(vector_space, TFIDF), expected_item_weights))
+        self.assertTrue(np.allclose(iterable_weights_vector_from_weighting(vector_space, TFIDF),
+                                    expected_iterable_weights))
+
+    def test_item_weights(self):
+        # Items 'b', 'a', 'n', 's' are in 3, 4, 2, 2 iterables.
+        document_frequencies = [3, 4, 2, 2, 1]
+        self.assertEqual(list(vector_space.item_to_index), ['b', 'a', 'n', 's', 'e'])
+        self.assertTrue(np.allclose(item_weights_vector_from_weighting(vector_space, SMOOTHED_IDF),
+                                    normalized_vector([1 + math.log(5 / (1 + df)) for df in document_frequencies])))
+        self.assertTrue(np.allclose(item_weights_vector_from_weighting(vector_space, BM25),
+                                    normalized_vector([math.log(1 + (4 - df + 0.5) / (df + 0.5))
+                                                       for df in document_frequencies])))
+
+    def test_iterable_weights(self):
+        lengths = [6, 6, 4, 2]
+        self.assertTrue(np.allclose(iterable_weights_vector_from_weighting(vector_space, SUBLINEAR_TF),
+                                    normalized_vector([1 / (1 + math.log(length)) for length in lengths])))
+        self.assertTrue(np.allclose(iterable_weights_vector_from_weighting(vector_space, BM25),
+                                    normalized_vector([2.2 / (1 + 1.2 * (0.25 + 0.75 * length / 4.5))
+                                                       for length in lengths])))
+
+    def test_removed_iterables(self):
+        distance = Distance(iterables + ['nab'], weighting=BM25)
+        distance.remove_iterables(['nab'])
+        iterable_weights = iterable_weights_vector_from_weighting(distance, BM25)
+        self.assertEqual(iterable_weights[4], 0.)
+        self.assertTrue(np.allclose(iterable_weights[:4], iterable_weights_vector_from_weighting(vector_space, BM25)))
+
+    def test_distance_weighting(self):
+        distance = Distance(iterables, weighting=SUBLINEAR_TF)
+        self.assertTrue(np.allclose(distance.iterable_weights_vector,
+                                    iterable_weights_vector_from_weighting(vector_space, SUBLINEAR_TF)))
+        distance.add_iterables(['sea'])
+        self.assertAlmostEqual(distance.iterable_weights_vector[-1],
+                               iterable_weights_vector_from_weighting(distance, SUBLINEAR_TF)[-1])
+        with self.assertRaises(ValueError):
+            Distance(iterables, weighting='idf')
+
+
+if __name__ == '__main__':
+    unittest.main()
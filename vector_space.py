@@ -6,22 +6,182 @@
 # Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
 
 
+import os
+import tempfile
+from collections import defaultdict
+from itertools import count
 from matrix_operations import *
+from vocabulary import Vocabulary
+from factors import factor_components_from_texts
+from file_corpus import DEFAULT_MEMORY_BUDGET, SpilledMatrices, iterables_from_files, spill_iterables
+
+
+# Removed iterables are compacted as soon as they represent this fraction of the columns of the matrix.
+COMPACTION_THRESHOLD = 0.25
 
 
 class VectorSpace:
 
-    def __init__(self, iterables):
-        self.item_to_index = map_to_index_from_iterable(iterables_union(iterables))
-        self.iterable_to_index = map_to_index_from_iterable(iterables)
-        self.item_iterable_matrix = matrix_from_iterables_and_index_maps(
-            iterables, self.item_to_index, self.iterable_to_index)
+    def __init__(self, iterables, compact_vocabulary=False, precision=DEFAULT_PRECISION):
+        """ With 'compact_vocabulary', 'item_to_index' and 'iterable_to_index' are 'Vocabulary' objects
+        instead of dictionaries, which use much less memory but make lookups slower.
+        With the 'float32' precision, the counts of the matrix are int32 and the vectors float32,
+        instead of int64 and float64 (see 'PRECISIONS'). """
+        check_precision(precision)
+        self.initialize_components(*index_maps_and_matrix_from_iterables(iterables, compact_vocabulary,
+                                                                         count_dtype_from_precision(precision)),
+                                   precision=precision)
+
+    @classmethod
+    def from_components(cls, item_to_index, iterable_to_index, item_iterable_matrix, precision=None,
+                        item_iterable_csc_matrix=None):
+        """ Create an object from already computed index maps and matrix, without going through the iterables.
+        By default, the precision is deduced from the type of the entries of the matrix.
+        'item_iterable_csc_matrix', if provided, is the column-major version of the matrix, used without copy. """
+        vector_space = cls.__new__(cls)
+        vector_space.initialize_components(item_to_index, iterable_to_index, item_iterable_matrix, precision)
+        if item_iterable_csc_matrix is not None:
+            vector_space.csc_matrix_cache = AppendableCscMatrix(item_iterable_csc_matrix, copy=False)
+        return vector_space
+
+    @classmethod
+    def from_texts(cls, texts, maximum_factor_length, minimum_document_frequency=1, maximum_document_frequency=None,
+                   precision=DEFAULT_PRECISION):
+        """ Create the vector space whose iterables are the factors of length at most 'maximum_factor_length'
+        of the texts, identified by their hashes, without materializing the factors (see factors.py). """
+        return cls.from_components(*factor_components_from_texts(texts, maximum_factor_length,
+                                                                 minimum_document_frequency,
+                                                                 maximum_document_frequency,
+                                                                 count_dtype_from_precision(precision)),
+                                   precision=precision)
+
+    @classmethod
+    def from_files(cls, paths, directory=None, read_file=None, compact_vocabulary=False,
+                   memory_budget=DEFAULT_MEMORY_BUDGET, precision=DEFAULT_PRECISION):
+        """ Create the vector space of the iterables of the files 'paths', read once by 'read_file', by default
+        one iterable per line (see file_corpus.py). The matrix is built out of core, within about 'memory_budget'
+        bytes besides the index maps, and its arrays are read-only memory maps of files of 'directory',
+        by default a new temporary directory, which must be kept as long as the vector space is used. """
+        check_precision(precision)
+        return cls.from_components(*index_maps_and_matrix_from_files(paths, directory, read_file, compact_vocabulary,
+                                                                     memory_budget,
+                                                                     count_dtype_from_precision(precision)),
+                                   precision=precision)
+
+    def initialize_components(self, item_to_index, iterable_to_index, item_iterable_matrix, precision=None):
+        if precision is None:
+            precision = precision_from_dtype(item_iterable_matrix.dtype)
+        check_precision(precision)
+        self.precision = precision
+        self.item_to_index = item_to_index
+        self.iterable_to_index = iterable_to_index
+        self.item_iterable_matrix = item_iterable_matrix
+        self.removed_iterable_indices = set()
+
+    @property
+    def item_iterable_matrix(self):
+        """ The columns of the iterables added since the last access are appended at once. """
+        if self.pending_item_iterable_matrices:
+            blocks = [self.merged_item_iterable_matrix] + self.pending_item_iterable_matrices
+            self.merged_item_iterable_matrix = horizontal_stack_with_row_padding(blocks, len(self.item_to_index))
+            self.pending_item_iterable_matrices = []
+        return self.merged_item_iterable_matrix
+
+    @item_iterable_matrix.setter
+    def item_iterable_matrix(self, matrix):
+        self.merged_item_iterable_matrix = matrix
+        self.pending_item_iterable_matrices = []
+        # The column-major copy and the counts are computed again from the new matrix when needed.
+        self.csc_matrix_cache = None
+        self.document_frequencies_cache = None
+        self.iterable_lengths_cache = None
+
+    def float_dtype(self):
+        """ Type of the vectors of the vector space. """
+        return float_dtype_from_precision(self.precision)
+
+    def count_dtype(self):
+        """ Type of the counts of the matrices built by the vector space. """
+        return count_dtype_from_precision(self.precision)
+
+    def number_of_iterable_slots(self):
+        """ Number of columns of 'item_iterable_matrix', including those of the removed iterables
+        that are not compacted yet. """
+        return len(self.iterable_to_index) + len(self.removed_iterable_indices)
+
+    def add_iterables(self, iterables):
+        """ Add the iterables that are not already in the vector space, and return them in a list.
+        Their columns are appended to 'item_iterable_matrix' and new items are appended to its rows,
+        so the indices of the existing items and iterables do not change. """
+        new_iterables = [iterable for iterable in dict.fromkeys(iterables) if iterable not in self.iterable_to_index]
+        columns = self.columns_of_new_iterables(new_iterables)
+        self.pending_item_iterable_matrices.append(columns)
+        self.count_new_columns(columns)
+        return new_iterables
+
+    def count_new_columns(self, columns):
+        """ Update the column-major copy of the matrix and the counts, when they are computed,
+        with the columns of the added iterables, at a cost that only depends on those columns. """
+        if self.csc_matrix_cache is not None:
+            self.csc_matrix_cache.append_columns(columns, len(self.item_to_index))
+        if self.document_frequencies_cache is not None:
+            document_frequencies = np.zeros(len(self.item_to_index), dtype=self.document_frequencies_cache.dtype)
+            document_frequencies[:len(self.document_frequencies_cache)] = self.document_frequencies_cache
+            document_frequencies[:columns.shape[0]] += matrix_vector_product(
+                nonzero_pattern(columns), one_vector_from_length(columns.shape[1], np.int64)).astype(
+                document_frequencies.dtype, copy=False)
+            self.document_frequencies_cache = document_frequencies
+        if self.iterable_lengths_cache is not None:
+            self.iterable_lengths_cache = np.concatenate([self.iterable_lengths_cache,
+                                                          absolute_column_sums(columns)])
+
+    def columns_of_new_iterables(self, new_iterables):
+        """ Give the next indices to 'new_iterables', and return the matrix of their columns. """
+        first_new_iterable_index = self.number_of_iterable_slots()
+        item_indices, iterable_indices = index_arrays_from_iterables(
+            new_iterables, index_assigner(self.item_to_index, len(self.item_to_index)),
+            index_assigner(self.iterable_to_index, first_new_iterable_index))
+        return matrix_from_index_arrays(item_indices, iterable_indices - first_new_iterable_index,
+                                        (len(self.item_to_index), len(new_iterables)), dtype=self.count_dtype())
+
+    def remove_iterables(self, iterables):
+        """ The columns of the removed iterables are kept until the next call to 'compact',
+        which happens automatically once they represent a fraction 'COMPACTION_THRESHOLD' of the columns. """
+        removed_iterable_indices = [self.iterable_to_index.pop(iterable) for iterable in iterables]
+        self.removed_iterable_indices.update(removed_iterable_indices)
+        if self.document_frequencies_cache is not None and self.csc_matrix_cache is not None:
+            self.document_frequencies_cache = self.document_frequencies_cache - matrix_vector_product(
+                nonzero_pattern(columns_of_csc_matrix(self.item_iterable_csc_matrix(), removed_iterable_indices)),
+                one_vector_from_length(len(removed_iterable_indices), np.int64)).astype(
+                self.document_frequencies_cache.dtype, copy=False)
+        else:
+            self.document_frequencies_cache = None
+        if len(self.removed_iterable_indices) > COMPACTION_THRESHOLD * self.number_of_iterable_slots():
+            self.compact()
+
+    def compact(self):
+        """ Drop the columns of the removed iterables, and return the former indices of the kept columns. """
+        kept_iterable_indices = np.setdiff1d(np.arange(self.number_of_iterable_slots()),
+                                             np.fromiter(self.removed_iterable_indices, dtype=np.int64))
+        self.item_iterable_matrix = columns_of_csc_matrix(self.item_iterable_csc_matrix(),
+                                                          kept_iterable_indices).tocsr()
+        if isinstance(self.iterable_to_index, Vocabulary):
+            self.iterable_to_index = self.iterable_to_index.compacted()
+        else:
+            # The insertion order of a dict map need not be the order of its indices.
+            new_index_from_former_index = np.cumsum(mask_from_indices(kept_iterable_indices,
+                                                                      self.number_of_iterable_slots())) - 1
+            self.iterable_to_index = {iterable: int(new_index_from_former_index[index])
+                                      for iterable, index in self.iterable_to_index.items()}
+        self.removed_iterable_indices = set()
+        return kept_iterable_indices
 
     def item_vector_from_dict(self, item_distribution):
-        return vector_from_index_and_value_maps(self.item_to_index, item_distribution)
+        return vector_from_index_and_value_maps(self.item_to_index, item_distribution, dtype=self.float_dtype())
 
     def iterable_vector_from_dict(self, iterable_distribution):
-        return vector_from_index_and_value_maps(self.iterable_to_index, iterable_distribution)
+        return vector_from_index_and_value_maps(self.iterable_to_index, iterable_distribution,
+                                                length=self.number_of_iterable_slots(), dtype=self.float_dtype())
 
     def item_dict_from_vector(self, item_vector):
         return dict_from_index_map_and_vector(self.item_to_index, item_vector)
@@ -33,10 +193,167 @@ class VectorSpace:
         iterable_distribution = constant_distribution_from_collection(iterable_collection)
         return self.iterable_vector_from_dict(iterable_distribution)
 
+    def iterable_indices_from_collection(self, iterable_collection):
+        """ Return the array of the indices of the distinct iterables of 'iterable_collection'. """
+        return np.fromiter(map(self.iterable_to_index.__getitem__, dict.fromkeys(iterable_collection)),
+                           dtype=np.int64)
+
+    def iterable_matrix_from_collections(self, iterable_collections):
+        return indicator_matrix_from_index_map_and_collections(self.iterable_to_index, iterable_collections,
+                                                               length=self.number_of_iterable_slots(),
+                                                               dtype=self.float_dtype())
+
+    def item_iterable_csc_matrix(self):
+        """ Return a column-major copy of 'item_iterable_matrix', computed again only if this matrix is replaced.
+        The columns of the added iterables are appended to it (see 'AppendableCscMatrix'). """
+        if self.csc_matrix_cache is None:
+            self.csc_matrix_cache = AppendableCscMatrix(self.item_iterable_matrix)
+        return self.csc_matrix_cache.matrix
+
+    def document_frequencies(self):
+        """ Entry 'i' is the number of iterables (not removed) containing the item of index 'i'.
+        The counts are computed once from the matrix, then updated by the additions and removals of iterables.
+        The returned array must not be modified. """
+        if self.document_frequencies_cache is None:
+            kept_columns_vector = 1 - mask_from_indices(list(self.removed_iterable_indices),
+                                                        self.number_of_iterable_slots())
+            self.document_frequencies_cache = matrix_vector_product(nonzero_pattern(self.item_iterable_matrix),
+                                                                    kept_columns_vector)
+        return self.document_frequencies_cache
+
+    def iterable_lengths(self):
+        """ Entry 'j' is the number of items, with multiplicity, of the iterable of index 'j'.
+        As 'document_frequencies', the lengths are updated by the additions of iterables. """
+        if self.iterable_lengths_cache is None:
+            self.iterable_lengths_cache = absolute_column_sums(self.item_iterable_matrix)
+        return self.iterable_lengths_cache
+
     def count_iterables_containing_item(self, item):
         if item not in self.item_to_index:
             return 0
-        return count_nonzero_entries_in_matrix_row(self.item_iterable_matrix, self.item_to_index[item])
+        return count_nonzero_entries_in_matrix_row(self.item_iterable_matrix, self.item_to_index[item],
+                                                   ignored_column_indices=self.removed_iterable_indices)
+
+
+class AppendableCscMatrix:
+    """ Column-major copy of a matrix, in arrays of doubling capacity to which the columns of the added iterables
+    are appended, so that adding iterables costs the number of entries of their columns, amortized,
+    instead of a copy of the whole matrix. The attribute 'matrix' is a 'csc_matrix' on the filled part of the arrays.
+    Without 'copy', a 'csc_matrix' is wrapped as it is, and its arrays are only copied at the first append.
+    """
+
+    def __init__(self, matrix, copy=True):
+        matrix = csc_matrix(matrix, copy=copy)
+        self.data, self.indices, self.indptr = matrix.data, matrix.indices, matrix.indptr
+        self.nnz = matrix.nnz
+        self.number_of_columns = matrix.shape[1]
+        self.matrix = matrix
+
+    def append_columns(self, columns, number_of_rows):
+        """ Append the columns of 'columns', whose rows are the first rows of the matrix,
+        which gets 'number_of_rows' rows. """
+        columns = csc_matrix(columns)
+        nnz = self.nnz + columns.nnz
+        number_of_columns = self.number_of_columns + columns.shape[1]
+        self.data = with_capacity(self.data, nnz)
+        self.indices = with_capacity(self.indices, nnz)
+        self.indptr = with_capacity(self.indptr, number_of_columns + 1)
+        self.data[self.nnz:nnz] = columns.data
+        self.indices[self.nnz:nnz] = columns.indices
+        self.indptr[self.number_of_columns + 1:number_of_columns + 1] = columns.indptr[1:] + self.nnz
+        self.nnz, self.number_of_columns = nnz, number_of_columns
+        self.matrix = csc_matrix((self.data[:nnz], self.indices[:nnz], self.indptr[:number_of_columns + 1]),
+                                 shape=(number_of_rows, number_of_columns), copy=False)
+
+
+def with_capacity(array, length):
+    """ Return 'array' if it has at least 'length' entries, and otherwise a copy of at least twice its length. """
+    if len(array) >= length:
+        return array
+    extended_array = np.empty(max(length, 2 * len(array)), dtype=array.dtype)
+    extended_array[:len(array)] = array
+    return extended_array
+
+
+class IndexAssigner:
+    """ Wrap the index map 'to_index' so that looking up an unknown key
+    adds it to 'to_index' with the next free index, starting at 'next_index'. """
+
+    def __init__(self, to_index, next_index):
+        self.to_index = to_index
+        self.new_indices = count(next_index)
+
+    def __getitem__(self, key):
+        index = self.to_index.get(key)
+        if index is None:
+            index = self.to_index[key] = next(self.new_indices)
+        return index
+
+
+class VocabularyAssigner:
+    """ Same as 'IndexAssigner' for a 'Vocabulary', whose next free index is always its number of indices,
+    so that the key is encoded once instead of twice. """
+
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+
+    def __getitem__(self, key):
+        return self.vocabulary.add(key)
+
+
+def index_assigner(to_index, next_index):
+    if isinstance(to_index, Vocabulary):
+        return VocabularyAssigner(to_index)
+    return IndexAssigner(to_index, next_index)
+
+
+def index_maps_and_matrix_from_iterables(iterables, compact_vocabulary=False, dtype=np.int64):
+    """ Single pass equivalent of 'map_to_index_from_iterable' applied to 'iterables_union(iterables)'
+    and to 'iterables', followed by 'matrix_from_iterables_and_index_maps' with entries of type 'dtype'.
+    'iterables' may therefore be a one-shot generator. """
+    item_to_index, iterable_to_index, (item_indices, iterable_indices) = with_assigned_index_maps(
+        lambda item_assigner, iterable_assigner: index_arrays_from_iterables(iterables, item_assigner,
+                                                                             iterable_assigner),
+        compact_vocabulary)
+    matrix = matrix_from_index_arrays(item_indices, iterable_indices, (len(item_to_index), len(iterable_to_index)),
+                                      dtype=dtype)
+    return item_to_index, iterable_to_index, matrix
+
+
+def index_maps_and_matrix_from_files(paths, directory=None, read_file=None, compact_vocabulary=False,
+                                     memory_budget=DEFAULT_MEMORY_BUDGET, dtype=np.int64):
+    """ Same as 'index_maps_and_matrix_from_iterables' for the iterables of the files 'paths', whose matrix
+    is built out of core in 'directory' (see 'VectorSpace.from_files'). """
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix='vector_space_')
+    os.makedirs(directory, exist_ok=True)
+    spilled_matrices = SpilledMatrices(directory, dtype)
+    try:
+        item_to_index, iterable_to_index, _ = with_assigned_index_maps(
+            lambda item_assigner, iterable_assigner: spill_iterables(iterables_from_files(paths, read_file),
+                                                                     item_assigner, iterable_assigner,
+                                                                     spilled_matrices, memory_budget),
+            compact_vocabulary)
+        matrix = spilled_matrices.merged((len(item_to_index), len(iterable_to_index)), directory, memory_budget)
+    finally:
+        spilled_matrices.remove()
+    return item_to_index, iterable_to_index, matrix
+
+
+def with_assigned_index_maps(read_iterables, compact_vocabulary=False):
+    """ Call 'read_iterables(item_assigner, iterable_assigner)' with index maps assigning new indices on lookup,
+    and return the resulting index maps, 'Vocabulary' objects with 'compact_vocabulary' and dicts otherwise,
+    followed by the result of the call. """
+    item_to_index = defaultdict(count().__next__)
+    if compact_vocabulary:
+        # Items are looked up once per occurrence, so they are interned in a transient dict,
+        # usually much smaller than the map of the iterables, which are looked up once each.
+        iterable_to_index = Vocabulary()
+        result = read_iterables(item_to_index, VocabularyAssigner(iterable_to_index))
+        return Vocabulary(item_to_index), iterable_to_index, result
+    iterable_to_index = defaultdict(count().__next__)
+    result = read_iterables(item_to_index, iterable_to_index)
+    return dict(item_to_index), dict(iterable_to_index), result
 
 
 def map_to_index_from_iterable(iterable):
@@ -0,0 +1,53 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+from collections import OrderedDict
+
+
+class VectorizationCache:
+    """ Bounded mapping with least recently used eviction.
+    Every lookup provides the current weights version:
+    all entries are dropped as soon as this version differs from the one of the stored entries. """
+
+    def __init__(self, maximum_size):
+        if maximum_size < 1:
+            raise ValueError('maximum_size must be positive, got {}'.format(maximum_size))
+        self.maximum_size = maximum_size
+        self.entries = OrderedDict()
+        self.weights_version = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, weights_version):
+        if weights_version != self.weights_version:
+            self.entries.clear()
+            self.weights_version = weights_version
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry, weights_version):
+        if weights_version != self.weights_version:
+            self.entries.clear()
+            self.weights_version = weights_version
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maximum_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,282 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+import struct
+import zlib
+from array import array
+from collections.abc import MutableMapping
+import numpy as np
+
+
+EMPTY_SLOT = -1
+DELETED_SLOT = -2
+INITIAL_TABLE_SIZE = 8
+MAXIMUM_LOAD_FACTOR = 0.5
+
+
+class Vocabulary(MutableMapping):
+    """ Mapping from keys to the consecutive indices '0, 1, 2...', in the order in which the keys are added.
+    The encoded keys are concatenated in one buffer, and looked up through an open addressing hash table
+    of int32 indices, so that no Python object is stored per key.
+    Keys are strings, bytes, integers, floats, booleans, None, or tuples of those (see 'encode_key').
+    Equal keys of different types, such as '1' and '1.', are distinct keys.
+    New keys can only be given the next index, and deleted keys keep their index,
+    which is not reused: call 'compacted' to renumber the remaining keys. """
+
+    def __init__(self, keys=()):
+        self.buffer = bytearray()
+        self.offsets = array('q', [0])
+        self.hashes = array('I')
+        self.table = array('i', [EMPTY_SLOT]) * INITIAL_TABLE_SIZE
+        self.deleted_indices = set()
+        for key in keys:
+            self.add(key)
+
+    @classmethod
+    def from_arrays(cls, buffer, offsets, hashes, table):
+        """ Wrap the arrays returned by 'arrays', for example memory-mapped ones, without copy.
+        They are copied into growable arrays at the first modification. """
+        vocabulary = cls.__new__(cls)
+        vocabulary.buffer, vocabulary.offsets, vocabulary.hashes, vocabulary.table = buffer, offsets, hashes, table
+        vocabulary.deleted_indices = set()
+        return vocabulary
+
+    def arrays(self):
+        """ Return the arrays given to 'from_arrays', as NumPy arrays. """
+        if self.deleted_indices:
+            raise ValueError('a vocabulary with deleted keys must be compacted before exporting its arrays')
+        return (np.frombuffer(self.buffer, dtype=np.uint8), np.frombuffer(self.offsets, dtype=np.int64),
+                np.frombuffer(self.hashes, dtype=np.uint32), np.frombuffer(self.table, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.offsets) - 1 - len(self.deleted_indices)
+
+    def number_of_indices(self):
+        """ Number of indices given so far, including those of deleted keys. """
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for index in range(self.number_of_indices()):
+            if index not in self.deleted_indices:
+                yield self.key_from_index(index)
+
+    def items(self):
+        for index in range(self.number_of_indices()):
+            if index not in self.deleted_indices:
+                yield self.key_from_index(index), index
+
+    def __contains__(self, key):
+        return self.find(encode_key(key))[0] >= 0
+
+    def __getitem__(self, key):
+        index, _ = self.find(encode_key(key))
+        if index < 0:
+            raise KeyError(key)
+        return index
+
+    def get(self, key, default=None):
+        index, _ = self.find(encode_key(key))
+        return default if index < 0 else index
+
+    def __setitem__(self, key, index):
+        if index != self.number_of_indices():
+            raise ValueError('the next index of the vocabulary is {}, got {}'.format(self.number_of_indices(), index))
+        if self.add(key) != index:
+            raise ValueError('{!r} is already in the vocabulary'.format(key))
+
+    def __delitem__(self, key):
+        self.make_growable()
+        index, slot = self.find(encode_key(key))
+        if index < 0:
+            raise KeyError(key)
+        self.table[slot] = DELETED_SLOT
+        self.deleted_indices.add(index)
+
+    def add(self, key):
+        """ Return the index of 'key', after adding it with the next index if it is not in the vocabulary. """
+        encoded_key = encode_key(key)
+        index, slot = self.find(encoded_key)
+        if index >= 0:
+            return index
+        self.make_growable()
+        index = self.number_of_indices()
+        self.buffer.extend(encoded_key)
+        self.offsets.append(len(self.buffer))
+        self.hashes.append(hash_of_encoded_key(encoded_key))
+        self.table[slot] = index
+        if (index + 1) > MAXIMUM_LOAD_FACTOR * len(self.table):
+            self.resize_table(2 * len(self.table))
+        return index
+
+    def key_from_index(self, index):
+        return decode_key(self.encoded_key_from_index(index))
+
+    def encoded_key_from_index(self, index):
+        return bytes(memoryview(self.buffer)[self.offsets[index]:self.offsets[index + 1]])
+
+    def find(self, encoded_key):
+        """ Return the index of the encoded key, or '-1', and the slot of the table where it is or would be stored. """
+        hash_value = hash_of_encoded_key(encoded_key)
+        mask = len(self.table) - 1
+        slot = hash_value & mask
+        while True:
+            index = int(self.table[slot])
+            if index == EMPTY_SLOT:
+                return -1, slot
+            if (index != DELETED_SLOT and self.hashes[index] == hash_value
+                    and self.encoded_key_from_index(index) == encoded_key):
+                return index, slot
+            slot = (slot + 1) & mask
+
+    def resize_table(self, size):
+        table = array('i', [EMPTY_SLOT]) * size
+        mask = size - 1
+        for index in range(self.number_of_indices()):
+            if index in self.deleted_indices:
+                continue
+            slot = self.hashes[index] & mask
+            while table[slot] != EMPTY_SLOT:
+                slot = (slot + 1) & mask
+            table[slot] = index
+        self.table = table
+
+    def make_growable(self):
+        if not isinstance(self.buffer, bytearray):
+            self.buffer = bytearray(memoryview(self.buffer))
+            self.offsets = array_from_numpy('q', self.offsets)
+            self.hashes = array_from_numpy('I', self.hashes)
+            self.table = array_from_numpy('i', self.table)
+
+    def compacted(self):
+        """ Return a new vocabulary with the same keys in the same order, without the indices of the deleted keys. """
+        return Vocabulary(iter(self))
+
+    def memory_size(self):
+        """ Number of bytes used by the arrays of the vocabulary. """
+        return (len(self.buffer) + len(self.offsets) * 8 + len(self.hashes) * 4 + len(self.table) * 4)
+
+
+def array_from_numpy(type_code, values):
+    result = array(type_code)
+    result.frombytes(np.ascontiguousarray(values).tobytes())
+    return result
+
+
+def hash_of_encoded_key(encoded_key):
+    return zlib.crc32(encoded_key)
+
+
+# ---- Canonical encoding of keys ----
+# Unlike pickle, equal keys of the same type always have the same encoding.
+
+STRING_TAG = b's'
+BYTES_TAG = b'b'
+INTEGER_TAG = b'i'
+SMALL_INTEGER_TAG = b'j'
+FLOAT_TAG = b'f'
+TRUE_TAG = b'T'
+FALSE_TAG = b'F'
+NONE_TAG = b'N'
+TUPLE_TAG = b't'
+SMALL_INTEGER_TUPLE_TAG = b'I'
+
+
+def encode_key(key):
+    key_type = type(key)
+    if key_type is str:
+        return STRING_TAG + key.encode('utf-8', 'surrogatepass')
+    if key_type is tuple and all(type(element) is int for element in key):
+        try:
+            return SMALL_INTEGER_TUPLE_TAG + array('i', key).tobytes()
+        except OverflowError:
+            pass
+    encoded_parts = []
+    append_encoded_key(key, encoded_parts)
+    return b''.join(encoded_parts)
+
+
+pack_length = struct.Struct('<I').pack
+pack_small_integer = struct.Struct('<i').pack
+
+
+def append_encoded_key(key, encoded_parts):
+    key_type = type(key)
+    if key_type is str:
+        encoded = key.encode('utf-8', 'surrogatepass')
+        encoded_parts.extend((STRING_TAG, pack_length(len(encoded)), encoded))
+    elif key_type is tuple:
+        encoded_parts.extend((TUPLE_TAG, pack_length(len(key))))
+        for element in key:
+            # Inlined for the elements of the bags of factors, which are mostly strings or small integers.
+            element_type = type(element)
+            if element_type is int and -2 ** 31 <= element < 2 ** 31:
+                encoded_parts.extend((SMALL_INTEGER_TAG, pack_small_integer(element)))
+            elif element_type is str:
+                encoded = element.encode('utf-8', 'surrogatepass')
+                encoded_parts.extend((STRING_TAG, pack_length(len(encoded)), encoded))
+            else:
+                append_encoded_key(element, encoded_parts)
+    elif key_type is int and -2 ** 31 <= key < 2 ** 31:
+        encoded_parts.extend((SMALL_INTEGER_TAG, pack_small_integer(key)))
+    elif key_type is int:
+        encoded = key.to_bytes((key.bit_length() + 8) // 8, 'little', signed=True)
+        encoded_parts.extend((INTEGER_TAG, struct.pack('<I', len(encoded)), encoded))
+    elif key_type is bytes:
+        encoded_parts.extend((BYTES_TAG, struct.pack('<I', len(key)), key))
+    elif key_type is float:
+        encoded_parts.extend((FLOAT_TAG, struct.pack('<d', key)))
+    elif key_type is bool:
+        encoded_parts.append(TRUE_TAG if key else FALSE_TAG)
+    elif key is None:
+        encoded_parts.append(NONE_TAG)
+    else:
+        raise TypeError('keys of type {} cannot be stored in a Vocabulary'.format(key_type.__name__))
+
+
+def decode_key(encoded_key):
+    tag = encoded_key[:1]
+    if tag == STRING_TAG:
+        return encoded_key[1:].decode('utf-8', 'surrogatepass')
+    if tag == SMALL_INTEGER_TUPLE_TAG:
+        return tuple(array('i', encoded_key[1:]))
+    key, _ = decode_key_from_position(encoded_key, 0)
+    return key
+
+
+def decode_key_from_position(encoded_key, position):
+    tag = encoded_key[position:position + 1]
+    position += 1
+    if tag == TUPLE_TAG:
+        length, = struct.unpack_from('<I', encoded_key, position)
+        position += 4
+        elements = []
+        for _ in range(length):
+            element, position = decode_key_from_position(encoded_key, position)
+            elements.append(element)
+        return tuple(elements), position
+    if tag in (STRING_TAG, BYTES_TAG, INTEGER_TAG):
+        length, = struct.unpack_from('<I', encoded_key, position)
+        position += 4
+        payload = encoded_key[position:position + length]
+        position += length
+        if tag == STRING_TAG:
+            return payload.decode('utf-8', 'surrogatepass'), position
+        if tag == BYTES_TAG:
+            return payload, position
+        return int.from_bytes(payload, 'little', signed=True), position
+    if tag == SMALL_INTEGER_TAG:
+        return struct.unpack_from('<i', encoded_key, position)[0], position + 4
+    if tag == FLOAT_TAG:
+        return struct.unpack_from('<d', encoded_key, position)[0], position + 8
+    if tag == TRUE_TAG:
+        return True, position
+    if tag == FALSE_TAG:
+        return False, position
+    if tag == NONE_TAG:
+        return None, position
+    raise ValueError('invalid encoded key {!r}'.format(encoded_key))
@@ -0,0 +1,124 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Materialized weighted matrix of a 'Distance': 'diag(item_weights) @ item_iterable_matrix @ diag(iterable_weights)',
+column-major, with the norms of its columns, which are the vectorizations of the single-iterable collections.
+The vectorization of a collection is then the sum of the columns of its iterables, without reading the weights.
+
+The rescalings of 'Distance.rescale_weights' are not applied to the stored matrix, but recorded as pending
+diagonal factors 'item_scales' and 'iterable_scales', the weighted matrix being
+'diag(item_scales) @ matrix @ diag(iterable_scales)', and the factors are applied to the columns read.
+The pending factors are folded into the stored matrix by 'refresh' once the work spent applying them
+exceeds the cost of a refresh, the number of entries of the matrix, so that reads interleaved with learning
+cost at most twice what they would with a matrix always up to date.
+Any other change of the weights, such as 'set_item_weights' or the addition of iterables, changes
+the weights version of the distance without updating the weighted matrix, which is then built again at the next read.
+"""
+
+
+import copy
+from matrix_operations import *
+
+
+class WeightedMatrix:
+
+    def __init__(self, distance):
+        csc_matrix_of_counts = distance.item_iterable_csc_matrix()
+        csc_matrix_of_counts.sort_indices()
+        self.matrix = weighted_csc_matrix(csc_matrix_of_counts, distance.item_weights_vector,
+                                          distance.iterable_weights_vector)
+        self.column_norms = column_norms(self.matrix)
+        self.item_scales = None
+        self.iterable_scales = None
+        self.pending_cost = 0
+        self.number_of_refreshes = 0
+        self.weights_version = distance.weights_version
+        self.frozen = False
+
+    def snapshot(self):
+        """ Return a copy sharing the arrays, which are made read-only so that both copies
+        copy their pending factors before modifying them. The copy is frozen: it never folds its pending factors,
+        so that threads reading it concurrently never see a matrix and factors of different refreshes. """
+        snapshot = copy.copy(self)
+        snapshot.frozen = True
+        for name in ('item_scales', 'iterable_scales'):
+            if getattr(self, name) is not None:
+                setattr(self, name, make_read_only(getattr(self, name)))
+                setattr(snapshot, name, getattr(self, name))
+        return snapshot
+
+    def has_pending_scales(self):
+        return self.item_scales is not None
+
+    def rescale(self, item_indices, item_rescaling, iterable_indices, iterable_rescaling, weights_version):
+        """ Same as 'Distance.rescale_weights', recorded as pending factors. """
+        if self.item_scales is None:
+            self.item_scales = one_vector_from_length(self.matrix.shape[0], self.matrix.dtype)
+            self.iterable_scales = one_vector_from_length(self.matrix.shape[1], self.matrix.dtype)
+        if not self.item_scales.flags.writeable:
+            self.item_scales = self.item_scales.copy()
+        if not self.iterable_scales.flags.writeable:
+            self.iterable_scales = self.iterable_scales.copy()
+        self.item_scales[item_indices] *= item_rescaling
+        self.iterable_scales[iterable_indices] *= iterable_rescaling
+        self.weights_version = weights_version
+
+    def refresh(self):
+        """ Fold the pending factors into the stored matrix and its column norms. """
+        if not self.has_pending_scales():
+            return
+        self.matrix = weighted_csc_matrix(self.matrix, self.item_scales, self.iterable_scales)
+        self.column_norms = column_norms(self.matrix)
+        self.item_scales = None
+        self.iterable_scales = None
+        self.pending_cost = 0
+        self.number_of_refreshes += 1
+
+    def count_pending_work(self, cost):
+        if self.has_pending_scales() and not self.frozen:
+            self.pending_cost += cost
+            if self.pending_cost >= self.matrix.nnz:
+                self.refresh()
+
+    def columns(self, iterable_indices):
+        """ Return the weighted columns of 'iterable_indices', as a csc matrix with sorted indices. """
+        columns = columns_of_csc_matrix(self.matrix, iterable_indices)
+        if self.has_pending_scales():
+            columns = weighted_csc_matrix(columns, self.item_scales, self.iterable_scales[iterable_indices])
+            self.count_pending_work(columns.nnz)
+        return columns
+
+    def sparse_vectorize_with_norm(self, iterable_indices):
+        """ Same as 'Distance.compute_sparse_vectorization', for the distinct 'iterable_indices'. """
+        if len(iterable_indices) == 1 and not self.has_pending_scales():
+            iterable_index = iterable_indices[0]
+            start, end = self.matrix.indptr[iterable_index], self.matrix.indptr[iterable_index + 1]
+            return (make_read_only(self.matrix.indices[start:end]), make_read_only(self.matrix.data[start:end]),
+                    float(self.column_norms[iterable_index]))
+        columns = self.columns(iterable_indices)
+        item_indices, values = sum_of_sparse_vectors([columns.indices], [columns.data])
+        values = values.astype(self.matrix.dtype, copy=False)
+        return item_indices, values, norm(values)
+
+    def vectorize(self, iterables_vector):
+        """ Same as 'dot_matrix_dot_products' of the weights, the matrix and 'iterables_vector'. """
+        if not self.has_pending_scales():
+            return matrix_vector_product(self.matrix, iterables_vector).astype(self.matrix.dtype, copy=False)
+        vectorization = dot_matrix_dot_products(self.item_scales, self.matrix, self.iterable_scales, iterables_vector)
+        self.count_pending_work(sum(self.matrix.shape))
+        return vectorization
+
+
+def weighted_csc_matrix(matrix, row_weights, column_weights) -> csc_matrix:
+    """ Return 'diag(row_weights) @ matrix @ diag(column_weights)' for a csc 'matrix', sharing its index arrays.
+    The entries have the floating type of the weights. """
+    data = (matrix.data * row_weights[matrix.indices]
+            * np.repeat(column_weights, np.diff(matrix.indptr))).astype(float_dtype_of(row_weights), copy=False)
+    weighted_matrix = csc_matrix((data, matrix.indices, matrix.indptr), shape=matrix.shape, copy=False)
+    weighted_matrix.has_sorted_indices = matrix.has_sorted_indices
+    return weighted_matrix
@@ -0,0 +1,91 @@
+# © 2020 Nokia
+# Licensed under the BSD 3-Clause License.
+# SPDX-License-Identifier: BSD-3-Clause
+# !/usr/bin/env python3
+# coding: utf-8
+# Author: Élie de Panafieu  <elie.de_panafieu@nokia-bell-labs.com>
+
+
+""" Default weights of the items and iterables of a vector space, computed as whole arrays
+from the document frequencies of the items and the lengths of the iterables.
+The weighting schemes are:
+    'tfidf': 'log(N / df)' for items, '1 / length' for iterables
+    'smoothed_idf': '1 + log((1 + N) / (1 + df))' for items, '1 / length' for iterables
+    'sublinear_tf': 'log(N / df)' for items, '1 / (1 + log(length))' for iterables
+    'bm25': 'log(1 + (N - df + 0.5) / (df + 0.5))' for items,
+        '(k1 + 1) / (1 + k1 * (1 - b + b * length / mean_length))' for iterables
+where 'N' is the number of iterables and 'df' the number of iterables containing the item.
+The weights of an item or iterable only depend on itself, so the saturation of the term frequencies
+of 'sublinear_tf' and 'bm25' is applied to the lengths of the iterables, not to each item count.
+Items contained in no iterable, and removed iterables, have weight '0'. The weight vectors are normalized to sum '1'.
+They are computed in float64, then converted to the precision of the vector space.
+"""
+
+
+from matrix_operations import *
+
+
+TFIDF = 'tfidf'
+SMOOTHED_IDF = 'smoothed_idf'
+SUBLINEAR_TF = 'sublinear_tf'
+BM25 = 'bm25'
+WEIGHTINGS = (TFIDF, SMOOTHED_IDF, SUBLINEAR_TF, BM25)
+DEFAULT_WEIGHTING = TFIDF
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def item_weights_vector_from_weighting(vector_space, weighting=DEFAULT_WEIGHTING):
+    return item_weights_vector_from_document_frequencies(vector_space.document_frequencies(),
+                                                         len(vector_space.iterable_to_index),
+                                                         weighting).astype(vector_space.float_dtype(), copy=False)
+
+
+def iterable_weights_vector_from_weighting(vector_space, weighting=DEFAULT_WEIGHTING):
+    check_weighting(weighting)
+    lengths = vector_space.iterable_lengths()
+    kept = 1 - mask_from_indices(list(vector_space.removed_iterable_indices), len(lengths))
+    mean_length = np.sum(lengths * kept) / max(np.sum(kept), 1)
+    return normalized_weights(unnormalized_iterable_weights(lengths, mean_length, weighting) * kept).astype(
+        vector_space.float_dtype(), copy=False)
+
+
+def item_weights_vector_from_document_frequencies(document_frequencies, number_of_iterables,
+                                                  weighting=DEFAULT_WEIGHTING):
+    """ Return the float64 item weights of the scheme 'weighting', normalized to sum '1'. """
+    check_weighting(weighting)
+    contained = document_frequencies > 0
+    document_frequencies = np.maximum(document_frequencies, 1)
+    if weighting == SMOOTHED_IDF:
+        weights = 1. + np.log((1. + number_of_iterables) / (1. + document_frequencies))
+    elif weighting == BM25:
+        weights = np.log(1. + (number_of_iterables - document_frequencies + 0.5) / (document_frequencies + 0.5))
+    else:
+        weights = np.log(number_of_iterables / document_frequencies)
+    return normalized_weights(np.where(contained, weights, 0.))
+
+
+def unnormalized_iterable_weights(lengths, mean_length, weighting=DEFAULT_WEIGHTING):
+    """ Return the float64 iterable weights of the scheme 'weighting', before normalization.
+    'mean_length' is the mean length of the iterables of the whole vector space, only used by 'bm25'. """
+    check_weighting(weighting)
+    safe_lengths = np.maximum(lengths, 1)
+    if weighting == SUBLINEAR_TF:
+        weights = 1. / (1. + np.log(safe_lengths))
+    elif weighting == BM25:
+        weights = (BM25_K1 + 1.) / (1. + BM25_K1 * (1. - BM25_B + BM25_B * safe_division(lengths, mean_length)))
+    else:
+        weights = 1. / safe_lengths
+    return np.where(lengths > 0, weights, 0.)
+
+
+def check_weighting(weighting):
+    if weighting not in WEIGHTINGS:
+        raise ValueError('unknown weighting {!r}, expected one of {}'.format(weighting, ', '.join(WEIGHTINGS)))
+
+
+def normalized_weights(weights):
+    total = np.sum(weights)
+    if total == 0:
+        return weights
+    return weights / total